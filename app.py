@@ -5,7 +5,7 @@ Run with: streamlit run app.py
 """
 
 import streamlit as st
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 from config import Config
@@ -25,22 +25,92 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize services
+# Services - each one is created on first use and shared for the process
 @st.cache_resource
-def init_services():
+def db():
+    return Database()
+
+
+@st.cache_resource
+def outline_gen():
+    return OutlineGenerator()
+
+
+@st.cache_resource
+def chapter_gen():
+    return ChapterGenerator()
+
+
+@st.cache_resource
+def compiler():
+    return BookCompiler()
+
+
+@st.cache_resource
+def notifier():
+    return NotificationService()
+
+
+# Cached reads are keyed on the database write counter, so any write - from
+# this app or the CLI - makes the next run fetch fresh data
+def _books_version():
+    """Write counter read once at the start of each run (see main())."""
+    return st.session_state.get('_books_version', 0)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _all_books(version):
+    # Bypass the process-wide cache, which doesn't see writes from the CLI
+    return db().get_all_books(fresh=True)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _chapters_meta(version, book_id):
+    return db().get_book_chapters_meta(book_id)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _chapter_body(version, chapter_id):
+    return db().get_chapter_content(chapter_id)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _chapter_counts(version):
+    """book_id -> generated/approved/total chapter counts, aggregated by the database."""
     return {
-        'db': Database(),
-        'outline_gen': OutlineGenerator(),
-        'chapter_gen': ChapterGenerator(),
-        'compiler': BookCompiler(),
-        'notifier': NotificationService()
+        book['id']: {
+            'generated': book['generated_chapters'],
+            'approved': book['approved_chapters'],
+            'total': book['total_chapters']
+        }
+        for book in db().get_books_with_counts()
     }
 
-services = init_services()
+
+@st.cache_data(show_spinner=False)
+def _preview(text, n=500):
+    """Cut text to at most n characters, ending on a line break where possible."""
+    if len(text) <= n:
+        return text
+    cut = text.rfind('\n', 0, n)
+    return text[:cut if cut > 0 else n] + "..."
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _workflow_counts(version):
+    return db().get_workflow_counts()
+
+
+@st.cache_data(show_spinner=False)
+def hint(title, body_html, heading="h4"):
+    """Build the HTML for a hint box."""
+    return f'<div class="hint-box" style="background-color: Black;"><{heading}>{title}</{heading}>{body_html}</div>'
 
 
 # Custom CSS for better styling
-st.markdown("""
+@st.cache_data
+def _css():
+    return """
 <style>
     .main-title {
         font-size: 2.8rem;
@@ -124,23 +194,51 @@ st.markdown("""
         z-index: -1;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+st.markdown(_css(), unsafe_allow_html=True)
+
+
+PAGES = {
+    'home': "🏠 Home",
+    'add': "➕ Add Book",
+    'outlines': "📝 Outlines",
+    'chapters': "📖 Chapters",
+    'compile': "📄 Compile",
+    'settings': "⚙️ Settings",
+}
 
 
-def get_workflow_state():
+def _queue_toast(message, celebrate=False):
+    """Show a toast at the start of the next rerun, so st.rerun() needn't wait."""
+    st.session_state['_last_toast'] = (message, celebrate)
+
+
+def _go_to(page):
+    """Switch to a page by updating the URL query parameter."""
+    st.query_params['page'] = page
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_workflow_state(version):
     """Calculate current workflow state based on database."""
-    books = services['db'].get_all_books()
+    # Per-stage counts come from one aggregate query, so only the list for
+    # the active step is ever built
+    counts = _workflow_counts(version)
     
-    if not books:
+    if not counts['total_books']:
         return {
             'step': 1,
             'message': "Let's start by adding your first book!",
             'books': []
         }
     
+    books = _all_books(version)
+    
     # Check for books without outlines
-    needs_outline = [b for b in books if not b.get('outline')]
-    if needs_outline:
+    if counts['needs_outline']:
+        needs_outline = [b for b in books if not b.get('outline')]
         return {
             'step': 2,
             'message': f"{len(needs_outline)} book(s) need outlines generated.",
@@ -149,8 +247,8 @@ def get_workflow_state():
         }
     
     # Check for books with outlines needing approval
-    needs_approval = [b for b in books if b.get('outline') and b.get('status_outline_notes') == 'yes']
-    if needs_approval:
+    if counts['needs_approval']:
+        needs_approval = [b for b in books if b.get('outline') and b.get('status_outline_notes') == 'yes']
         return {
             'step': 2,
             'message': f"{len(needs_approval)} outline(s) ready for your review!",
@@ -158,20 +256,16 @@ def get_workflow_state():
             'pending': needs_approval
         }
     
-    # Check for books ready for chapters
-    ready_for_chapters = [b for b in books if b.get('status_outline_notes') == 'no_notes_needed']
-    books_needing_chapters = []
-    
-    for book in ready_for_chapters:
-        chapters = services['db'].get_book_chapters(book['id'])
-        if not chapters:
-            books_needing_chapters.append(book)
-        else:
-            pending = [c for c in chapters if not c.get('content')]
-            if pending:
-                books_needing_chapters.append(book)
-    
-    if books_needing_chapters:
+    # Check for books ready for chapters (one query for all of them)
+    if counts['needs_chapters']:
+        ready_for_chapters = [b for b in books if b.get('status_outline_notes') == 'no_notes_needed']
+        chapter_counts = _chapter_counts(version)
+        no_chapters = {'generated': 0, 'total': 0}
+        books_needing_chapters = [
+            book for book in ready_for_chapters
+            if not chapter_counts.get(book['id'], no_chapters)['total']
+            or chapter_counts[book['id']]['generated'] < chapter_counts[book['id']]['total']
+        ]
         return {
             'step': 3,
             'message': f"{len(books_needing_chapters)} book(s) ready for chapter generation!",
@@ -180,8 +274,11 @@ def get_workflow_state():
         }
     
     # Check for books ready for compilation
-    ready_for_compile = [b for b in books if b.get('book_output_status') != 'completed' and b.get('status_outline_notes') == 'no_notes_needed']
-    if ready_for_compile:
+    if counts['ready_for_compile']:
+        ready_for_compile = [
+            b for b in books
+            if b.get('book_output_status') != 'completed' and b.get('status_outline_notes') == 'no_notes_needed'
+        ]
         return {
             'step': 4,
             'message': f"{len(ready_for_compile)} book(s) ready to be compiled!",
@@ -202,8 +299,18 @@ def main():
     st.markdown('<p class="main-title">📚 AI Book Generator</p>', unsafe_allow_html=True)
     st.caption("Generate complete books with AI in 4 simple steps")
     
+    # One cheap read per run decides whether cached data is still current
+    st.session_state['_books_version'] = db().books_version()
+    
+    # Confirmation from the action that triggered this rerun
+    if '_last_toast' in st.session_state:
+        message, celebrate = st.session_state.pop('_last_toast')
+        st.toast(message)
+        if celebrate:
+            st.balloons()
+    
     # Get current workflow state
-    state = get_workflow_state()
+    state = get_workflow_state(_books_version())
     
     # Workflow progress bar
     show_workflow_progress(state['step'])
@@ -220,15 +327,20 @@ def main():
         
         st.markdown("---")
         
-        # Navigation based on workflow
-        if state['step'] == 1:
-            page = st.radio("Go to:", ["🏠 Home", "➕ Add Book"], index=0)
-        else:
-            page = st.radio(
-                "Go to:",
-                ["🏠 Home", "➕ Add Book", "📝 Outlines", "📖 Chapters", "📄 Compile", "⚙️ Settings"],
-                index=0
-            )
+        # Navigation based on workflow - the page lives in the URL, so a click
+        # is one rerun and every page can be deep-linked
+        options = ['home', 'add'] if state['step'] == 1 else list(PAGES)
+        page = st.query_params.get('page', 'home')
+        if page not in options:
+            page = 'home'
+        st.session_state['nav'] = page
+        st.radio(
+            "Go to:",
+            options,
+            format_func=PAGES.get,
+            key='nav',
+            on_change=lambda: _go_to(st.session_state['nav'])
+        )
         
         st.markdown("---")
         st.markdown("### 💡 Quick Tips")
@@ -238,17 +350,17 @@ def main():
         st.caption("• Gray = Upcoming")
     
     # Main content based on page
-    if page == "🏠 Home":
+    if page == 'home':
         show_home_page(state)
-    elif page == "➕ Add Book":
+    elif page == 'add':
         show_add_book_page()
-    elif page == "📝 Outlines":
+    elif page == 'outlines':
         show_outlines_page()
-    elif page == "📖 Chapters":
+    elif page == 'chapters':
         show_chapters_page()
-    elif page == "📄 Compile":
+    elif page == 'compile':
         show_compile_page()
-    elif page == "⚙️ Settings":
+    elif page == 'settings':
         show_settings_page()
 
 
@@ -275,9 +387,7 @@ def show_home_page(state):
     
     if state['step'] == 1:
         # No books yet - guide to add first book
-        st.markdown("""
-        <div class="hint-box" style="background-color: Black;">
-            <h3>👋 Welcome to AI Book Generator!</h3>
+        st.markdown(hint("👋 Welcome to AI Book Generator!", """
             <p>This tool helps you create complete books using AI. Here's how it works:</p>
             <ol>
                 <li><strong>Add a Book</strong> - Enter your book title and describe what you want</li>
@@ -285,16 +395,13 @@ def show_home_page(state):
                 <li><strong>Write Chapters</strong> - AI writes each chapter (you can review & edit)</li>
                 <li><strong>Compile Book</strong> - Export to DOCX, PDF, or TXT format</li>
             </ol>
-        </div>
-        """, unsafe_allow_html=True)
+        """, heading="h3"), unsafe_allow_html=True)
         
         st.markdown("### 🚀 Let's Get Started!")
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            if st.button("➕ Add Your First Book", type="primary", use_container_width=True):
-                st.session_state['page'] = 'add'
-                st.rerun()
+            st.button("➕ Add Your First Book", type="primary", use_container_width=True, on_click=_go_to, args=('add',))
     
     else:
         # Show dashboard for existing books
@@ -302,23 +409,27 @@ def show_home_page(state):
         
         # Quick action based on current step
         if state.get('pending'):
-            st.markdown(f"""
-            <div class="hint-box" style="background-color: Black;">
-                <h4>👉 Next Action Required</h4>
+            st.markdown(hint("👉 Next Action Required", f"""
                 <p>{state['message']}</p>
-            </div>
-            """, unsafe_allow_html=True)
+            """), unsafe_allow_html=True)
+        
+        # Book cards (chapter counts for every book come from one aggregate query)
+        stats = _chapter_counts(_books_version())
         
-        # Book cards
         for book in state['books']:
-            show_book_card(book)
+            show_book_card(book, stats.get(book['id'], {'generated': 0, 'total': 0}))
 
 
-def show_book_card(book):
-    """Display a book as a card with status and actions."""
-    chapters = services['db'].get_book_chapters(book['id'])
-    generated = len([c for c in chapters if c.get('content')]) if chapters else 0
-    total = len(chapters) if chapters else 0
+@st.fragment
+def show_book_card(book, stats):
+    """
+    Display a book as a card with status and actions.
+    
+    Runs as a fragment so a click only reruns this card; actions that
+    change the workflow state then rerun the whole app.
+    """
+    generated = stats['generated']
+    total = stats['total']
     
     # Determine status
     if book.get('book_output_status') == 'completed':
@@ -342,11 +453,10 @@ def show_book_card(book):
         
         with col1:
             if book.get('outline'):
-                st.text_area("Outline Preview", book['outline'][:500] + "...", height=100, disabled=True)
+                st.text_area("Outline Preview", _preview(book['outline']), height=100, disabled=True)
             
-            if chapters:
-                progress = generated / total if total > 0 else 0
-                st.progress(progress)
+            if total:
+                st.progress(generated / total)
                 st.caption(f"Chapters: {generated}/{total} complete")
         
         with col2:
@@ -354,33 +464,34 @@ def show_book_card(book):
             if not book.get('outline'):
                 if st.button("🤖 Generate Outline", key=f"gen_out_{book['id']}", type="primary"):
                     with st.spinner("AI is creating your outline..."):
-                        outline = services['outline_gen'].llm.generate_outline(
+                        outline = outline_gen().llm.generate_outline(
                             book['title'],
-                            book['notes_on_outline_before']
+                            book['notes_on_outline_before'],
+                            force_refresh=True
                         )
-                        services['db'].update_book(book['id'], outline=outline, status_outline_notes='yes')
+                        db().update_book(book['id'], outline=outline, status_outline_notes='yes')
                         # Send notification
-                        services['notifier'].notify_outline_ready(book['id'])
-                    st.success("✅ Outline generated! Notification sent.")
-                    st.rerun()
+                        notifier().notify_outline_ready_async(book['id'])
+                    _queue_toast("✅ Outline generated! Notification queued.")
+                    st.rerun(scope="app")
             
             elif book.get('status_outline_notes') != 'no_notes_needed':
                 if st.button("✅ Approve Outline", key=f"approve_{book['id']}", type="primary"):
-                    services['db'].update_book(book['id'], status_outline_notes='no_notes_needed')
-                    st.rerun()
+                    db().update_book(book['id'], status_outline_notes='no_notes_needed')
+                    st.rerun(scope="app")
             
-            elif not chapters or generated < total:
+            elif not total or generated < total:
                 if st.button("📖 Generate Chapters", key=f"gen_ch_{book['id']}", type="primary"):
-                    st.session_state['selected_book'] = book['id']
-                    st.session_state['page'] = 'chapters'
-                    st.rerun()
+                    st.session_state['chapters_book'] = book['title']
+                    _go_to('chapters')
+                    st.rerun(scope="app")
             
             elif book.get('book_output_status') != 'completed':
                 if st.button("📄 Compile Book", key=f"compile_{book['id']}", type="primary"):
                     with st.spinner("Compiling your book..."):
-                        results = services['compiler'].compile_book(book['id'], force=True)
-                    st.success("✅ Book compiled!")
-                    st.rerun()
+                        results = compiler().compile_book(book['id'], force=True)
+                    _queue_toast("✅ Book compiled!" if results['success'] else "⚠️ Some formats could not be built")
+                    st.rerun(scope="app")
             
             else:
                 st.success("✅ Complete!")
@@ -392,9 +503,7 @@ def show_add_book_page():
     """Page to add a new book."""
     st.markdown("## ➕ Add New Book")
     
-    st.markdown("""
-    <div class="hint-box" style="background-color: Black;">
-        <h4>💡 How to describe your book</h4>
+    st.markdown(hint("💡 How to describe your book", """
         <p>Tell the AI what you want your book to cover:</p>
         <ul>
             <li>Who is the target audience?</li>
@@ -403,8 +512,7 @@ def show_add_book_page():
             <li>Any specific requirements or focuses?</li>
         </ul>
         <p><em>The more detail you provide, the better your book will be!</em></p>
-    </div>
-    """, unsafe_allow_html=True)
+    """), unsafe_allow_html=True)
     
     with st.form("add_book_form"):
         title = st.text_input(
@@ -438,19 +546,18 @@ def show_add_book_page():
                 st.error("❌ Please describe your book requirements!")
             else:
                 with st.spinner("Creating your book..."):
-                    book = services['db'].create_book(title=title, notes_on_outline_before=notes)
+                    book = db().create_book(title=title, notes_on_outline_before=notes)
                     
                     if auto_generate:
                         st.info("🤖 Generating outline with AI...")
-                        outline = services['outline_gen'].llm.generate_outline(title, notes)
-                        services['db'].update_book(book['id'], outline=outline, status_outline_notes='yes')
+                        outline = outline_gen().llm.generate_outline(title, notes)
+                        db().update_book(book['id'], outline=outline, status_outline_notes='yes')
                         # Send notification
-                        services['notifier'].notify_outline_ready(book['id'])
-                        st.success("✅ Book created and outline generated! Notification sent.")
+                        notifier().notify_outline_ready_async(book['id'])
+                        _queue_toast("✅ Book created and outline generated! Notification queued.")
                     else:
-                        st.success("✅ Book created! Generate the outline when you're ready.")
+                        _queue_toast("✅ Book created! Generate the outline when you're ready.")
                 
-                time.sleep(1)
                 st.rerun()
 
 
@@ -458,18 +565,15 @@ def show_outlines_page():
     """Page to manage book outlines."""
     st.markdown("## 📝 Manage Outlines")
     
-    st.markdown("""
-    <div class="hint-box" style="background-color: Black;">
-        <h4>📖 What to do here</h4>
+    st.markdown(hint("📖 What to do here", """
         <p>Review each outline and either:</p>
         <ul>
             <li>✅ <strong>Approve</strong> - If you're happy with the outline</li>
             <li>🔄 <strong>Regenerate</strong> - If you want changes (add feedback first)</li>
         </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    """), unsafe_allow_html=True)
     
-    books = services['db'].get_all_books()
+    books = _all_books(_books_version())
     books_with_outlines = [b for b in books if b.get('outline')]
     
     if not books_with_outlines:
@@ -495,9 +599,8 @@ def show_outlines_page():
                     st.warning("⏳ **Needs Review**")
                     
                     if st.button("✅ Approve & Continue", key=f"approve_{book['id']}", type="primary", use_container_width=True):
-                        services['db'].update_book(book['id'], status_outline_notes='no_notes_needed')
-                        st.success("Approved! Moving to chapters...")
-                        time.sleep(1)
+                        db().update_book(book['id'], status_outline_notes='no_notes_needed')
+                        _queue_toast("✅ Approved! Moving to chapters...")
                         st.rerun()
                     
                     st.markdown("---")
@@ -507,11 +610,12 @@ def show_outlines_page():
                     if st.button("🔄 Regenerate", key=f"regen_{book['id']}", use_container_width=True):
                         if feedback:
                             with st.spinner("AI is revising the outline..."):
-                                new_outline = services['outline_gen'].llm.regenerate_outline(
-                                    book['title'], book['outline'], feedback
+                                # Asked for a new revision, so don't reuse a cached one
+                                new_outline = outline_gen().llm.regenerate_outline(
+                                    book['title'], book['outline'], feedback, force_refresh=True
                                 )
-                                services['db'].update_book(book['id'], outline=new_outline)
-                            st.success("Outline updated!")
+                                db().update_book(book['id'], outline=new_outline)
+                            _queue_toast("✅ Outline updated!")
                             st.rerun()
                         else:
                             st.error("Please provide feedback first!")
@@ -522,47 +626,48 @@ def show_chapters_page():
     st.markdown("## 📖 Generate Chapters")
     
     # Get books ready for chapters
-    books = services['db'].get_all_books()
+    books = _all_books(_books_version())
     ready_books = [b for b in books if b.get('status_outline_notes') == 'no_notes_needed']
     
     if not ready_books:
         st.warning("⚠️ No books with approved outlines yet. Approve an outline first!")
         return
     
-    st.markdown("""
-    <div class="hint-box" style="background-color: Black;">
-        <h4>📖 How chapter generation works</h4>
+    st.markdown(hint("📖 How chapter generation works", """
         <ul>
             <li>Each chapter is generated based on your outline</li>
             <li>Later chapters use summaries from earlier chapters for context</li>
             <li>You can generate all at once or one at a time</li>
         </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    """), unsafe_allow_html=True)
     
     # Book selection
     book_names = {b['title']: b['id'] for b in ready_books}
-    selected = st.selectbox("Select a book:", list(book_names.keys()))
+    if st.session_state.get('chapters_book') not in book_names:
+        st.session_state.pop('chapters_book', None)
+    selected = st.selectbox("Select a book:", list(book_names.keys()), key='chapters_book')
     book_id = book_names[selected]
-    book = services['db'].get_book(book_id)
     
     st.markdown("---")
     
-    chapters = services['db'].get_book_chapters(book_id)
+    # Chapter rows without their content; bodies load on demand below
+    chapters = _chapters_meta(_books_version(), book_id)
     
     # Initialize if needed
     if not chapters:
         st.info("📚 Chapters haven't been initialized yet.")
         if st.button("📋 Initialize Chapters from Outline", type="primary"):
             with st.spinner("Parsing outline into chapters..."):
-                chapters = services['chapter_gen'].initialize_chapters_for_book(book_id)
-            st.success(f"✅ Found {len(chapters)} chapters!")
+                chapters = chapter_gen().initialize_chapters_for_book(book_id)
+            _queue_toast(f"✅ Found {len(chapters)} chapters!")
             st.rerun()
         return
     
     # Progress
-    generated = len([c for c in chapters if c.get('content')])
-    approved = len([c for c in chapters if c.get('status') == 'approved'])
+    generated = approved = 0
+    for c in chapters:
+        generated += bool(c.get('has_content'))
+        approved += c.get('status') == 'approved'
     total = len(chapters)
     
     col1, col2, col3 = st.columns(3)
@@ -578,43 +683,77 @@ def show_chapters_page():
     col1, col2 = st.columns(2)
     
     with col1:
-        pending = [c for c in chapters if not c.get('content')]
+        pending = [c for c in chapters if not c.get('has_content')]
         if pending:
             if st.button(f"🤖 Generate All {len(pending)} Pending Chapters", type="primary", use_container_width=True):
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                failed = []
+                
+                if Config.PARALLEL_CHAPTERS:
+                    # Chapters are written independently, so overlap the LLM calls
+                    status_text.info(f"✍️ Writing {len(pending)} chapters in parallel...")
+                    # Context is built once here; the workers only call the LLM and save
+                    prepared = chapter_gen().prepare_chapters(book_id, [c['chapter_number'] for c in pending])
+                    with ThreadPoolExecutor(max_workers=Config.CHAPTER_WORKERS) as executor:
+                        futures = {
+                            executor.submit(chapter_gen().generate_prepared_chapter, context): context['chapter']
+                            for context in prepared
+                        }
+                        for i, future in enumerate(as_completed(futures)):
+                            chapter = futures[future]
+                            # One failed chapter shouldn't cost the others their progress
+                            try:
+                                future.result()
+                                status_text.info(f"✍️ Finished Chapter {chapter['chapter_number']}: {chapter.get('title', '')[:30]}...")
+                            except Exception as e:
+                                failed.append(chapter['chapter_number'])
+                                status_text.warning(f"❌ Chapter {chapter['chapter_number']} failed: {e}")
+                            progress_bar.progress((i + 1) / len(pending))
+                else:
+                    # Later chapters need earlier summaries, so write them in order
+                    for i, chapter in enumerate(pending):
+                        status_text.info(f"✍️ Writing Chapter {chapter['chapter_number']}: {chapter.get('title', '')[:30]}...")
+                        chapter_gen().generate_chapter(book_id, chapter['chapter_number'])
+                        progress_bar.progress((i + 1) / len(pending))
                 
-                for i, chapter in enumerate(pending):
-                    status_text.info(f"✍️ Writing Chapter {chapter['chapter_number']}: {chapter.get('title', '')[:30]}...")
-                    services['chapter_gen'].generate_chapter(book_id, chapter['chapter_number'])
-                    progress_bar.progress((i + 1) / len(pending))
+                generated = len(pending) - len(failed)
+                if failed:
+                    summary = f"{generated} of {len(pending)} chapters have been generated and are ready for review."
+                else:
+                    summary = f"All {len(pending)} chapters have been generated and are ready for review."
                 
                 # Send notification
-                services['notifier'].notify(
-                    "chapters_generated", 
-                    book_id, 
-                    f"All {len(pending)} chapters have been generated and are ready for review."
-                )
-                status_text.success(f"✅ All {len(pending)} chapters generated! Notification sent.")
-                time.sleep(1)
+                if generated:
+                    notifier().notify_async(
+                        "chapters_generated", 
+                        book_id, 
+                        summary
+                    )
+                
+                if failed:
+                    failed_list = ", ".join(str(number) for number in sorted(failed))
+                    queued = " Notification queued." if generated else ""
+                    _queue_toast(f"⚠️ {generated} of {len(pending)} chapters generated; chapter(s) {failed_list} failed.{queued}")
+                else:
+                    _queue_toast(f"✅ All {len(pending)} chapters generated! Notification queued.")
                 st.rerun()
         else:
             st.success("✅ All chapters generated!")
     
     with col2:
-        unapproved = [c for c in chapters if c.get('content') and c.get('status') != 'approved']
+        unapproved = [c for c in chapters if c.get('has_content') and c.get('status') != 'approved']
         if unapproved:
             if st.button(f"✅ Approve All {len(unapproved)} Chapters", type="secondary", use_container_width=True):
-                for chapter in unapproved:
-                    services['chapter_gen'].approve_chapter(chapter['id'])
-                st.success("All chapters approved!")
+                chapter_gen().approve_chapters([c['id'] for c in unapproved])
+                _queue_toast("✅ All chapters approved!")
                 st.rerun()
     
     # Individual chapters
     st.markdown("### 📚 Chapters")
     
     for chapter in chapters:
-        has_content = bool(chapter.get('content'))
+        has_content = bool(chapter.get('has_content'))
         is_approved = chapter.get('status') == 'approved'
         
         icon = "✅" if is_approved else ("📝" if has_content else "⏳")
@@ -622,21 +761,24 @@ def show_chapters_page():
         
         with st.expander(f"{icon} Chapter {chapter['chapter_number']}: {chapter.get('title', 'Untitled')[:40]} — *{status}*"):
             if has_content:
-                content = chapter['content']
-                st.text_area("Content", content[:3000] + ("..." if len(content) > 3000 else ""), height=200, disabled=True, label_visibility="collapsed")
+                # Expander bodies always run, so only fetch the text when asked
+                if st.toggle("📄 Show content", key=f"show_ch_{chapter['id']}"):
+                    content = _chapter_body(_books_version(), chapter['id'])
+                    st.text_area("Content", _preview(content, 3000), height=200, disabled=True, label_visibility="collapsed")
                 
                 if chapter.get('summary'):
                     st.info(f"**Summary:** {chapter['summary']}")
                 
                 if not is_approved:
                     if st.button("✅ Approve Chapter", key=f"approve_ch_{chapter['id']}"):
-                        services['chapter_gen'].approve_chapter(chapter['id'])
+                        chapter_gen().approve_chapter(chapter['id'])
                         st.rerun()
             else:
                 st.caption("Not generated yet")
                 if st.button("🤖 Generate This Chapter", key=f"gen_ch_{chapter['id']}"):
-                    with st.spinner(f"Writing Chapter {chapter['chapter_number']}..."):
-                        services['chapter_gen'].generate_chapter(book_id, chapter['chapter_number'])
+                    # Show the text as it is written; the chapter is saved when the stream ends
+                    with st.container(height=300):
+                        st.write_stream(chapter_gen().stream_chapter(book_id, chapter['chapter_number']))
                     st.rerun()
 
 
@@ -644,23 +786,21 @@ def show_compile_page():
     """Page to compile books."""
     st.markdown("## 📄 Compile Your Book")
     
-    st.markdown("""
-    <div class="hint-box" style="background-color: Black;">
-        <h4>📤 Export your finished book</h4>
+    st.markdown(hint("📤 Export your finished book", """
         <p>Choose your format(s) and download your complete book:</p>
         <ul>
             <li>📝 <strong>DOCX</strong> - Edit in Microsoft Word</li>
             <li>📕 <strong>PDF</strong> - Share and print</li>
             <li>📋 <strong>TXT</strong> - Plain text format</li>
         </ul>
-    </div>
-    """, unsafe_allow_html=True)
+    """), unsafe_allow_html=True)
     
-    books = services['db'].get_all_books()
+    books = _all_books(_books_version())
+    chapter_counts = _chapter_counts(_books_version())
     
     for book in books:
-        chapters = services['db'].get_book_chapters(book['id'])
-        generated = len([c for c in chapters if c.get('content')]) if chapters else 0
+        counts = chapter_counts.get(book['id'], {'generated': 0, 'total': 0})
+        generated = counts['generated']
         
         is_complete = book.get('book_output_status') == 'completed'
         icon = "✅" if is_complete else "📖"
@@ -669,7 +809,7 @@ def show_compile_page():
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                st.write(f"**Chapters generated:** {generated}/{len(chapters) if chapters else 0}")
+                st.write(f"**Chapters generated:** {generated}/{counts['total']}")
                 
                 if is_complete:
                     st.success("✅ Book compiled successfully!")
@@ -693,14 +833,24 @@ def show_compile_page():
                 
                 if st.button("📄 Compile Now", key=f"compile_{book['id']}", type="primary", use_container_width=True):
                     with st.spinner("Creating your book files..."):
-                        results = services['compiler'].compile_book(book['id'], formats, force=True)
-                        services['notifier'].notify_final_draft_ready(book['id'], results)
-                    st.success("🎉 Book compiled! Check the output folder.")
-                    st.balloons()
-                    time.sleep(2)
+                        results = compiler().compile_book(book['id'], formats, force=True)
+                    if results['success']:
+                        notifier().submit(notifier().notify_final_draft_ready, book['id'], results['outputs'])
+                        _queue_toast("🎉 Book compiled! Check the output folder.", celebrate=True)
+                    else:
+                        _queue_toast(f"⚠️ Could not build: {', '.join(fmt.upper() for fmt in results['errors'])}")
                     st.rerun()
 
 
+@st.cache_resource
+def _notifier_status():
+    """Check once per process whether email and Teams are configured."""
+    return {
+        'email': bool(Config.SMTP_USER and '@' in Config.SMTP_USER and Config.SMTP_PASSWORD),
+        'teams': bool(Config.TEAMS_WEBHOOK_URL and 'your-webhook' not in Config.TEAMS_WEBHOOK_URL.lower())
+    }
+
+
 def show_settings_page():
     """Settings and configuration page."""
     st.markdown("## ⚙️ Settings & Configuration")
@@ -712,11 +862,14 @@ def show_settings_page():
     # Notifications
     st.markdown("### 🔔 Notifications")
     
+    status = _notifier_status()
+    email_ok = status['email']
+    teams_ok = status['teams']
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("**📧 Email**")
-        email_ok = Config.SMTP_USER and '@' in Config.SMTP_USER and Config.SMTP_PASSWORD
         if email_ok:
             st.success(f"✅ Configured ({Config.SMTP_USER})")
         else:
@@ -725,7 +878,6 @@ def show_settings_page():
     
     with col2:
         st.markdown("**🔗 MS Teams**")
-        teams_ok = Config.TEAMS_WEBHOOK_URL and 'your-webhook' not in Config.TEAMS_WEBHOOK_URL.lower()
         if teams_ok:
             st.success("✅ Configured")
         else:
@@ -740,7 +892,7 @@ def show_settings_page():
     
     with col1:
         if st.button("📧 Send Test Email", disabled=not email_ok):
-            result = services['notifier'].send_email("Test", "This is a test from Book Generator!")
+            result = notifier().send_email("Test", "This is a test from Book Generator!")
             if result.get('success'):
                 st.success("✅ Email sent!")
             else:
@@ -748,7 +900,7 @@ def show_settings_page():
     
     with col2:
         if st.button("🔗 Send Test Teams", disabled=not teams_ok):
-            result = services['notifier'].send_teams_notification("Test", "🧪 Test Message")
+            result = notifier().send_teams_notification("Test", "🧪 Test Message")
             if result.get('success'):
                 st.success("✅ Teams message sent!")
             else:
@@ -3,20 +3,125 @@ Chapter Generator module for the Book Generation System.
 Handles Stage 2: Chapter generation with context chaining and gating logic.
 """
 
+import asyncio
+import logging
 import re
-from typing import Optional, List, Dict, Any
-from database import Database
-from llm_service import LLMService
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from itertools import islice
+from operator import itemgetter
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator, Tuple
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+
+# Bold chapter headings ("**Chapter 1: Title**") can sit anywhere in a
+# line (e.g. after a list marker), so they keep a regex and stay unanchored.
+# "#" headings go through _scan_atx_headings.
+_BOLD_CHAPTER_PATTERN = re.compile(
+    r'\*\*Chapter\s*(\d+)[:\s-]*(.+?)\*\*',
+    re.IGNORECASE
+)
+
+# Characters allowed between a chapter number and its title ([:\s-]*)
+_TITLE_SEPARATORS = ': \t-'
+
+
+def _leading_number(text: str) -> Tuple[Optional[int], str]:
+    """Split leading digits off text. Returns (number or None, remainder)."""
+    rest = text.lstrip('0123456789')
+    digits = len(text) - len(rest)
+    if not digits:
+        return None, text
+    return int(text[:digits]), rest
+
+
+def _scan_atx_headings(outline: str) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]]]:
+    """
+    Collect chapter headings from markdown "#" lines without the regex engine.
+    
+    Returns:
+        Two lists of (chapter_number, raw_title) tuples: headings of the form
+        "## Chapter 1: Title" and headings of the form "## 1. Title"
+    """
+    chapter_headings = []
+    numbered_headings = []
+    
+    for line in outline.splitlines():
+        s = line.lstrip()
+        if not s.startswith('##'):
+            continue
+        rest = s.lstrip('#').lstrip()
+        
+        if rest[:7].lower() == 'chapter':
+            # ## Chapter 1: Title / ### Chapter 1 - Title
+            number, title = _leading_number(rest[7:].lstrip())
+            # A separator with nothing after it ("## Chapter 1:") isn't a title
+            title = title.lstrip(_TITLE_SEPARATORS).strip()
+            if number is not None and title:
+                chapter_headings.append((number, title))
+        else:
+            # ## 1. Title
+            number, title = _leading_number(rest)
+            if number is not None and title.startswith('.'):
+                title = title[1:].strip()
+                if title:
+                    numbered_headings.append((number, title))
+    
+    return chapter_headings, numbered_headings
+
+# Fallback: any level 2/3 heading, anchored to the start of a line
+_GENERIC_PATTERN = re.compile(r'^[ \t]*##[ \t]*(.+)$', re.MULTILINE)
+
+
+# Chapter gating for chapters that are not yet approved:
+# (has_content, has_notes, notes_status == 'yes') -> (action, message).
+# Anything not listed is paused.
+_CHAPTER_ACTIONS = {
+    # Has content and notes provided - ready to regenerate
+    (True, True, True): ("regenerate", "Notes provided. Ready to regenerate."),
+    # Has content, waiting for notes
+    (True, False, True): ("wait", "Waiting for editor review/notes"),
+    # No content yet - needs generation
+    **{
+        (False, has_notes, waiting): ("generate", "Ready for generation")
+        for has_notes in (True, False)
+        for waiting in (True, False)
+    },
+}
+
 
 class ChapterGenerator:
     """Handles chapter generation workflow with context chaining."""
     
     def __init__(self):
-        """Initialize chapter generator with dependencies."""
-        self.db = Database()
-        self.llm = LLMService()
+        """Initialize chapter generator; the database and LLM clients are created on first use."""
+        self._db = None
+        self._llm = None
+        # book_id -> {chapter_number: summary entry for the LLM}
+        self._context_cache: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        # book_id -> (last chapter folded in, rolling summary of chapters 1..N)
+        self._rolling_summaries: Dict[str, Tuple[int, str]] = {}
+        # Guards both caches; parallel workers save chapters concurrently
+        self._context_lock = threading.Lock()
+    
+    @property
+    def db(self):
+        """Database client, connected on first access."""
+        if self._db is None:
+            from database import Database
+            self._db = Database()
+        return self._db
+    
+    @property
+    def llm(self):
+        """LLM service, configured on first access."""
+        if self._llm is None:
+            from llm_service import LLMService
+            self._llm = LLMService()
+        return self._llm
     
     # ==========================================================================
     # OUTLINE PARSING
@@ -33,43 +138,39 @@ class ChapterGenerator:
             List of dicts with chapter_number, title, description
         """
         chapters = []
+        seen = set()
         
-        # Pattern to match chapter headings like "## Chapter 1:", "## Chapter 2:", etc.
-        # Also matches patterns like "## 1.", "### Chapter 1 -", etc.
-        patterns = [
-            r'##\s*Chapter\s*(\d+)[:\s-]*(.+?)(?=\n|$)',  # ## Chapter 1: Title
-            r'###\s*Chapter\s*(\d+)[:\s-]*(.+?)(?=\n|$)',  # ### Chapter 1: Title
-            r'##\s*(\d+)\.\s*(.+?)(?=\n|$)',               # ## 1. Title
-            r'\*\*Chapter\s*(\d+)[:\s-]*(.+?)\*\*',        # **Chapter 1: Title**
-        ]
+        chapter_headings, numbered_headings = _scan_atx_headings(outline)
         
-        for pattern in patterns:
-            matches = re.findall(pattern, outline, re.IGNORECASE | re.MULTILINE)
-            if matches:
-                for match in matches:
-                    chapter_num = int(match[0])
-                    title = match[1].strip().rstrip('*').strip()
-                    
-                    # Avoid duplicates
-                    if not any(c['chapter_number'] == chapter_num for c in chapters):
-                        chapters.append({
-                            'chapter_number': chapter_num,
-                            'title': title,
-                            'description': ''  # Could extract from following text
-                        })
-                break
+        # Highest-priority heading style with any match wins
+        headings = (
+            chapter_headings
+            or numbered_headings
+            or self._bold_headings(outline)
+        )
+        for chapter_num, title in headings:
+            title = title.strip().rstrip('*').strip()
+            
+            # Avoid duplicates
+            if chapter_num in seen:
+                continue
+            seen.add(chapter_num)
+            chapters.append({
+                'chapter_number': chapter_num,
+                'title': title,
+                'description': ''  # Could extract from following text
+            })
         
         # Sort by chapter number
-        chapters.sort(key=lambda x: x['chapter_number'])
+        chapters.sort(key=itemgetter('chapter_number'))
         
         # If no chapters found, try a more generic approach
         if not chapters:
-            # Look for any numbered headings
-            generic_pattern = r'(?:##|###)\s*(.+?)(?:\n|$)'
-            matches = re.findall(generic_pattern, outline)
+            # Look for any numbered headings; stop scanning after the first 10
+            matches = islice(_GENERIC_PATTERN.finditer(outline), 10)  # Max 10 chapters
             
-            for i, title in enumerate(matches[:10], 1):  # Max 10 chapters
-                title = title.strip().rstrip(':').strip()
+            for i, match in enumerate(matches, 1):
+                title = match.group(1).strip().rstrip(':').strip()
                 if title and len(title) > 3:  # Skip very short matches
                     chapters.append({
                         'chapter_number': i,
@@ -79,6 +180,14 @@ class ChapterGenerator:
         
         return chapters
     
+    @staticmethod
+    def _bold_headings(outline: str) -> List[Tuple[int, str]]:
+        """Find "**Chapter 1: Title**" headings as (chapter_number, raw_title) tuples."""
+        # Cheap substring check before handing the outline to the regex engine
+        if '**' not in outline:
+            return []
+        return [(int(num), title) for num, title in _BOLD_CHAPTER_PATTERN.findall(outline)]
+    
     # ==========================================================================
     # CHAPTER CREATION IN DATABASE
     # ==========================================================================
@@ -103,23 +212,17 @@ class ChapterGenerator:
         # Check if chapters already exist
         existing_chapters = self.db.get_book_chapters(book_id)
         if existing_chapters:
-            print(f"⚠️  Book already has {len(existing_chapters)} chapters")
+            logger.warning("⚠️  Book already has %d chapters", len(existing_chapters))
             return existing_chapters
         
         # Parse outline
         parsed = self.parse_outline_to_chapters(book["outline"])
-        print(f"📚 Parsed {len(parsed)} chapters from outline")
-        
-        # Create chapter entries
-        created = []
-        for ch in parsed:
-            chapter = self.db.create_chapter(
-                book_id=book_id,
-                chapter_number=ch['chapter_number'],
-                title=ch['title']
-            )
-            created.append(chapter)
-            print(f"   ✅ Created: Chapter {ch['chapter_number']}: {ch['title']}")
+        logger.info("📚 Parsed %d chapters from outline", len(parsed))
+        
+        # Create chapter entries in one round-trip
+        created = self.db.create_chapters_bulk(book_id, parsed)
+        for ch in created:
+            logger.info("   ✅ Created: Chapter %s: %s", ch['chapter_number'], ch['title'])
         
         return created
     
@@ -127,131 +230,476 @@ class ChapterGenerator:
     # CONTEXT CHAINING
     # ==========================================================================
     
-    def get_context_for_chapter(self, book_id: str, chapter_number: int) -> str:
+    @staticmethod
+    def _summary_entry(chapter: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Shape a chapter row for the LLM's previous_summaries, or None if it has no summary."""
+        if not chapter.get('summary'):
+            return None
+        return {
+            'chapter_number': chapter['chapter_number'],
+            'title': chapter.get('title', ''),
+            'summary': chapter['summary']
+        }
+    
+    def _seed_context_cache(self, book_id: str, chapters: List[Dict[str, Any]]):
+        """(Re)build the cached summaries for a book from chapter rows."""
+        entries = {}
+        for chapter in chapters:
+            entry = self._summary_entry(chapter)
+            if entry:
+                entries[chapter['chapter_number']] = entry
+        
+        with self._context_lock:
+            # Keep the rolling summary only if the chapters it folds are unchanged
+            old = self._context_cache.get(book_id)
+            rolling = self._rolling_summaries.get(book_id)
+            if rolling and (old is None or self._folded(old, rolling[0]) != self._folded(entries, rolling[0])):
+                del self._rolling_summaries[book_id]
+            self._context_cache[book_id] = entries
+    
+    @staticmethod
+    def _folded(entries: Dict[int, Dict[str, Any]], through: int) -> Dict[int, Dict[str, Any]]:
+        """The summary entries a rolling summary through chapter `through` is built from."""
+        return {number: entry for number, entry in entries.items() if number <= through}
+    
+    def _cache_context(self, book_id: str, chapter: Dict[str, Any]):
+        """Record a chapter's new summary in the context cache, if the book is cached."""
+        with self._context_lock:
+            # A rolling summary that covers this chapter is now out of date
+            rolling = self._rolling_summaries.get(book_id)
+            if rolling and chapter['chapter_number'] <= rolling[0]:
+                del self._rolling_summaries[book_id]
+            
+            entries = self._context_cache.get(book_id)
+            if entries is None:
+                return
+            entry = self._summary_entry(chapter)
+            if entry:
+                entries[chapter['chapter_number']] = entry
+            else:
+                entries.pop(chapter['chapter_number'], None)
+    
+    def get_previous_summaries(
+        self, book_id: str, chapter_number: int, refresh: bool = False
+    ) -> List[Dict[str, Any]]:
         """
-        Build context from summaries of all previous chapters.
+        Get summaries of all previous chapters, in the form the LLM expects.
+        
+        Summaries are cached per book so a multi-chapter run reads them once;
+        generation and regeneration keep the cache current. Single-chapter
+        calls pass refresh=True to pick up writes made elsewhere (the CLI, or
+        edits in the database).
         
         Args:
             book_id: The book ID
             chapter_number: Current chapter number (will get summaries of 1 to N-1)
+            refresh: Reload the book's summaries from the database first
             
         Returns:
-            Formatted context string
+            List of dicts with 'chapter_number', 'title', 'summary'
         """
         if chapter_number <= 1:
-            return ""
+            return []
         
-        summaries = self.db.get_chapter_summaries(book_id, chapter_number - 1)
+        with self._context_lock:
+            cached = book_id in self._context_cache
+        if refresh or not cached:
+            self._seed_context_cache(book_id, self.db.get_chapters_with_summaries(book_id))
         
-        if not summaries:
-            return ""
+        with self._context_lock:
+            entries = self._context_cache.get(book_id, {})
+            return [entries[number] for number in sorted(entries) if number < chapter_number]
+    
+    def _window_context(
+        self, book: Dict[str, Any], previous_summaries: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keep the last Config.CONTEXT_SUMMARIES summaries and condense the rest.
         
-        context_parts = []
-        for s in summaries:
-            if s.get('summary'):
-                context_parts.append(
-                    f"Chapter {s['chapter_number']}: {s.get('title', 'Untitled')}\n"
-                    f"{s['summary']}"
-                )
+        Returns:
+            The summaries to send in full, and a rolling summary of the
+            earlier chapters (None if there are none or it is switched off)
+        """
+        keep = Config.CONTEXT_SUMMARIES
+        if not keep or len(previous_summaries) <= keep:
+            return previous_summaries, None
+        
+        previous_summaries = sorted(previous_summaries, key=itemgetter('chapter_number'))
+        earlier, recent = previous_summaries[:-keep], previous_summaries[-keep:]
+        if not Config.ROLLING_SUMMARY:
+            return recent, None
+        return recent, self._rolling_summary(book, earlier)
+    
+    def _rolling_summary(self, book: Dict[str, Any], earlier: List[Dict[str, Any]]) -> str:
+        """
+        Rolling summary of the given chapters, extended incrementally.
+        
+        Sequential generation moves the window one chapter at a time, so each
+        new chapter usually folds a single summary into the stored one.
+        """
+        book_id = book['id']
+        through = earlier[-1]['chapter_number']
         
-        return "\n\n".join(context_parts)
+        with self._context_lock:
+            folded, running = self._rolling_summaries.get(book_id, (0, None))
+        if folded > through:
+            folded, running = 0, None
+        if folded == through:
+            return running
+        
+        # The LLM call runs outside the lock so workers can keep saving chapters
+        running = self.llm.condense_summaries(
+            book['title'], running, [ch for ch in earlier if ch['chapter_number'] > folded]
+        )
+        with self._context_lock:
+            # Store it only if no folded chapter got a new summary meanwhile
+            entries = self._context_cache.get(book_id, {})
+            if all(entries.get(ch['chapter_number']) == ch for ch in earlier):
+                self._rolling_summaries[book_id] = (through, running)
+        return running
     
     # ==========================================================================
     # CHAPTER GENERATION
     # ==========================================================================
     
-    def generate_chapter(self, book_id: str, chapter_number: int) -> Dict[str, Any]:
+    def _prepare_chapter(
+        self,
+        book_id: str,
+        chapter_number: int,
+        book: Optional[Dict[str, Any]] = None,
+        chapter: Optional[Dict[str, Any]] = None,
+        previous_summaries: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Load the book, chapter record and previous-chapter context for generation.
+        
+        Anything passed in by the caller is used as-is instead of being re-fetched.
+        
+        Returns:
+            Dict with 'book', 'chapter', 'previous_summaries' and
+            'earlier_summary' keys
+        """
+        if book is None:
+            book = self.db.get_book(book_id)
+            if not book:
+                raise ValueError(f"Book not found: {book_id}")
+        
+        # Get chapter record (looked up by number in the database, not by
+        # scanning every chapter of the book)
+        if chapter is None:
+            chapter = self.db.get_chapter_by_number(book_id, chapter_number)
+        
+        if not chapter:
+            raise ValueError(f"Chapter {chapter_number} not found for this book")
+        
+        # Get context from previous chapters (not needed if already generated);
+        # reloaded from the database unless the caller's run already holds it
+        if chapter.get('content'):
+            previous_summaries = []
+        elif previous_summaries is None:
+            previous_summaries = self.get_previous_summaries(book_id, chapter_number, refresh=True)
+        
+        # Bound the prompt: recent summaries in full, older ones condensed
+        previous_summaries, earlier_summary = self._window_context(book, previous_summaries)
+        
+        return {
+            'book': book,
+            'chapter': chapter,
+            'previous_summaries': previous_summaries,
+            'earlier_summary': earlier_summary
+        }
+    
+    def _save_chapter(self, chapter: Dict[str, Any], content: str, summary: str) -> Dict[str, Any]:
+        """Store generated content and summary, then mark the chapter for review."""
+        # One write; notes_status 'yes' means waiting for review
+        self.db.update_chapter_content(
+            chapter_id=chapter['id'],
+            content=content,
+            summary=summary,
+            status="generated",
+            notes_status="yes"
+        )
+        updated = {
+            **chapter,
+            'content': content,
+            'summary': summary,
+            'status': "generated",
+            'notes_status': "yes"
+        }
+        self._cache_context(chapter['book_id'], updated)
+        
+        logger.info("✅ Chapter %s generated (%d chars)", chapter['chapter_number'], len(content))
+        logger.info("   📝 Summary: %.100s...", summary)
+        
+        return updated
+    
+    def _finish_chapter(self, chapter: Dict[str, Any], args: Dict[str, Any], content: str) -> Dict[str, Any]:
+        """Summarize freshly written content and store both on the chapter."""
+        summary = self.llm.summarize_chapter(
+            args['title'], args['chapter_number'], args['chapter_title'], content
+        )
+        return self._save_chapter(chapter, content, summary)
+    
+    def _llm_chapter_args(self, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """Keyword arguments for LLMService.generate_chapter / stream_chapter."""
+        book, chapter = prepared['book'], prepared['chapter']
+        chapter_number = chapter['chapter_number']
+        return {
+            "title": book['title'],
+            "outline": book['outline'],
+            "chapter_number": chapter_number,
+            "chapter_title": chapter.get('title', f'Chapter {chapter_number}'),
+            # Deterministic order keeps the prompt prefix stable across chapters
+            "previous_summaries": sorted(
+                prepared['previous_summaries'], key=itemgetter('chapter_number')
+            ),
+            "chapter_notes": chapter.get('notes'),
+            "earlier_summary": prepared['earlier_summary']
+        }
+    
+    def generate_chapter(
+        self,
+        book_id: str,
+        chapter_number: int,
+        *,
+        book: Optional[Dict[str, Any]] = None,
+        chapter: Optional[Dict[str, Any]] = None,
+        previous_summaries: Optional[List[Dict[str, Any]]] = None,
+        cache_name: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Generate a single chapter with context from previous chapters.
         
         Args:
             book_id: The book ID
             chapter_number: Chapter number to generate
+            book: Already-loaded book record (fetched if omitted)
+            chapter: Already-loaded chapter record (fetched if omitted)
+            previous_summaries: Context for the LLM (built from the database if omitted)
+            cache_name: Explicit LLM cache holding the book's outline, if any
             
         Returns:
             Updated chapter record
         """
+        prepared = self._prepare_chapter(
+            book_id, chapter_number, book, chapter, previous_summaries
+        )
+        return self.generate_prepared_chapter(prepared, cache_name)
+    
+    def prepare_chapters(self, book_id: str, chapter_numbers: List[int]) -> List[Dict[str, Any]]:
+        """
+        Build the generation context for several chapters up front.
+        
+        Run this on the coordinating thread and hand each result to
+        generate_prepared_chapter in a worker: summaries are loaded once and
+        rolling summaries condensed once, not in every worker.
+        
+        Args:
+            book_id: The book ID
+            chapter_numbers: Chapters to prepare, in order
+            
+        Returns:
+            One prepared context per chapter
+        """
         book = self.db.get_book(book_id)
         if not book:
             raise ValueError(f"Book not found: {book_id}")
         
-        # Get chapter record
-        chapters = self.db.get_book_chapters(book_id)
-        chapter = next((c for c in chapters if c['chapter_number'] == chapter_number), None)
+        # Start from the summaries currently in the database
+        self._seed_context_cache(book_id, self.db.get_chapters_with_summaries(book_id))
+        return [
+            self._prepare_chapter(
+                book_id, number, book,
+                previous_summaries=self.get_previous_summaries(book_id, number)
+            )
+            for number in chapter_numbers
+        ]
+    
+    def generate_prepared_chapter(
+        self,
+        prepared: Dict[str, Any],
+        cache_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a chapter from a context built by prepare_chapters.
         
-        if not chapter:
-            raise ValueError(f"Chapter {chapter_number} not found for this book")
+        Safe to call from several worker threads at once.
+        
+        Returns:
+            Updated chapter record
+        """
+        chapter = prepared['chapter']
+        chapter_number = chapter['chapter_number']
         
         # Check if already generated
         if chapter.get('content'):
-            print(f"⚠️  Chapter {chapter_number} already has content")
+            logger.warning("⚠️  Chapter %s already has content", chapter_number)
             return chapter
         
-        # Get context from previous chapters
-        context = self.get_context_for_chapter(book_id, chapter_number)
-        previous_summaries = []
-        
-        if context:
-            # Parse context into list format for LLM
-            summaries = self.db.get_chapter_summaries(book_id, chapter_number - 1)
-            previous_summaries = [
-                {
-                    'chapter_number': s['chapter_number'],
-                    'title': s.get('title', ''),
-                    'summary': s.get('summary', '')
-                }
-                for s in summaries
-            ]
-        
-        print(f"\n🤖 Generating Chapter {chapter_number}: {chapter.get('title', 'Untitled')}...")
-        if previous_summaries:
-            print(f"   📚 Using context from {len(previous_summaries)} previous chapter(s)")
+        logger.info("🤖 Generating Chapter %s: %s...", chapter_number, chapter.get('title', 'Untitled'))
+        if prepared['previous_summaries']:
+            logger.info("   📚 Using context from %d previous chapter(s)", len(prepared['previous_summaries']))
         
         # Update status to generating
         self.db.update_chapter(chapter['id'], status="generating")
         
         try:
-            # Generate chapter content
-            result = self.llm.generate_chapter(
-                title=book['title'],
-                outline=book['outline'],
-                chapter_number=chapter_number,
-                chapter_title=chapter.get('title', f'Chapter {chapter_number}'),
-                previous_summaries=previous_summaries,
-                chapter_notes=chapter.get('notes')
-            )
-            
-            # Store content and summary
-            updated = self.db.update_chapter_content(
-                chapter_id=chapter['id'],
-                content=result['content'],
-                summary=result['summary'],
-                status="generated"
-            )
+            # Content and summary come back from one (streamed) LLM call
+            result = self.llm.generate_chapter(**self._llm_chapter_args(prepared), cache_name=cache_name)
+            return self._save_chapter(chapter, result['content'], result['summary'])
             
-            # Set notes_status to 'yes' - waiting for review
-            self.db.update_chapter(chapter['id'], notes_status="yes")
+        except Exception as e:
+            self.db.update_chapter(chapter['id'], status="error")
+            raise e
+    
+    def stream_chapter(self, book_id: str, chapter_number: int) -> Iterator[str]:
+        """
+        Generate a single chapter, yielding its text as it arrives.
+        
+        The chapter is saved with its summary once the stream is exhausted,
+        exactly as generate_chapter would save it.
+        
+        Args:
+            book_id: The book ID
+            chapter_number: Chapter number to generate
             
-            print(f"✅ Chapter {chapter_number} generated ({len(result['content'])} chars)")
-            print(f"   📝 Summary: {result['summary'][:100]}...")
+        Yields:
+            Chunks of chapter content
+        """
+        prepared = self._prepare_chapter(book_id, chapter_number)
+        chapter = prepared['chapter']
+        
+        # Check if already generated
+        if chapter.get('content'):
+            logger.warning("⚠️  Chapter %s already has content", chapter_number)
+            yield chapter['content']
+            return
+        
+        logger.info("🤖 Streaming Chapter %s: %s...", chapter_number, chapter.get('title', 'Untitled'))
+        
+        # Update status to generating
+        self.db.update_chapter(chapter['id'], status="generating")
+        
+        try:
+            args = self._llm_chapter_args(prepared)
+            parts = []
+            for text in self.llm.stream_chapter(**args):
+                parts.append(text)
+                yield text
             
-            return updated
+            self._finish_chapter(chapter, args, "".join(parts))
             
+        except GeneratorExit:
+            # The caller stopped reading (e.g. a Streamlit rerun); nothing was saved
+            logger.warning(
+                "⚠️  Chapter %s stream closed early, discarding %d chars", chapter_number, sum(map(len, parts))
+            )
+            self.db.update_chapter(chapter['id'], status="pending")
+            raise
         except Exception as e:
             self.db.update_chapter(chapter['id'], status="error")
             raise e
     
-    def generate_all_chapters(self, book_id: str, auto_approve: bool = False) -> List[Dict[str, Any]]:
+    def generate_all_chapters(
+        self,
+        book_id: str,
+        auto_approve: bool = False,
+        parallel: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Generate all chapters for a book sequentially.
+        Generate all chapters for a book.
+        
+        Chapters are written in order so each one gets the summaries of the
+        chapters before it. With more than one worker, the chapters that are
+        due are written concurrently instead; they only get context from
+        chapters finished before this run, which suits books whose chapters
+        stand on their own.
         
         Args:
             book_id: The book ID
             auto_approve: If True, automatically approve chapters without waiting
+            parallel: Number of concurrent workers. Defaults to
+                      Config.CHAPTER_WORKERS when PARALLEL_CHAPTERS is on, else 1
             
         Returns:
             List of generated chapter records
         """
+        book, due = self._due_chapters(book_id, auto_approve)
+        
+        if parallel is None:
+            parallel = Config.CHAPTER_WORKERS if Config.PARALLEL_CHAPTERS else 1
+        
+        with self._book_cache(book, due) as cache_name:
+            if parallel > 1 and len(due) > 1:
+                return self._generate_chapters_parallel(book, due, parallel, auto_approve, cache_name)
+            
+            generated = []
+            for chapter in due:
+                # Generate chapter
+                result = self.generate_chapter(
+                    book_id,
+                    chapter['chapter_number'],
+                    book=book,
+                    chapter=chapter,
+                    previous_summaries=self.get_previous_summaries(book_id, chapter['chapter_number']),
+                    cache_name=cache_name
+                )
+                generated.append(result)
+                
+                # If auto_approve, mark as approved immediately
+                if auto_approve:
+                    self.approve_chapter(chapter['id'])
+        
+        return generated
+    
+    @contextmanager
+    def _book_cache(self, book: Dict[str, Any], due: List[Dict[str, Any]]) -> Iterator[Optional[str]]:
+        """
+        Hold the book's outline in an explicit LLM cache for a multi-chapter run.
+        
+        Yields the cache name, or None for single-chapter runs and when the
+        cache can't be created; chapters then get the full prompt.
+        """
+        cache_name = None
+        if len(due) > 1:
+            cache_name = self.llm.create_book_cache(book['title'], book['outline'])
+            if cache_name:
+                logger.info("🗄️  Cached book outline for %d chapters", len(due))
+        try:
+            yield cache_name
+        finally:
+            if cache_name:
+                self.llm.delete_book_cache(cache_name)
+    
+    @asynccontextmanager
+    async def _abook_cache(self, book: Dict[str, Any], due: List[Dict[str, Any]]) -> AsyncIterator[Optional[str]]:
+        """
+        Async version of _book_cache.
+        
+        The cache is created and deleted with awaited calls, so other books
+        sharing the event loop keep running meanwhile.
+        """
+        cache_name = None
+        if len(due) > 1:
+            cache_name = await self.llm.acreate_book_cache(book['title'], book['outline'])
+            if cache_name:
+                logger.info("🗄️  Cached book outline for %d chapters", len(due))
+        try:
+            yield cache_name
+        finally:
+            if cache_name:
+                await self.llm.adelete_book_cache(cache_name)
+    
+    def _due_chapters(
+        self, book_id: str, auto_approve: bool
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Load a book and gate its chapters for a generation run.
+        
+        Returns:
+            The book record and the chapters to write, in order, up to the
+            first chapter waiting for notes
+        """
         book = self.db.get_book(book_id)
         if not book:
             raise ValueError(f"Book not found: {book_id}")
@@ -263,34 +711,168 @@ class ChapterGenerator:
                 "Set status_outline_notes to 'no_notes_needed' to proceed."
             )
         
-        chapters = self.db.get_book_chapters(book_id)
+        # Gating re-reads each chapter, so the listing only needs what seeds the context
+        chapters = self.db.get_book_chapters(book_id, columns="id,chapter_number,title,summary")
         if not chapters:
-            print("📚 No chapters found. Initializing from outline...")
+            logger.info("📚 No chapters found. Initializing from outline...")
             chapters = self.initialize_chapters_for_book(book_id)
         
-        generated = []
+        # Start this run from the freshly loaded summaries
+        self._seed_context_cache(book_id, chapters)
+        
+        # Gate first: everything up to the first chapter waiting for notes
+        due = []
         for chapter in chapters:
             # Check gating status
             status = self.check_chapter_status(chapter['id'])
             
             if status['action'] == 'skip':
-                print(f"⏭️  Skipping Chapter {chapter['chapter_number']} - already completed")
+                logger.info("⏭️  Skipping Chapter %s - already completed", chapter['chapter_number'])
                 continue
             
             if status['action'] == 'wait' and not auto_approve:
-                print(f"⏸️  Pausing at Chapter {chapter['chapter_number']} - waiting for notes")
+                logger.info("⏸️  Pausing at Chapter %s - waiting for notes", chapter['chapter_number'])
                 break
             
-            # Generate chapter
-            result = self.generate_chapter(book_id, chapter['chapter_number'])
-            generated.append(result)
+            due.append(status['chapter'])
+        
+        return book, due
+    
+    def _generate_chapters_parallel(
+        self,
+        book: Dict[str, Any],
+        chapters: List[Dict[str, Any]],
+        workers: int,
+        auto_approve: bool,
+        cache_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Write several chapters concurrently.
+        
+        A chapter that fails is logged and left out; the others are still
+        returned (in chapter order) and, with auto_approve, approved.
+        """
+        book_id = book['id']
+        logger.info(
+            "⚡ Writing %d chapters with %d workers (no context chaining within the batch)",
+            len(chapters), workers
+        )
+        
+        # Context is built here, on the coordinating thread, so rolling
+        # summaries are condensed once rather than in every worker
+        prepared = [
+            self._prepare_chapter(
+                book_id, chapter['chapter_number'], book, chapter,
+                self.get_previous_summaries(book_id, chapter['chapter_number'])
+            )
+            for chapter in chapters
+        ]
+        
+        # LLM calls are network-bound, so threads overlap them well
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.generate_prepared_chapter, context, cache_name)
+                for context in prepared
+            ]
+        
+        generated = []
+        for chapter, future in zip(chapters, futures):
+            try:
+                generated.append(future.result())
+            except Exception as e:
+                logger.error("❌ Chapter %s failed: %s", chapter['chapter_number'], e)
+        
+        if len(generated) < len(chapters):
+            logger.warning("⚠️  %d of %d chapters failed", len(chapters) - len(generated), len(chapters))
+        
+        if auto_approve and generated:
+            self.approve_chapters([chapter['id'] for chapter in generated])
+        
+        return generated
+    
+    # ==========================================================================
+    # MULTI-BOOK GENERATION
+    # ==========================================================================
+    
+    async def agenerate_chapter(
+        self,
+        book: Dict[str, Any],
+        chapter: Dict[str, Any],
+        cache_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async version of generate_chapter for a chapter that is due.
+        
+        The LLM calls are awaited on the event loop; the (short) database
+        calls run in a worker thread so they don't stall other books.
+        """
+        book_id = book['id']
+        chapter_number = chapter['chapter_number']
+        # The run's summaries were loaded by _due_chapters; use the cached ones
+        prepared = await asyncio.to_thread(
+            lambda: self._prepare_chapter(
+                book_id, chapter_number, book, chapter,
+                self.get_previous_summaries(book_id, chapter_number)
+            )
+        )
+        chapter = prepared['chapter']
+        
+        if chapter.get('content'):
+            logger.warning("⚠️  Chapter %s already has content", chapter_number)
+            return chapter
+        
+        logger.info("🤖 [%s] Generating Chapter %s: %s...", book['title'], chapter_number, chapter.get('title', 'Untitled'))
+        await asyncio.to_thread(self.db.update_chapter, chapter['id'], status="generating")
+        
+        try:
+            result = await self.llm.agenerate_chapter(**self._llm_chapter_args(prepared), cache_name=cache_name)
+            return await asyncio.to_thread(
+                self._save_chapter, chapter, result['content'], result['summary']
+            )
             
-            # If auto_approve, mark as approved immediately
-            if auto_approve:
-                self.approve_chapter(chapter['id'])
+        except Exception as e:
+            await asyncio.to_thread(self.db.update_chapter, chapter['id'], status="error")
+            raise e
+    
+    async def agenerate_all_chapters(self, book_id: str, auto_approve: bool = False) -> List[Dict[str, Any]]:
+        """
+        Async version of generate_all_chapters.
+        
+        Chapters of the book are still written one after another so context
+        chaining is kept; the concurrency is between books.
+        """
+        book, due = await asyncio.to_thread(self._due_chapters, book_id, auto_approve)
+        
+        generated = []
+        async with self._abook_cache(book, due) as cache_name:
+            for chapter in due:
+                generated.append(await self.agenerate_chapter(book, chapter, cache_name))
+                
+                if auto_approve:
+                    await asyncio.to_thread(self.approve_chapter, chapter['id'])
         
         return generated
     
+    def generate_books(self, book_ids: List[str], auto_approve: bool = False) -> Dict[str, Any]:
+        """
+        Generate chapters for several books concurrently on one event loop.
+        
+        Args:
+            book_ids: Books to generate
+            auto_approve: If True, automatically approve chapters without waiting
+            
+        Returns:
+            Dict of book_id -> list of generated chapter records, or the
+            exception that stopped that book
+        """
+        async def run():
+            return await asyncio.gather(
+                *(self.agenerate_all_chapters(book_id, auto_approve) for book_id in book_ids),
+                return_exceptions=True
+            )
+        
+        return dict(zip(book_ids, asyncio.run(run())))
+    
     # ==========================================================================
     # GATING LOGIC
     # ==========================================================================
@@ -316,45 +898,17 @@ class ChapterGenerator:
         
         # Already approved
         if notes_status == 'no_notes_needed' or content_status == 'approved':
-            return {
-                "status": notes_status,
-                "action": "skip",
-                "message": "Chapter already approved",
-                "chapter": chapter
-            }
-        
-        # Has content and notes provided - ready to regenerate
-        if chapter.get('content') and chapter.get('notes') and notes_status == 'yes':
-            return {
-                "status": notes_status,
-                "action": "regenerate",
-                "message": "Notes provided. Ready to regenerate.",
-                "chapter": chapter
-            }
-        
-        # Has content, waiting for notes
-        if chapter.get('content') and notes_status == 'yes':
-            return {
-                "status": notes_status,
-                "action": "wait",
-                "message": "Waiting for editor review/notes",
-                "chapter": chapter
-            }
-        
-        # No content yet - needs generation
-        if not chapter.get('content'):
-            return {
-                "status": content_status,
-                "action": "generate",
-                "message": "Ready for generation",
-                "chapter": chapter
-            }
-        
-        # Default: paused
+            action, message = "skip", "Chapter already approved"
+        else:
+            key = (bool(chapter.get('content')), bool(chapter.get('notes')), notes_status == 'yes')
+            action, message = _CHAPTER_ACTIONS.get(
+                key, ("pause", f"Paused. Status: {notes_status}")
+            )
+        
         return {
-            "status": notes_status,
-            "action": "pause",
-            "message": f"Paused. Status: {notes_status}",
+            "status": content_status if action == "generate" else notes_status,
+            "action": action,
+            "message": message,
             "chapter": chapter
         }
     
@@ -367,6 +921,15 @@ class ChapterGenerator:
         )
         return {"success": True, "message": "Chapter approved"}
     
+    def approve_chapters(self, chapter_ids: List[str]) -> Dict[str, Any]:
+        """Approve several chapters with a single database update."""
+        updated = self.db.update_chapters(
+            chapter_ids,
+            notes_status="no_notes_needed",
+            status="approved"
+        )
+        return {"success": True, "message": f"{len(updated)} chapter(s) approved"}
+    
     def regenerate_chapter(self, chapter_id: str) -> Dict[str, Any]:
         """Regenerate a chapter based on editor notes."""
         chapter = self.db.get_chapter(chapter_id)
@@ -378,7 +941,7 @@ class ChapterGenerator:
         
         book = self.db.get_book(chapter['book_id'])
         
-        print(f"\n🔄 Regenerating Chapter {chapter['chapter_number']}...")
+        logger.info("🔄 Regenerating Chapter %s...", chapter['chapter_number'])
         
         result = self.llm.regenerate_chapter(
             title=book['title'],
@@ -397,8 +960,9 @@ class ChapterGenerator:
             notes_status="yes",  # Back to waiting for review
             status="generated"
         )
+        self._cache_context(chapter['book_id'], {**chapter, 'summary': result['summary']})
         
-        print(f"✅ Chapter regenerated ({len(result['content'])} chars)")
+        logger.info("✅ Chapter regenerated (%d chars)", len(result['content']))
         return {"success": True, "content_length": len(result['content'])}
     
     # ==========================================================================
@@ -411,27 +975,35 @@ class ChapterGenerator:
         if not book:
             return {"error": "Book not found"}
         
-        chapters = self.db.get_book_chapters(book_id)
+        # Counts only need to know whether content exists, not the text
+        chapters = self.db.get_book_chapters_meta(book_id)
+        
+        # Tally everything in one pass over the chapters
+        generated = approved = waiting_review = 0
+        chapter_rows = []
+        for c in chapters:
+            has_content = bool(c.get('has_content'))
+            generated += has_content
+            approved += c.get('status') == 'approved'
+            waiting_review += c.get('notes_status') == 'yes'
+            chapter_rows.append({
+                "number": c['chapter_number'],
+                "title": c.get('title', ''),
+                "status": c.get('status'),
+                "notes_status": c.get('notes_status'),
+                "has_content": has_content,
+                "has_summary": bool(c.get('summary'))
+            })
         
         return {
             "book_id": book_id,
             "title": book['title'],
             "total_chapters": len(chapters),
-            "generated": len([c for c in chapters if c.get('content')]),
-            "approved": len([c for c in chapters if c.get('status') == 'approved']),
-            "pending": len([c for c in chapters if not c.get('content')]),
-            "waiting_review": len([c for c in chapters if c.get('notes_status') == 'yes']),
-            "chapters": [
-                {
-                    "number": c['chapter_number'],
-                    "title": c.get('title', ''),
-                    "status": c.get('status'),
-                    "notes_status": c.get('notes_status'),
-                    "has_content": bool(c.get('content')),
-                    "has_summary": bool(c.get('summary'))
-                }
-                for c in chapters
-            ]
+            "generated": generated,
+            "approved": approved,
+            "pending": len(chapters) - generated,
+            "waiting_review": waiting_review,
+            "chapters": chapter_rows
         }
 
 
@@ -439,6 +1011,7 @@ class ChapterGenerator:
 # TEST
 # ==========================================================================
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("=" * 70)
     print("CHAPTER GENERATOR TEST")
     print("=" * 70)
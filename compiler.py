@@ -4,28 +4,237 @@ Handles Stage 3: Final book compilation into .docx, .pdf, and .txt formats.
 With improved formatting and professional styling.
 """
 
+import io
+import logging
 import os
 import re
+import textwrap
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple, Iterator, Sequence, NamedTuple
 from datetime import datetime
 
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-from docx.enum.style import WD_STYLE_TYPE
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, ListFlowable, ListItem
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
-
 from database import Database
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+
+# python-docx and reportlab are imported inside the methods that use them,
+# so TXT-only builds and gating checks don't pay for loading them
+if TYPE_CHECKING:
+    from docx.document import Document
+
+
+# Emphasis/code delimiters stripped by MarkdownParser.clean_markdown, in
+# order. The order matters - e.g. '***x***' relies on bold going first.
+_EMPHASIS_DELIMITERS = ('**', '*', '__', '_', '`')
+
+def _is_rule_line(line: str) -> bool:
+    """True for a horizontal rule: a line of three or more '-'/'*' only."""
+    return len(line) >= 3 and not line.strip('-*')
+
+
+def _blank_rule_lines(text: str) -> str:
+    """Blank out horizontal rule lines (the line break itself is kept)."""
+    lines = text.split('\n')
+    return '\n'.join('' if _is_rule_line(line) else line for line in lines)
+
+
+# Remaining passes, applied after the delimiters:
+# (literal markers, any of which must be present, transform).
+_MD_CLEAN_PASSES = (
+    (('](',), partial(re.compile(r'\[([^\]]+)\]\([^)]+\)').sub, r'\1')),  # [link](url) - keep link text
+    (('--', '**', '-*', '*-'), _blank_rule_lines),                       # --- or *** horizontal rules
+    (('\n\n\n',), partial(re.compile(r'\n{3,}').sub, '\n\n')),            # multiple newlines
+)
+
+# Every marker that can make any delimiter or pass above do something
+_MD_MARKERS = ('*', '_', '`', '](', '--', '\n\n\n')
+
+
+def _delimited_spans(text: str, delim: str) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) of each delim...delim span in text, found with str.find.
+    
+    Matches what re.finditer(r'<delim>([^<c>]+)<delim>') would find, where <c>
+    is the delimiter character: inner text is non-empty and never contains it.
+    """
+    size = len(delim)
+    char = delim[0]
+    start = text.find(delim)
+    
+    while start != -1:
+        end = text.find(char, start + size)
+        if end == -1:
+            return
+        if end > start + size and text.startswith(delim, end):
+            yield start, end + size
+            start = text.find(delim, end + size)
+        else:
+            # No valid span opens here; try the next occurrence
+            start = text.find(delim, start + 1)
+
+
+def _strip_delimited(text: str, delim: str) -> str:
+    """Replace each delim...delim span with its inner text."""
+    size = len(delim)
+    parts = []
+    pos = 0
+    for start, end in _delimited_spans(text, delim):
+        parts.append(text[pos:start])
+        parts.append(text[start + size:end - size])
+        pos = end
+    
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+_NUM_LIST_RE = re.compile(r'^\d+\.\s')
+_NUM_LIST_ITEM_RE = re.compile(r'^\d+\.\s*(.+)')
+
+
+def _clean_with(text: str, delimiters: Tuple[str, ...]) -> str:
+    """Strip the given emphasis delimiters, then run the regex passes."""
+    # Fast path for text with no markup at all, which is most headings
+    # and list items - one scan per marker and no per-pass loop
+    if not any(marker in text for marker in _MD_MARKERS):
+        return text.strip()
+    
+    # Otherwise each pass runs only if its own marker occurs
+    for delim in delimiters:
+        if delim in text:
+            text = _strip_delimited(text, delim)
+    
+    for markers, transform in _MD_CLEAN_PASSES:
+        if any(marker in text for marker in markers):
+            text = transform(text)
+    
+    return text.strip()
+
+
+@lru_cache(maxsize=4096)
+def _clean_markdown(text: str) -> str:
+    """Body of MarkdownParser.clean_markdown, memoized: writers clean the same text repeatedly."""
+    return _clean_with(text, _EMPHASIS_DELIMITERS)
+
+
+@lru_cache(maxsize=4096)
+def _clean_inline_no_bold(text: str) -> str:
+    """
+    clean_markdown for a part returned by extract_bold_text. Those parts
+    hold no complete '**' span any more, so the bold pass is skipped.
+    """
+    return _clean_with(text, _EMPHASIS_DELIMITERS[1:])
+
+
+class _SafeTitleTable(dict):
+    """
+    str.translate table that keeps alphanumerics, spaces, '-' and '_' and
+    drops everything else. Entries are filled in on first lookup, so only
+    codepoints that actually occur in titles are ever stored.
+    """
+    
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        keep = codepoint if char.isalnum() or char in ' -_' else None
+        self[codepoint] = keep
+        return keep
+
+
+_SAFE_TITLE_TABLE = _SafeTitleTable()
+
+
+def _safe_title(title: str) -> str:
+    """Reduce a book title to characters that are safe in a filename."""
+    return title.translate(_SAFE_TITLE_TABLE).strip()
+
+
+def _generated_date() -> str:
+    """Today's date as printed on the title pages."""
+    return datetime.now().strftime('%B %d, %Y')
+
+
+# ==========================================================================
+# BLOCK PARSERS
+# Each takes a stripped, non-empty paragraph and returns its block, or None
+# if the paragraph turns out to be plain text.
+# ==========================================================================
+
+def _heading_block(para: str) -> Optional[Dict]:
+    """'# ' to '#### ' headings."""
+    level = len(para) - len(para.lstrip('#'))
+    if level <= 4 and para[level:level + 1] == ' ':
+        return {'type': f'h{level}', 'text': para[level + 1:].strip()}
+    return None
+
+
+def _bullet_list_block(para: str) -> Optional[Dict]:
+    """'- ' or '* ' bullet lists."""
+    if para[1:2] != ' ':
+        return None
+    items = []
+    for line in para.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith(('- ', '* ')):
+            items.append(stripped[2:])
+    return {'type': 'bullet_list', 'items': items}
+
+
+def _numbered_list_block(para: str) -> Optional[Dict]:
+    """'1. ' numbered lists."""
+    if not _NUM_LIST_RE.match(para):
+        return None
+    items = []
+    for line in para.split('\n'):
+        match = _NUM_LIST_ITEM_RE.match(line.strip())
+        if match:
+            items.append(match.group(1))
+    return {'type': 'numbered_list', 'items': items}
+
+
+def _quote_block(para: str) -> Optional[Dict]:
+    """'> ' blockquotes."""
+    if para[1:2] != ' ':
+        return None
+    quote_text = '\n'.join(line[2:] if line.startswith('> ') else line for line in para.split('\n'))
+    return {'type': 'quote', 'text': quote_text}
+
+
+def _code_block(para: str) -> Optional[Dict]:
+    """Fenced code blocks - just included as plain text."""
+    if not para.startswith('```'):
+        return None
+    code = para.strip('`').strip()
+    if code.split('\n')[0].isalpha():  # Language identifier
+        code = '\n'.join(code.split('\n')[1:])
+    return {'type': 'code', 'text': code}
+
+
+# First character of a paragraph -> parser (numbered lists are matched on
+# any decimal digit, see parse_content)
+_BLOCK_PARSERS = {
+    '#': _heading_block,
+    '-': _bullet_list_block,
+    '*': _bullet_list_block,
+    '>': _quote_block,
+    '`': _code_block,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    """A parsed content block, with its markdown-cleaned text precomputed."""
+    kind: str
+    text: str = ""
+    clean: str = ""
+    items: Tuple[str, ...] = ()
+    items_clean: Tuple[str, ...] = ()
+
 
 class MarkdownParser:
     """Parse and clean markdown content for document formatting."""
@@ -35,40 +244,24 @@ class MarkdownParser:
         """Remove raw markdown syntax and clean up text."""
         if not text:
             return ""
-        
-        # Remove ** bold markers
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)
-        # Remove * italic markers
-        text = re.sub(r'\*([^*]+)\*', r'\1', text)
-        # Remove __ bold markers
-        text = re.sub(r'__([^_]+)__', r'\1', text)
-        # Remove _ italic markers
-        text = re.sub(r'_([^_]+)_', r'\1', text)
-        # Remove ` code markers
-        text = re.sub(r'`([^`]+)`', r'\1', text)
-        # Remove [link](url) - keep link text
-        text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-        # Remove --- or *** horizontal rules
-        text = re.sub(r'^[-*]{3,}$', '', text, flags=re.MULTILINE)
-        # Clean up multiple newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        
-        return text.strip()
+        return _clean_markdown(text)
     
     @staticmethod
     def extract_bold_text(text: str) -> List[Tuple[str, bool]]:
         """Extract text with bold formatting info."""
+        if '**' not in text:
+            return [(text, False)]
+        
         parts = []
-        pattern = r'\*\*([^*]+)\*\*'
         last_end = 0
         
-        for match in re.finditer(pattern, text):
+        for start, end in _delimited_spans(text, '**'):
             # Add text before the match
-            if match.start() > last_end:
-                parts.append((text[last_end:match.start()], False))
+            if start > last_end:
+                parts.append((text[last_end:start], False))
             # Add the bold text
-            parts.append((match.group(1), True))
-            last_end = match.end()
+            parts.append((text[start + 2:end - 2], True))
+            last_end = end
         
         # Add remaining text
         if last_end < len(text):
@@ -86,46 +279,177 @@ class MarkdownParser:
         
         for para in paragraphs:
             para = para.strip()
-            if not para:
+            if not para or _is_rule_line(para):
+                # Blank paragraphs and horizontal rules produce no block
                 continue
             
-            # Detect block type
-            if para.startswith('# '):
-                blocks.append({'type': 'h1', 'text': para[2:].strip()})
-            elif para.startswith('## '):
-                blocks.append({'type': 'h2', 'text': para[3:].strip()})
-            elif para.startswith('### '):
-                blocks.append({'type': 'h3', 'text': para[4:].strip()})
-            elif para.startswith('#### '):
-                blocks.append({'type': 'h4', 'text': para[5:].strip()})
-            elif para.startswith('- ') or para.startswith('* '):
-                # Bullet list
-                items = [line.strip()[2:] for line in para.split('\n') if line.strip().startswith(('- ', '* '))]
-                blocks.append({'type': 'bullet_list', 'items': items})
-            elif re.match(r'^\d+\.\s', para):
-                # Numbered list
-                items = []
-                for line in para.split('\n'):
-                    match = re.match(r'^\d+\.\s*(.+)', line.strip())
-                    if match:
-                        items.append(match.group(1))
-                blocks.append({'type': 'numbered_list', 'items': items})
-            elif para.startswith('> '):
-                # Blockquote
-                quote_text = '\n'.join(line[2:] if line.startswith('> ') else line for line in para.split('\n'))
-                blocks.append({'type': 'quote', 'text': quote_text})
-            elif para.startswith('```'):
-                # Code block - just include as plain text
-                code = para.strip('`').strip()
-                if code.split('\n')[0].isalpha():  # Language identifier
-                    code = '\n'.join(code.split('\n')[1:])
-                blocks.append({'type': 'code', 'text': code})
-            else:
-                # Regular paragraph
-                blocks.append({'type': 'paragraph', 'text': para})
+            # Detect block type from the first character
+            parser = _BLOCK_PARSERS.get(para[0])
+            if parser is None and para[0].isdecimal():
+                parser = _numbered_list_block
+            block = parser(para) if parser else None
+            
+            # Regular paragraph
+            blocks.append(block or {'type': 'paragraph', 'text': para})
         
         return blocks
 
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def parsed_blocks(content: str) -> Tuple[Block, ...]:
+        """
+        Memoized parse_content for the compilers, as Block objects.
+        
+        A book compiled to several formats parses and cleans each chapter
+        once; the writers read block.clean / block.items_clean directly.
+        """
+        clean = MarkdownParser.clean_markdown
+        blocks = []
+        for block in MarkdownParser.parse_content(content):
+            text = block.get('text', '')
+            items = tuple(block.get('items', ()))
+            blocks.append(Block(
+                kind=block['type'],
+                text=text,
+                clean=clean(text),
+                items=items,
+                items_clean=tuple(clean(item) for item in items)
+            ))
+        return tuple(blocks)
+
+
+# ==========================================================================
+# PDF LAYOUT
+# Text is drawn straight onto a reportlab canvas. Platypus Paragraphs
+# re-parse every string as XML markup and run a full frame layout, which
+# dominated PDF build time; plain lines of text need neither.
+# ==========================================================================
+
+class _PdfStyle(NamedTuple):
+    """Font and spacing for one kind of PDF text, in points."""
+    font: str
+    size: float
+    leading: float
+    color: str = '#000000'
+    align: str = 'left'  # 'left', 'center' or 'justify'
+    space_before: float = 0
+    space_after: float = 0
+    left_indent: float = 0
+    right_indent: float = 0
+    first_indent: float = 0
+
+
+_PDF_STYLES = {
+    'title': _PdfStyle('Helvetica-Bold', 32, 38, '#2C3E50', 'center', space_after=20),
+    'date': _PdfStyle('Helvetica', 10, 12, '#7F8C8D', 'center'),
+    'chapter': _PdfStyle('Helvetica-Bold', 20, 24, '#2C3E50', space_before=30, space_after=20),
+    'toc': _PdfStyle('Helvetica', 12, 14, space_after=8),
+    'h2': _PdfStyle('Helvetica-Bold', 14, 18, '#34495E', space_before=16, space_after=10),
+    'h3': _PdfStyle('Helvetica-BoldOblique', 12, 14, '#5D6D7E', space_before=12, space_after=8),
+    'body': _PdfStyle('Helvetica', 11, 16, align='justify', space_after=12, first_indent=24),
+    'quote': _PdfStyle('Times-Italic', 10, 14, '#7F8C8D', space_after=12,
+                       left_indent=36, right_indent=36),
+}
+
+
+class _PdfCanvasLayout:
+    """Flows paragraphs top to bottom across the pages of a canvas."""
+    
+    def __init__(self, canvas, pagesize: Tuple[float, float], margin: float):
+        from reportlab.lib.colors import HexColor
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        
+        self.canvas = canvas
+        self.left = margin
+        self.width = pagesize[0] - 2 * margin
+        self.top = pagesize[1] - margin
+        self.bottom = margin
+        self._hex_color = lru_cache(maxsize=None)(HexColor)
+        self._string_width = stringWidth
+        self._new_page_state()
+    
+    def _new_page_state(self):
+        self.y = self.top
+        self.at_top = True   # Nothing placed yet; space_before is dropped here
+        self.blank = True    # Nothing drawn yet; page breaks are no-ops here
+    
+    def page_break(self):
+        """Start a new page, unless the current one is still empty."""
+        if not self.blank:
+            self.canvas.showPage()
+            self._new_page_state()
+    
+    def spacer(self, height: float):
+        """Leave vertical space (not carried over to a new page)."""
+        self.y = max(self.y - height, self.bottom)
+        self.at_top = False
+    
+    def _wrap(self, words: List[str], style: _PdfStyle, width: float) -> List[Tuple[List[str], float]]:
+        """Greedy word wrap using real font metrics. Returns (words, width) per line."""
+        measure = self._string_width
+        space = measure(' ', style.font, style.size)
+        lines = []
+        line, line_width = [], 0.0
+        avail = width - style.first_indent
+        
+        for word in words:
+            word_width = measure(word, style.font, style.size)
+            if line and line_width + space + word_width > avail:
+                lines.append((line, line_width))
+                line, line_width = [word], word_width
+                avail = width
+            else:
+                line_width += space + word_width if line else word_width
+                line.append(word)
+        
+        lines.append((line, line_width))
+        return lines
+    
+    def paragraph(self, text: str, style: _PdfStyle):
+        """Wrap and draw text (whitespace collapsed, as in Platypus)."""
+        words = text.split()
+        if not words:
+            return
+        
+        if not self.at_top:
+            self.y -= style.space_before
+        
+        width = self.width - style.left_indent - style.right_indent
+        lines = self._wrap(words, style, width)
+        
+        text_obj = None
+        for i, (line, line_width) in enumerate(lines):
+            if self.y - style.leading < self.bottom:
+                if text_obj is not None:
+                    self.canvas.drawText(text_obj)
+                    text_obj = None
+                self.canvas.showPage()
+                self._new_page_state()
+            
+            if text_obj is None:
+                text_obj = self.canvas.beginText()
+                text_obj.setFont(style.font, style.size)
+                text_obj.setFillColor(self._hex_color(style.color))
+            
+            self.y -= style.leading
+            indent = style.left_indent + (style.first_indent if i == 0 else 0)
+            avail = width - (style.first_indent if i == 0 else 0)
+            word_space = 0
+            
+            if style.align == 'center':
+                indent += (avail - line_width) / 2
+            elif style.align == 'justify' and i < len(lines) - 1 and len(line) > 1:
+                word_space = (avail - line_width) / (len(line) - 1)
+            
+            text_obj.setTextOrigin(self.left + indent, self.y)
+            text_obj.setWordSpace(word_space)
+            text_obj.textOut(' '.join(line))
+        
+        self.canvas.drawText(text_obj)
+        self.y -= style.space_after
+        self.at_top = False
+        self.blank = False
+
 
 class BookCompiler:
     """Handles final book compilation into various formats with professional formatting."""
@@ -147,8 +471,20 @@ class BookCompiler:
         if not book:
             return {"can_compile": False, "error": "Book not found"}
         
-        chapters = self.db.get_book_chapters(book_id)
+        return self._compilation_status(book, self.db.get_book_chapters(book_id))
+    
+    def _compilation_status(self, book: Dict[str, Any], chapters: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Gating checks for already-loaded book and chapter rows."""
         issues = []
+        chapters = chapters or []
+        
+        # One pass over the chapters for both counts
+        generated = approved = 0
+        for chapter in chapters:
+            if chapter.get('content'):
+                generated += 1
+            if chapter.get('status') == 'approved':
+                approved += 1
         
         final_status = book.get('final_review_notes_status', 'pending')
         if final_status == 'yes':
@@ -156,26 +492,62 @@ class BookCompiler:
         
         if not chapters:
             issues.append("No chapters found")
-        else:
-            pending = [c for c in chapters if not c.get('content')]
-            if pending:
-                issues.append(f"{len(pending)} chapters not generated")
+        elif generated < len(chapters):
+            issues.append(f"{len(chapters) - generated} chapters not generated")
         
         return {
             "can_compile": len(issues) == 0,
             "issues": issues,
-            "total_chapters": len(chapters) if chapters else 0,
-            "generated": len([c for c in chapters if c.get('content')]) if chapters else 0,
-            "approved": len([c for c in chapters if c.get('status') == 'approved']) if chapters else 0,
+            "total_chapters": len(chapters),
+            "generated": generated,
+            "approved": approved,
             "final_status": final_status
         }
     
+    def _load_for_compile(self, book_id: str, force: bool = False) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Load a book and its generated chapters, enforcing the gating checks.
+        
+        Returns:
+            (book, chapters with content)
+        
+        Raises:
+            ValueError: If the book is missing or not ready (unless force)
+        """
+        book = self.db.get_book(book_id)
+        if not book:
+            raise ValueError("Book not found")
+        
+        chapters = self.db.get_book_chapters(book_id)
+        
+        if not force:
+            status = self._compilation_status(book, chapters)
+            if not status['can_compile']:
+                raise ValueError(f"Cannot compile: {', '.join(status['issues'])}")
+        
+        return book, [c for c in chapters if c.get('content')]
+    
+    def _output_path(self, book: Dict[str, Any], ext: str) -> Path:
+        """Output file path for a book in the given format."""
+        return self.output_dir / f"{_safe_title(book['title'])}.{ext}"
+    
+    def _replace_file(self, filepath: Path, data: bytes):
+        """
+        Write a finished document in one go via a temp file, so a failed or
+        interrupted build never leaves a truncated file at the output path.
+        """
+        tmp_path = filepath.with_suffix(filepath.suffix + '.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, filepath)
+    
     # ==========================================================================
     # DOCX COMPILATION
     # ==========================================================================
     
-    def _setup_docx_styles(self, doc: Document):
+    def _setup_docx_styles(self, doc: 'Document'):
         """Configure document styles for professional appearance."""
+        from docx.shared import Pt, RGBColor
+        
         # Set default font
         style = doc.styles['Normal']
         font = style.font
@@ -203,10 +575,9 @@ class BookCompiler:
         h3_style.font.bold = True
         h3_style.font.color.rgb = RGBColor(0x5D, 0x6D, 0x7E)
     
-    def _add_formatted_paragraph(self, doc: Document, text: str, indent: bool = False):
+    def _add_formatted_paragraph(self, doc: 'Document', text: str, indent: bool = False):
         """Add a paragraph with proper formatting, handling markdown."""
-        # Clean markdown but preserve structure
-        clean_text = self.parser.clean_markdown(text)
+        from docx.shared import Inches, Pt
         
         para = doc.add_paragraph()
         para.paragraph_format.space_after = Pt(10)
@@ -218,40 +589,40 @@ class BookCompiler:
         # Handle bold text within paragraph
         parts = self.parser.extract_bold_text(text)
         for text_part, is_bold in parts:
-            clean_part = self.parser.clean_markdown(text_part)
+            clean_part = _clean_inline_no_bold(text_part)
             run = para.add_run(clean_part)
             if is_bold:
                 run.bold = True
     
-    def _add_bullet_list(self, doc: Document, items: List[str]):
-        """Add a formatted bullet list."""
+    def _add_bullet_list(self, doc: 'Document', items: Sequence[str]):
+        """Add a formatted bullet list from already-cleaned items."""
+        from docx.shared import Pt
+        
         for item in items:
             para = doc.add_paragraph(style='List Bullet')
-            clean_item = self.parser.clean_markdown(item)
-            para.add_run(clean_item)
+            para.add_run(item)
             para.paragraph_format.space_after = Pt(4)
     
-    def _add_numbered_list(self, doc: Document, items: List[str]):
-        """Add a formatted numbered list."""
+    def _add_numbered_list(self, doc: 'Document', items: Sequence[str]):
+        """Add a formatted numbered list from already-cleaned items."""
+        from docx.shared import Pt
+        
         for item in items:
             para = doc.add_paragraph(style='List Number')
-            clean_item = self.parser.clean_markdown(item)
-            para.add_run(clean_item)
+            para.add_run(item)
             para.paragraph_format.space_after = Pt(4)
     
     def compile_to_docx(self, book_id: str, force: bool = False) -> str:
         """Compile book to professionally formatted Word document."""
-        book = self.db.get_book(book_id)
-        if not book:
-            raise ValueError("Book not found")
-        
-        if not force:
-            status = self.check_compilation_ready(book_id)
-            if not status['can_compile']:
-                raise ValueError(f"Cannot compile: {', '.join(status['issues'])}")
-        
-        chapters = self.db.get_book_chapters(book_id)
-        chapters = [c for c in chapters if c.get('content')]
+        book, chapters = self._load_for_compile(book_id, force)
+        return self._write_docx(book, chapters)
+    
+    def _write_docx(self, book: Dict[str, Any], chapters: List[Dict[str, Any]],
+                    generated_date: Optional[str] = None) -> str:
+        """Write the Word document from pre-loaded book and chapter rows."""
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Inches, Pt, RGBColor
         
         # Create document
         doc = Document()
@@ -273,7 +644,7 @@ class BookCompiler:
         
         date_para = doc.add_paragraph()
         date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        date_run = date_para.add_run(f"Generated on {datetime.now().strftime('%B %d, %Y')}")
+        date_run = date_para.add_run(f"Generated on {generated_date or _generated_date()}")
         date_run.font.size = Pt(12)
         date_run.font.color.rgb = RGBColor(0x7F, 0x8C, 0x8D)
         
@@ -301,49 +672,49 @@ class BookCompiler:
             
             # Parse and format content
             content = chapter.get('content', '')
-            blocks = self.parser.parse_content(content)
+            blocks = self.parser.parsed_blocks(content)
             
             for block in blocks:
-                if block['type'] == 'h1':
-                    doc.add_heading(self.parser.clean_markdown(block['text']), level=1)
-                elif block['type'] == 'h2':
-                    doc.add_heading(self.parser.clean_markdown(block['text']), level=2)
-                elif block['type'] == 'h3':
-                    doc.add_heading(self.parser.clean_markdown(block['text']), level=3)
-                elif block['type'] == 'h4':
+                if block.kind == 'h1':
+                    doc.add_heading(block.clean, level=1)
+                elif block.kind == 'h2':
+                    doc.add_heading(block.clean, level=2)
+                elif block.kind == 'h3':
+                    doc.add_heading(block.clean, level=3)
+                elif block.kind == 'h4':
                     h4 = doc.add_paragraph()
-                    h4_run = h4.add_run(self.parser.clean_markdown(block['text']))
+                    h4_run = h4.add_run(block.clean)
                     h4_run.bold = True
                     h4_run.font.size = Pt(12)
-                elif block['type'] == 'bullet_list':
-                    self._add_bullet_list(doc, block['items'])
-                elif block['type'] == 'numbered_list':
-                    self._add_numbered_list(doc, block['items'])
-                elif block['type'] == 'quote':
+                elif block.kind == 'bullet_list':
+                    self._add_bullet_list(doc, block.items_clean)
+                elif block.kind == 'numbered_list':
+                    self._add_numbered_list(doc, block.items_clean)
+                elif block.kind == 'quote':
                     quote_para = doc.add_paragraph()
                     quote_para.paragraph_format.left_indent = Inches(0.5)
                     quote_para.paragraph_format.right_indent = Inches(0.5)
-                    quote_run = quote_para.add_run(self.parser.clean_markdown(block['text']))
+                    quote_run = quote_para.add_run(block.clean)
                     quote_run.italic = True
                     quote_run.font.color.rgb = RGBColor(0x7F, 0x8C, 0x8D)
-                elif block['type'] == 'code':
+                elif block.kind == 'code':
                     code_para = doc.add_paragraph()
                     code_para.paragraph_format.left_indent = Inches(0.25)
-                    code_run = code_para.add_run(block['text'])
+                    code_run = code_para.add_run(block.text)
                     code_run.font.name = 'Consolas'
                     code_run.font.size = Pt(9)
                 else:
-                    self._add_formatted_paragraph(doc, block['text'])
+                    self._add_formatted_paragraph(doc, block.text)
             
             doc.add_page_break()
         
         # Save document
-        safe_title = "".join(c for c in book['title'] if c.isalnum() or c in ' -_').strip()
-        filename = f"{safe_title}.docx"
-        filepath = self.output_dir / filename
+        filepath = self._output_path(book, 'docx')
         
-        doc.save(filepath)
-        self.db.update_book(book_id, output_docx_path=str(filepath))
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        self._replace_file(filepath, buffer.getvalue())
+        self.db.update_book(book['id'], output_docx_path=str(filepath))
         
         return str(filepath)
     
@@ -353,162 +724,75 @@ class BookCompiler:
     
     def compile_to_pdf(self, book_id: str, force: bool = False) -> str:
         """Compile book to professionally formatted PDF."""
-        book = self.db.get_book(book_id)
-        if not book:
-            raise ValueError("Book not found")
+        book, chapters = self._load_for_compile(book_id, force)
+        return self._write_pdf(book, chapters)
+    
+    def _write_pdf(self, book: Dict[str, Any], chapters: List[Dict[str, Any]],
+                   generated_date: Optional[str] = None) -> str:
+        """Write the PDF from pre-loaded book and chapter rows."""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.pdfgen.canvas import Canvas
         
-        if not force:
-            status = self.check_compilation_ready(book_id)
-            if not status['can_compile']:
-                raise ValueError(f"Cannot compile: {', '.join(status['issues'])}")
+        filepath = self._output_path(book, 'pdf')
         
-        chapters = self.db.get_book_chapters(book_id)
-        chapters = [c for c in chapters if c.get('content')]
-        
-        # Create PDF
-        safe_title = "".join(c for c in book['title'] if c.isalnum() or c in ' -_').strip()
-        filename = f"{safe_title}.pdf"
-        filepath = self.output_dir / filename
-        
-        doc = SimpleDocTemplate(
-            str(filepath),
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
-        )
-        
-        # Import reportlab color
-        from reportlab.lib.colors import HexColor
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'BookTitle',
-            parent=styles['Heading1'],
-            fontSize=32,
-            alignment=TA_CENTER,
-            spaceAfter=20,
-            textColor=HexColor('#2C3E50')
-        )
-        
-        chapter_title_style = ParagraphStyle(
-            'ChapterTitle',
-            parent=styles['Heading1'],
-            fontSize=20,
-            spaceBefore=30,
-            spaceAfter=20,
-            textColor=HexColor('#2C3E50')
-        )
-        
-        heading2_style = ParagraphStyle(
-            'Heading2Custom',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceBefore=16,
-            spaceAfter=10,
-            textColor=HexColor('#34495E')
-        )
-        
-        heading3_style = ParagraphStyle(
-            'Heading3Custom',
-            parent=styles['Heading3'],
-            fontSize=12,
-            spaceBefore=12,
-            spaceAfter=8,
-            textColor=HexColor('#5D6D7E')
-        )
-        
-        body_style = ParagraphStyle(
-            'BookBody',
-            parent=styles['Normal'],
-            fontSize=11,
-            leading=16,
-            alignment=TA_JUSTIFY,
-            spaceAfter=12,
-            firstLineIndent=24
-        )
-        
-        quote_style = ParagraphStyle(
-            'Quote',
-            parent=styles['Normal'],
-            fontSize=10,
-            leading=14,
-            leftIndent=36,
-            rightIndent=36,
-            textColor='#7F8C8D',
-            fontName='Times-Italic',
-            spaceAfter=12
-        )
-        
-        # Build story
-        story = []
+        buffer = io.BytesIO()
+        pdf = Canvas(buffer, pagesize=letter)
+        pdf.setTitle(book['title'])
+        layout = _PdfCanvasLayout(pdf, letter, margin=72)
+        styles = _PDF_STYLES
         
         # ===== TITLE PAGE =====
-        story.append(Spacer(1, 3*inch))
-        story.append(Paragraph(book['title'], title_style))
-        story.append(Spacer(1, 0.5*inch))
-        
-        date_style = ParagraphStyle('Date', parent=styles['Normal'], alignment=TA_CENTER, textColor='#7F8C8D')
-        story.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y')}", date_style))
-        story.append(PageBreak())
+        layout.spacer(3 * inch)
+        layout.paragraph(book['title'], styles['title'])
+        layout.spacer(0.5 * inch)
+        layout.paragraph(f"Generated on {generated_date or _generated_date()}", styles['date'])
+        layout.page_break()
         
         # ===== TABLE OF CONTENTS =====
-        story.append(Paragraph("Table of Contents", chapter_title_style))
-        story.append(Spacer(1, 0.3*inch))
+        layout.paragraph("Table of Contents", styles['chapter'])
+        layout.spacer(0.3 * inch)
         
-        toc_style = ParagraphStyle('TOC', parent=styles['Normal'], fontSize=12, spaceAfter=8)
         for chapter in chapters:
-            story.append(Paragraph(
+            layout.paragraph(
                 f"Chapter {chapter['chapter_number']}: {chapter.get('title', 'Untitled')}",
-                toc_style
-            ))
-        story.append(PageBreak())
+                styles['toc']
+            )
+        layout.page_break()
         
         # ===== CHAPTERS =====
         for chapter in chapters:
-            story.append(Paragraph(
+            layout.paragraph(
                 f"Chapter {chapter['chapter_number']}: {chapter.get('title', 'Untitled')}",
-                chapter_title_style
-            ))
+                styles['chapter']
+            )
             
             # Parse content
             content = chapter.get('content', '')
-            blocks = self.parser.parse_content(content)
+            blocks = self.parser.parsed_blocks(content)
             
             for block in blocks:
-                text = self.parser.clean_markdown(block.get('text', ''))
-                
-                # Escape XML special characters
-                text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                
-                if block['type'] in ('h1', 'h2'):
-                    story.append(Paragraph(text, heading2_style))
-                elif block['type'] in ('h3', 'h4'):
-                    story.append(Paragraph(text, heading3_style))
-                elif block['type'] == 'bullet_list':
-                    for item in block['items']:
-                        clean_item = self.parser.clean_markdown(item)
-                        clean_item = clean_item.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                        story.append(Paragraph(f"• {clean_item}", body_style))
-                elif block['type'] == 'numbered_list':
-                    for i, item in enumerate(block['items'], 1):
-                        clean_item = self.parser.clean_markdown(item)
-                        clean_item = clean_item.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                        story.append(Paragraph(f"{i}. {clean_item}", body_style))
-                elif block['type'] == 'quote':
-                    story.append(Paragraph(text, quote_style))
+                if block.kind in ('h1', 'h2'):
+                    layout.paragraph(block.clean, styles['h2'])
+                elif block.kind in ('h3', 'h4'):
+                    layout.paragraph(block.clean, styles['h3'])
+                elif block.kind == 'bullet_list':
+                    for clean_item in block.items_clean:
+                        layout.paragraph(f"• {clean_item}", styles['body'])
+                elif block.kind == 'numbered_list':
+                    for i, clean_item in enumerate(block.items_clean, 1):
+                        layout.paragraph(f"{i}. {clean_item}", styles['body'])
+                elif block.kind == 'quote':
+                    layout.paragraph(block.clean, styles['quote'])
                 else:
-                    if text:
-                        story.append(Paragraph(text, body_style))
+                    layout.paragraph(block.clean, styles['body'])
             
-            story.append(PageBreak())
+            layout.page_break()
         
-        # Build PDF
-        doc.build(story)
-        self.db.update_book(book_id, output_pdf_path=str(filepath))
+        # Save PDF
+        pdf.save()
+        self._replace_file(filepath, buffer.getvalue())
+        self.db.update_book(book['id'], output_pdf_path=str(filepath))
         
         return str(filepath)
     
@@ -518,160 +802,201 @@ class BookCompiler:
     
     def compile_to_txt(self, book_id: str, force: bool = False) -> str:
         """Compile book to clean, readable plain text."""
-        book = self.db.get_book(book_id)
-        if not book:
-            raise ValueError("Book not found")
-        
-        if not force:
-            status = self.check_compilation_ready(book_id)
-            if not status['can_compile']:
-                raise ValueError(f"Cannot compile: {', '.join(status['issues'])}")
-        
-        chapters = self.db.get_book_chapters(book_id)
-        chapters = [c for c in chapters if c.get('content')]
-        
-        lines = []
+        book, chapters = self._load_for_compile(book_id, force)
+        return self._write_txt(book, chapters)
+    
+    def _write_txt(self, book: Dict[str, Any], chapters: List[Dict[str, Any]],
+                   generated_date: Optional[str] = None) -> str:
+        """Write the plain text file from pre-loaded book and chapter rows."""
+        filepath = self._output_path(book, 'txt')
         width = 72
         
-        # ===== TITLE PAGE =====
-        lines.append("")
-        lines.append("=" * width)
-        lines.append("")
-        lines.append(book['title'].center(width))
-        lines.append("")
-        lines.append("=" * width)
-        lines.append("")
-        lines.append(f"Generated on {datetime.now().strftime('%B %d, %Y')}".center(width))
-        lines.append("")
-        lines.append("")
-        lines.append("")
-        
-        # ===== TABLE OF CONTENTS =====
-        lines.append("-" * width)
-        lines.append("TABLE OF CONTENTS".center(width))
-        lines.append("-" * width)
-        lines.append("")
-        
-        for chapter in chapters:
-            lines.append(f"    Chapter {chapter['chapter_number']}: {chapter.get('title', 'Untitled')}")
-        
-        lines.append("")
-        lines.append("")
-        
-        # ===== CHAPTERS =====
-        for chapter in chapters:
-            lines.append("=" * width)
-            lines.append(f"CHAPTER {chapter['chapter_number']}")
-            lines.append(chapter.get('title', 'Untitled').upper())
-            lines.append("=" * width)
-            lines.append("")
+        # Lines are streamed straight into a buffered file rather than
+        # collected and joined, so the text is never held in memory twice.
+        # They go to a temp file that replaces the output once complete.
+        tmp_path = filepath.with_suffix('.txt.tmp')
+        with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as out:
+            def emit(line: str = "") -> None:
+                out.write(line)
+                out.write('\n')
             
-            # Parse and format content
-            content = chapter.get('content', '')
-            blocks = self.parser.parse_content(content)
+            # ===== TITLE PAGE =====
+            emit()
+            emit("=" * width)
+            emit()
+            emit(book['title'].center(width))
+            emit()
+            emit("=" * width)
+            emit()
+            emit(f"Generated on {generated_date or _generated_date()}".center(width))
+            emit()
+            emit()
+            emit()
+        
+            # ===== TABLE OF CONTENTS =====
+            emit("-" * width)
+            emit("TABLE OF CONTENTS".center(width))
+            emit("-" * width)
+            emit()
+        
+            for chapter in chapters:
+                emit(f"    Chapter {chapter['chapter_number']}: {chapter.get('title', 'Untitled')}")
+        
+            emit()
+            emit()
+        
+            # ===== CHAPTERS =====
+            for chapter in chapters:
+                emit("=" * width)
+                emit(f"CHAPTER {chapter['chapter_number']}")
+                emit(chapter.get('title', 'Untitled').upper())
+                emit("=" * width)
+                emit()
             
-            for block in blocks:
-                text = self.parser.clean_markdown(block.get('text', ''))
+                # Parse and format content
+                content = chapter.get('content', '')
+                blocks = self.parser.parsed_blocks(content)
+            
+                for block in blocks:
+                    text = block.clean
                 
-                if block['type'] in ('h1', 'h2'):
-                    lines.append("")
-                    lines.append(text.upper())
-                    lines.append("-" * len(text))
-                    lines.append("")
-                elif block['type'] in ('h3', 'h4'):
-                    lines.append("")
-                    lines.append(f"  {text}")
-                    lines.append("")
-                elif block['type'] == 'bullet_list':
-                    for item in block['items']:
-                        clean_item = self.parser.clean_markdown(item)
-                        lines.append(f"    • {clean_item}")
-                    lines.append("")
-                elif block['type'] == 'numbered_list':
-                    for i, item in enumerate(block['items'], 1):
-                        clean_item = self.parser.clean_markdown(item)
-                        lines.append(f"    {i}. {clean_item}")
-                    lines.append("")
-                elif block['type'] == 'quote':
-                    lines.append(f'    "{text}"')
-                    lines.append("")
-                else:
-                    # Word wrap paragraphs
-                    if text:
-                        wrapped = self._word_wrap(text, width - 4)
-                        for line in wrapped:
-                            lines.append(f"    {line}")
-                        lines.append("")
+                    if block.kind in ('h1', 'h2'):
+                        emit()
+                        emit(text.upper())
+                        emit("-" * len(text))
+                        emit()
+                    elif block.kind in ('h3', 'h4'):
+                        emit()
+                        emit(f"  {text}")
+                        emit()
+                    elif block.kind == 'bullet_list':
+                        for clean_item in block.items_clean:
+                            emit(f"    • {clean_item}")
+                        emit()
+                    elif block.kind == 'numbered_list':
+                        for i, clean_item in enumerate(block.items_clean, 1):
+                            emit(f"    {i}. {clean_item}")
+                        emit()
+                    elif block.kind == 'quote':
+                        emit(f'    "{text}"')
+                        emit()
+                    else:
+                        # Word wrap paragraphs
+                        if text:
+                            wrapped = self._word_wrap(text, width - 4)
+                            for line in wrapped:
+                                emit(f"    {line}")
+                            emit()
             
-            lines.append("")
-            lines.append("")
-        
-        # Save file
-        safe_title = "".join(c for c in book['title'] if c.isalnum() or c in ' -_').strip()
-        filename = f"{safe_title}.txt"
-        filepath = self.output_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
+                emit()
+                emit()
+        os.replace(tmp_path, filepath)
         
-        self.db.update_book(book_id, output_txt_path=str(filepath))
+        self.db.update_book(book['id'], output_txt_path=str(filepath))
         
         return str(filepath)
     
     def _word_wrap(self, text: str, width: int) -> List[str]:
         """Word wrap text to specified width."""
-        words = text.split()
-        lines = []
-        current_line = []
-        current_length = 0
-        
-        for word in words:
-            if current_length + len(word) + 1 <= width:
-                current_line.append(word)
-                current_length += len(word) + 1
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-                current_length = len(word)
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        return lines if lines else ['']
+        # Runs of whitespace collapse to one space, as when splitting on words
+        return textwrap.wrap(
+            ' '.join(text.split()), width=width, break_long_words=False, break_on_hyphens=False
+        ) or ['']
     
     # ==========================================================================
     # COMPILE ALL FORMATS
     # ==========================================================================
     
-    def compile_book(self, book_id: str, formats: List[str] = None, force: bool = False) -> Dict[str, str]:
-        """Compile book to all specified formats."""
+    def compile_book(self, book_id: str, formats: List[str] = None, force: bool = False,
+                     parallel: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Compile book to all specified formats.
+        
+        Args:
+            book_id: Book ID
+            formats: Formats to build (defaults to docx, pdf and txt)
+            force: Compile even if gating checks fail
+            parallel: Build each format in its own process. Defaults to
+                Config.PARALLEL_COMPILE.
+        
+        Returns:
+            {"success": True if every format was written,
+             "outputs": format -> file path for the formats written,
+             "errors": format -> error message for the formats that failed}
+        """
         if formats is None:
             formats = ['docx', 'pdf', 'txt']
-        
-        results = {}
-        
-        for fmt in formats:
-            print(f"📄 Compiling to {fmt.upper()}...")
-            try:
-                if fmt == 'docx':
-                    results['docx'] = self.compile_to_docx(book_id, force)
-                elif fmt == 'pdf':
-                    results['pdf'] = self.compile_to_pdf(book_id, force)
-                elif fmt == 'txt':
-                    results['txt'] = self.compile_to_txt(book_id, force)
-                print(f"   ✅ {results[fmt]}")
-            except Exception as e:
-                print(f"   ❌ Error: {e}")
-                results[fmt] = f"Error: {e}"
-        
-        if all(not str(v).startswith('Error') for v in results.values()):
+        if parallel is None:
+            parallel = Config.PARALLEL_COMPILE
+        
+        # One round of queries shared by every format
+        try:
+            book, chapters = self._load_for_compile(book_id, force)
+        except ValueError as e:
+            logger.error("❌ Error: %s", e)
+            return {"success": False, "outputs": {}, "errors": {fmt: str(e) for fmt in formats}}
+        
+        # Stamp every format with the same date
+        generated_date = _generated_date()
+        outputs = {}
+        errors = {}
+        
+        if parallel and len(formats) > 1:
+            # The writers are CPU-bound pure Python, so threads would just
+            # queue on the GIL. Workers get the rows as plain dicts and each
+            # builds its own compiler (and database client).
+            logger.info("📄 Compiling to %s in parallel...", ', '.join(f.upper() for f in formats))
+            with ProcessPoolExecutor(max_workers=len(formats)) as pool:
+                futures = {
+                    pool.submit(_compile_format, fmt, book, chapters, generated_date): fmt
+                    for fmt in formats
+                }
+                for future in as_completed(futures):
+                    fmt = futures[future]
+                    try:
+                        outputs[fmt] = future.result()
+                        logger.info("   ✅ %s: %s", fmt.upper(), outputs[fmt])
+                    except Exception as e:
+                        logger.error("   ❌ %s error: %s", fmt.upper(), e)
+                        errors[fmt] = str(e)
+            # Report in the order requested, not completion order
+            outputs = {fmt: outputs[fmt] for fmt in formats if fmt in outputs}
+        else:
+            for fmt in formats:
+                logger.info("📄 Compiling to %s...", fmt.upper())
+                try:
+                    outputs[fmt] = self.compile_format(fmt, book, chapters, generated_date)
+                    logger.info("   ✅ %s", outputs[fmt])
+                except Exception as e:
+                    logger.error("   ❌ Error: %s", e)
+                    errors[fmt] = str(e)
+        
+        success = not errors
+        if success:
             self.db.update_book(book_id, book_output_status='completed')
-            print("\n✅ Book compilation complete!")
+            logger.info("\n✅ Book compilation complete!")
         
-        return results
+        return {"success": success, "outputs": outputs, "errors": errors}
+    
+    def compile_format(self, fmt: str, book: Dict[str, Any], chapters: List[Dict[str, Any]],
+                       generated_date: Optional[str] = None) -> str:
+        """Write pre-loaded book data to a single format ('docx', 'pdf' or 'txt')."""
+        if fmt == 'docx':
+            return self._write_docx(book, chapters, generated_date)
+        elif fmt == 'pdf':
+            return self._write_pdf(book, chapters, generated_date)
+        elif fmt == 'txt':
+            return self._write_txt(book, chapters, generated_date)
+        raise ValueError(f"Unsupported format: {fmt}")
     
     def approve_final_review(self, book_id: str) -> Dict[str, Any]:
         """Mark book as ready for final compilation."""
         self.db.update_book(book_id, final_review_notes_status='no_notes_needed')
         return {"success": True, "message": "Book approved for compilation"}
+
+
+
+def _compile_format(fmt: str, book: Dict[str, Any], chapters: List[Dict[str, Any]],
+                    generated_date: str) -> str:
+    """Process-pool entry point for BookCompiler.compile_book."""
+    return BookCompiler().compile_format(fmt, book, chapters, generated_date)
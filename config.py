@@ -5,11 +5,112 @@ Loads environment variables and provides centralized config access.
 
 import os
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Optional, Dict
 
-# Load .env file from the project root
 PROJECT_ROOT = Path(__file__).parent
-load_dotenv(PROJECT_ROOT / ".env")
+INPUT_DIR = PROJECT_ROOT / "input"
+OUTPUT_DIR = PROJECT_ROOT / "output"
+
+# Set in os.environ once .env has been loaded by this process
+_ENV_LOADED_MARKER = "BOOKGEN_ENV_LOADED"
+
+
+def _compiled_env() -> Optional[Dict[str, str]]:
+    """
+    Settings from config_env.py, written by scripts/compile_env.py.
+    
+    Returns None if there is no compiled module, or if .env has been
+    edited since it was generated.
+    """
+    compiled_path = PROJECT_ROOT / "config_env.py"
+    env_path = PROJECT_ROOT / ".env"
+    try:
+        if env_path.exists() and env_path.stat().st_mtime > compiled_path.stat().st_mtime:
+            return None
+        import config_env
+    except (OSError, ImportError):
+        return None
+    
+    return {
+        key: value for key, value in vars(config_env).items()
+        if key.isupper() and isinstance(value, str)
+    }
+
+
+def _load_env_once():
+    """
+    Load the project .env file and create the data directories.
+    
+    load_dotenv copies the values into os.environ, which a re-import or
+    reload of this module and any child process (e.g. compile workers)
+    already see. The marker lets those skip re-parsing the file and the
+    mkdir calls. A cache decorator would not help here, since a reload
+    re-creates the function along with its cache.
+    """
+    if os.environ.get(_ENV_LOADED_MARKER):
+        return
+    
+    compiled = _compiled_env()
+    if compiled is not None:
+        # Same precedence as load_dotenv: real environment variables win
+        for key, value in compiled.items():
+            os.environ.setdefault(key, value)
+    else:
+        from dotenv import load_dotenv
+        load_dotenv(PROJECT_ROOT / ".env")
+    
+    # Create directories if they don't exist
+    INPUT_DIR.mkdir(exist_ok=True)
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    
+    os.environ[_ENV_LOADED_MARKER] = "1"
+
+
+_load_env_once()
+
+
+# ==========================================================================
+# SETTINGS
+# Read once at import. Modules that use a value on every call can import
+# the name directly; Config below exposes the same values as a namespace.
+# ==========================================================================
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+# Most output tokens the model returns for one request
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "65536"))
+
+# Outlines for pending books are requested concurrently, at most this many at once
+OUTLINE_CONCURRENCY = int(os.getenv("OUTLINE_CONCURRENCY", "4"))
+# Books whose outlines are requested together in one call (1 = one call per book)
+OUTLINES_PER_REQUEST = int(os.getenv("OUTLINES_PER_REQUEST", "1"))
+# Outline responses are reused for identical prompts (empty = no cache)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(PROJECT_ROOT / "llm_cache.sqlite3"))
+
+# Parallel generation skips context chaining between chapters in a batch
+PARALLEL_CHAPTERS = os.getenv("PARALLEL_CHAPTERS", "false").lower() == "true"
+CHAPTER_WORKERS = int(os.getenv("CHAPTER_WORKERS", "4"))
+
+# Full summaries sent for the last N chapters (0 = all); earlier chapters
+# are folded into one rolling summary when ROLLING_SUMMARY is on
+CONTEXT_SUMMARIES = int(os.getenv("CONTEXT_SUMMARIES", "3"))
+ROLLING_SUMMARY = os.getenv("ROLLING_SUMMARY", "true").lower() == "true"
+
+# Build DOCX/PDF/TXT in separate worker processes instead of one by one
+PARALLEL_COMPILE = os.getenv("PARALLEL_COMPILE", "false").lower() == "true"
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+# Implicit TLS (SMTPS) instead of STARTTLS; on by default for port 465
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", str(SMTP_PORT == 465)).lower() == "true"
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+NOTIFICATION_EMAIL = os.getenv("NOTIFICATION_EMAIL", "")
+
+TEAMS_WEBHOOK_URL = os.getenv("TEAMS_WEBHOOK_URL", "")
 
 
 class Config:
@@ -19,34 +120,56 @@ class Config:
     # PROJECT PATHS
     # ==========================================================================
     PROJECT_ROOT = PROJECT_ROOT
-    INPUT_DIR = PROJECT_ROOT / "input"
-    OUTPUT_DIR = PROJECT_ROOT / "output"
+    INPUT_DIR = INPUT_DIR
+    OUTPUT_DIR = OUTPUT_DIR
     
     # ==========================================================================
     # SUPABASE CONFIG
     # ==========================================================================
-    SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-    SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+    SUPABASE_URL = SUPABASE_URL
+    SUPABASE_KEY = SUPABASE_KEY
     
     # ==========================================================================
     # GEMINI CONFIG
     # ==========================================================================
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+    GEMINI_API_KEY = GEMINI_API_KEY
+    GEMINI_MODEL = GEMINI_MODEL
+    GEMINI_MAX_OUTPUT_TOKENS = GEMINI_MAX_OUTPUT_TOKENS
+    
+    # ==========================================================================
+    # OUTLINE GENERATION
+    # ==========================================================================
+    OUTLINE_CONCURRENCY = OUTLINE_CONCURRENCY
+    OUTLINES_PER_REQUEST = OUTLINES_PER_REQUEST
+    LLM_CACHE_PATH = LLM_CACHE_PATH
+    
+    # ==========================================================================
+    # CHAPTER GENERATION
+    # ==========================================================================
+    PARALLEL_CHAPTERS = PARALLEL_CHAPTERS
+    CHAPTER_WORKERS = CHAPTER_WORKERS
+    CONTEXT_SUMMARIES = CONTEXT_SUMMARIES
+    ROLLING_SUMMARY = ROLLING_SUMMARY
+    
+    # ==========================================================================
+    # COMPILATION
+    # ==========================================================================
+    PARALLEL_COMPILE = PARALLEL_COMPILE
     
     # ==========================================================================
     # EMAIL NOTIFICATIONS
     # ==========================================================================
-    SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-    SMTP_USER = os.getenv("SMTP_USER", "")
-    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
-    NOTIFICATION_EMAIL = os.getenv("NOTIFICATION_EMAIL", "")
+    SMTP_HOST = SMTP_HOST
+    SMTP_PORT = SMTP_PORT
+    SMTP_USE_SSL = SMTP_USE_SSL
+    SMTP_USER = SMTP_USER
+    SMTP_PASSWORD = SMTP_PASSWORD
+    NOTIFICATION_EMAIL = NOTIFICATION_EMAIL
     
     # ==========================================================================
     # OPTIONAL: MS TEAMS
     # ==========================================================================
-    TEAMS_WEBHOOK_URL = os.getenv("TEAMS_WEBHOOK_URL", "")
+    TEAMS_WEBHOOK_URL = TEAMS_WEBHOOK_URL
     
     @classmethod
     def validate(cls) -> dict:
@@ -78,6 +201,11 @@ class Config:
         
         print(f"\n🤖 Gemini Key: {'✓ Set' if cls.GEMINI_API_KEY else '✗ Missing'}")
         print(f"🤖 Gemini Model: {cls.GEMINI_MODEL}")
+        print(f"🤖 Outline Concurrency: {cls.OUTLINE_CONCURRENCY} ({cls.OUTLINES_PER_REQUEST} book(s) per request)")
+        print(f"🤖 Outline Cache: {cls.LLM_CACHE_PATH or 'Off'}")
+        print(f"🤖 Parallel Chapters: {'On' if cls.PARALLEL_CHAPTERS else 'Off'} ({cls.CHAPTER_WORKERS} workers)")
+        print(f"🤖 Context Summaries: {cls.CONTEXT_SUMMARIES or 'All'} (rolling summary {'On' if cls.ROLLING_SUMMARY else 'Off'})")
+        print(f"📄 Parallel Compile: {'On' if cls.PARALLEL_COMPILE else 'Off'}")
         
         print(f"\n📧 SMTP Host: {cls.SMTP_HOST}")
         print(f"📧 SMTP User: {'✓ Set' if cls.SMTP_USER else '✗ Missing'}")
@@ -97,11 +225,6 @@ class Config:
         print("=" * 60)
 
 
-# Create directories if they don't exist
-Config.INPUT_DIR.mkdir(exist_ok=True)
-Config.OUTPUT_DIR.mkdir(exist_ok=True)
-
-
 if __name__ == "__main__":
     # Test configuration when run directly
     Config.print_status()
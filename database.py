@@ -3,50 +3,244 @@ Database module for the Book Generation System.
 Handles all Supabase database operations.
 """
 
-from typing import Optional, List, Dict, Any
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Iterator
 from datetime import datetime
-from supabase import create_client, Client
-from config import Config
+from config import SUPABASE_URL, SUPABASE_KEY
+
+# supabase pulls in httpx, pydantic and friends, so it is imported on first connect
+if TYPE_CHECKING:
+    from supabase import Client
 
 
 class Database:
     """Supabase database client and operations."""
     
+    # One Supabase client - and so one HTTP connection pool - per process,
+    # shared by every Database instance
+    _shared_client: Optional["Client"] = None
+    _shared_client_pid: Optional[int] = None
+    _client_lock = threading.Lock()
+    
+    # get_all_books result, shared by every instance in the process and
+    # dropped on any book write made through this module. Writes from other
+    # processes are picked up once it is BOOKS_CACHE_TTL seconds old.
+    BOOKS_CACHE_TTL = 5.0
+    _books_cache: Optional[List[Dict[str, Any]]] = None
+    _books_cache_time = 0.0
+    _books_cache_lock = threading.Lock()
+    
     def __init__(self):
-        """Initialize Supabase client."""
-        if not Config.SUPABASE_URL or not Config.SUPABASE_KEY:
-            raise ValueError("Supabase URL and Key must be set in .env file")
+        """Initialize with the process-wide Supabase client."""
+        self.client: "Client" = self._get_shared_client()
+    
+    @classmethod
+    def _get_shared_client(cls) -> "Client":
+        """
+        Create the Supabase client on first use and reuse it afterwards.
         
-        self.client: Client = create_client(
-            Config.SUPABASE_URL,
-            Config.SUPABASE_KEY
-        )
+        The owning PID is recorded so a forked worker process builds its
+        own client instead of sharing the parent's sockets.
+        
+        The client runs on an explicit HTTP/2 httpx session. Connections
+        are kept alive long enough to survive the wait on an LLM call
+        between two chapter writes; httpx's default drops them after 5s.
+        """
+        pid = os.getpid()
+        if cls._shared_client is None or cls._shared_client_pid != pid:
+            with cls._client_lock:
+                if cls._shared_client is None or cls._shared_client_pid != pid:
+                    if not SUPABASE_URL or not SUPABASE_KEY:
+                        raise ValueError("Supabase URL and Key must be set in .env file")
+                    
+                    import httpx
+                    from supabase import ClientOptions, create_client
+                    
+                    session = httpx.Client(
+                        http2=True,
+                        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+                        timeout=30,
+                        follow_redirects=True
+                    )
+                    cls._shared_client = create_client(
+                        SUPABASE_URL,
+                        SUPABASE_KEY,
+                        options=ClientOptions(httpx_client=session)
+                    )
+                    cls._shared_client_pid = pid
+        return cls._shared_client
     
     # ==========================================================================
     # BOOK OPERATIONS
     # ==========================================================================
     
-    def create_book(self, title: str, notes_on_outline_before: str = None) -> Dict[str, Any]:
-        """Create a new book entry."""
-        data = {
+    @staticmethod
+    def _new_book_row(title: str, notes_on_outline_before: Optional[str]) -> Dict[str, Any]:
+        """Insert row for a new book."""
+        return {
             "title": title,
             "notes_on_outline_before": notes_on_outline_before,
             "status_outline_notes": "pending",
             "book_output_status": "pending"
         }
+    
+    def create_book(self, title: str, notes_on_outline_before: str = None) -> Dict[str, Any]:
+        """Create a new book entry."""
+        data = self._new_book_row(title, notes_on_outline_before)
         result = self.client.table("books").insert(data).execute()
+        self._invalidate_books()
         return result.data[0] if result.data else None
     
+    def create_books_bulk(self, books: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create several book entries with a single insert.
+        
+        The insert is one statement, so either every book is created or
+        none is.
+        
+        Args:
+            books: Dicts with 'title' and optional 'notes_on_outline_before'
+            
+        Returns:
+            Created book records, in the order given
+        """
+        if not books:
+            return []
+        rows = [
+            self._new_book_row(book["title"], book.get("notes_on_outline_before"))
+            for book in books
+        ]
+        result = self.client.table("books").insert(rows).execute()
+        self._invalidate_books()
+        return result.data or []
+    
     def get_book(self, book_id: str) -> Optional[Dict[str, Any]]:
         """Get a book by ID."""
         result = self.client.table("books").select("*").eq("id", book_id).execute()
         return result.data[0] if result.data else None
     
-    def get_all_books(self) -> List[Dict[str, Any]]:
-        """Get all books."""
-        result = self.client.table("books").select("*").order("created_at", desc=True).execute()
+    def get_all_books(self, fresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get all books (served from a short-lived cache, see BOOKS_CACHE_TTL).
+        
+        The cache only sees writes made by this process. Pass fresh=True to
+        always read the table - e.g. for reads already keyed on
+        books_version(), which must reflect writes from other processes.
+        """
+        cls = type(self)
+        with cls._books_cache_lock:
+            books = cls._books_cache
+            cached = (
+                not fresh
+                and books is not None
+                and time.monotonic() - cls._books_cache_time < cls.BOOKS_CACHE_TTL
+            )
+        
+        if not cached:
+            started = time.monotonic()
+            result = self.client.table("books").select("*").order("created_at", desc=True).execute()
+            books = result.data or []
+            with cls._books_cache_lock:
+                # Don't overwrite the cache with rows read before a newer write
+                if started >= cls._books_cache_time:
+                    cls._books_cache = books
+                    cls._books_cache_time = started
+        
+        # Copies, so callers can't change the cached rows
+        return [dict(book) for book in books]
+    
+    @classmethod
+    def _invalidate_books(cls):
+        """Drop the cached get_all_books result after a book write."""
+        with cls._books_cache_lock:
+            cls._books_cache = None
+            cls._books_cache_time = time.monotonic()
+    
+    @staticmethod
+    def normalize_title(title: str) -> str:
+        """Title as stored in books.title_norm, for duplicate checks."""
+        return title.strip(" \t\r\n").lower()
+    
+    def find_book_by_title(self, title: str) -> Optional[Dict[str, Any]]:
+        """Get a book whose title matches, ignoring case and surrounding whitespace."""
+        result = (
+            self.client.table("books")
+            .select("*")
+            .eq("title_norm", self.normalize_title(title))
+            .limit(1)
+            .execute()
+        )
+        return result.data[0] if result.data else None
+    
+    def get_books_by_titles(self, titles: List[str], chunk_size: int = 100) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up several titles at once via the title_norm index.
+        
+        Args:
+            titles: Titles to look up
+            chunk_size: Titles per query, keeping request URLs short
+            
+        Returns:
+            Dict of normalized title -> book, for the titles that exist
+        """
+        norms = list(dict.fromkeys(self.normalize_title(title) for title in titles))
+        found = {}
+        for i in range(0, len(norms), chunk_size):
+            result = (
+                self.client.table("books")
+                .select("*")
+                .in_("title_norm", norms[i:i + chunk_size])
+                .execute()
+            )
+            for book in result.data or []:
+                found.setdefault(book["title_norm"], book)
+        return found
+    
+    def get_books_bulk(self, book_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get several books by ID in one query."""
+        if not book_ids:
+            return []
+        result = self.client.table("books").select("*").in_("id", list(book_ids)).execute()
+        return result.data or []
+    
+    def get_books_with_counts(self) -> List[Dict[str, Any]]:
+        """Get all books with total/generated/approved chapter counts, in one query."""
+        result = (
+            self.client.table("books_with_counts")
+            .select("*")
+            .order("created_at", desc=True)
+            .execute()
+        )
         return result.data or []
     
+    def iter_books_with_counts(self, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Yield books with chapter counts (as get_books_with_counts), a page at a time.
+        
+        Only one page of rows is held at once, and the first rows are
+        available before the rest have been fetched.
+        
+        Args:
+            page_size: Rows fetched per request
+        """
+        start = 0
+        while True:
+            result = (
+                self.client.table("books_with_counts")
+                .select("*")
+                .order("created_at", desc=True)
+                .order("id")  # Tie-breaker so pages don't overlap
+                .range(start, start + page_size - 1)
+                .execute()
+            )
+            rows = result.data or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            start += page_size
+    
     def get_books_by_status(self, status: str) -> List[Dict[str, Any]]:
         """Get books by output status."""
         result = self.client.table("books").select("*").eq("book_output_status", status).execute()
@@ -55,8 +249,25 @@ class Database:
     def update_book(self, book_id: str, **kwargs) -> Dict[str, Any]:
         """Update a book's fields."""
         result = self.client.table("books").update(kwargs).eq("id", book_id).execute()
+        self._invalidate_books()
         return result.data[0] if result.data else None
     
+    def bulk_update_books(self, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Update several books, each with its own fields, in one call.
+        
+        Args:
+            updates: Dicts with the book 'id' plus the fields to set on it
+            
+        Returns:
+            Updated book records (books that no longer exist are left out)
+        """
+        if not updates:
+            return []
+        result = self.client.rpc("bulk_update_books", {"p_updates": updates}).execute()
+        self._invalidate_books()
+        return result.data or []
+    
     def update_outline(self, book_id: str, outline: str, status: str = "yes") -> Dict[str, Any]:
         """Update book outline and set status."""
         return self.update_book(
@@ -68,6 +279,7 @@ class Database:
     def delete_book(self, book_id: str) -> bool:
         """Delete a book and all its chapters (cascade)."""
         result = self.client.table("books").delete().eq("id", book_id).execute()
+        self._invalidate_books()
         return len(result.data) > 0 if result.data else False
     
     # ==========================================================================
@@ -81,25 +293,80 @@ class Database:
         title: str = None
     ) -> Dict[str, Any]:
         """Create a new chapter entry."""
-        data = {
-            "book_id": book_id,
-            "chapter_number": chapter_number,
-            "title": title,
-            "status": "pending",
-            "notes_status": "pending"
-        }
-        result = self.client.table("chapters").insert(data).execute()
-        return result.data[0] if result.data else None
+        created = self.create_chapters_bulk(
+            book_id,
+            [{"chapter_number": chapter_number, "title": title}]
+        )
+        return created[0] if created else None
+    
+    def create_chapters_bulk(
+        self,
+        book_id: str,
+        chapters: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Create several chapter entries with a single insert.
+        
+        Args:
+            book_id: The book ID
+            chapters: Dicts with 'chapter_number' and 'title'
+            
+        Returns:
+            Created chapter records, in the order given
+        """
+        if not chapters:
+            return []
+        rows = [
+            {
+                "book_id": book_id,
+                "chapter_number": ch["chapter_number"],
+                "title": ch.get("title"),
+                "status": "pending",
+                "notes_status": "pending"
+            }
+            for ch in chapters
+        ]
+        result = self.client.table("chapters").insert(rows).execute()
+        return result.data or []
     
     def get_chapter(self, chapter_id: str) -> Optional[Dict[str, Any]]:
         """Get a chapter by ID."""
         result = self.client.table("chapters").select("*").eq("id", chapter_id).execute()
         return result.data[0] if result.data else None
     
-    def get_book_chapters(self, book_id: str) -> List[Dict[str, Any]]:
-        """Get all chapters for a book, ordered by chapter number."""
+    def get_chapter_by_number(self, book_id: str, chapter_number: int) -> Optional[Dict[str, Any]]:
+        """Get one chapter of a book by its chapter number."""
+        result = (
+            self.client.table("chapters")
+            .select("*")
+            .eq("book_id", book_id)
+            .eq("chapter_number", chapter_number)
+            .execute()
+        )
+        return result.data[0] if result.data else None
+    
+    def get_book_chapters(self, book_id: str, columns: str = "*") -> List[Dict[str, Any]]:
+        """
+        Get all chapters for a book, ordered by chapter number.
+        
+        Args:
+            book_id: The book ID
+            columns: PostgREST column list; pass only what's needed to avoid
+                     pulling every chapter's content
+        """
         result = (
             self.client.table("chapters")
+            .select(columns)
+            .eq("book_id", book_id)
+            .order("chapter_number")
+            .execute()
+        )
+        return result.data or []
+    
+    def get_book_chapters_meta(self, book_id: str) -> List[Dict[str, Any]]:
+        """Get a book's chapters without their content, ordered by chapter number."""
+        result = (
+            self.client.table("chapters_meta")
             .select("*")
             .eq("book_id", book_id)
             .order("chapter_number")
@@ -107,13 +374,34 @@ class Database:
         )
         return result.data or []
     
-    def get_chapter_summaries(self, book_id: str, up_to_chapter: int) -> List[Dict[str, Any]]:
-        """Get summaries of chapters 1 to N for context chaining."""
+    def get_chapter_content(self, chapter_id: str) -> Optional[str]:
+        """Get only the content of a chapter."""
+        result = self.client.table("chapters").select("content").eq("id", chapter_id).execute()
+        return result.data[0]["content"] if result.data else None
+    
+    def get_chapters_for_books(self, book_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get chapters for several books in one query, grouped by book ID."""
+        grouped = {book_id: [] for book_id in book_ids}
+        if not book_ids:
+            return grouped
+        
+        result = (
+            self.client.table("chapters")
+            .select("*")
+            .in_("book_id", list(book_ids))
+            .order("chapter_number")
+            .execute()
+        )
+        for chapter in result.data or []:
+            grouped.setdefault(chapter["book_id"], []).append(chapter)
+        return grouped
+    
+    def get_chapters_with_summaries(self, book_id: str) -> List[Dict[str, Any]]:
+        """Get number, title and summary of every chapter in a book for context chaining."""
         result = (
             self.client.table("chapters")
-            .select("chapter_number, title, summary")
+            .select("id, chapter_number, title, summary")
             .eq("book_id", book_id)
-            .lt("chapter_number", up_to_chapter + 1)
             .order("chapter_number")
             .execute()
         )
@@ -124,20 +412,41 @@ class Database:
         result = self.client.table("chapters").update(kwargs).eq("id", chapter_id).execute()
         return result.data[0] if result.data else None
     
+    def update_chapters(self, chapter_ids: List[str], **kwargs) -> List[Dict[str, Any]]:
+        """Apply the same field updates to several chapters in one statement."""
+        if not chapter_ids:
+            return []
+        result = self.client.table("chapters").update(kwargs).in_("id", list(chapter_ids)).execute()
+        return result.data or []
+    
     def update_chapter_content(
         self, 
         chapter_id: str, 
         content: str, 
         summary: str,
-        status: str = "generated"
-    ) -> Dict[str, Any]:
-        """Update chapter content and summary after generation."""
-        return self.update_chapter(
-            chapter_id,
-            content=content,
-            summary=summary,
-            status=status
-        )
+        status: str = "generated",
+        notes_status: Optional[str] = None
+    ) -> None:
+        """
+        Update chapter content and summary after generation.
+        
+        Goes through the update_chapter_content SQL function, so the
+        (large) content isn't sent back as a returned row.
+        
+        Args:
+            chapter_id: The chapter ID
+            content: Chapter text
+            summary: Summary for context chaining
+            status: New chapter status
+            notes_status: New notes_status, or None to leave it unchanged
+        """
+        self.client.rpc("update_chapter_content", {
+            "p_chapter_id": chapter_id,
+            "p_content": content,
+            "p_summary": summary,
+            "p_status": status,
+            "p_notes_status": notes_status
+        }).execute()
     
     # ==========================================================================
     # NOTIFICATION OPERATIONS
@@ -162,6 +471,21 @@ class Database:
         result = self.client.table("notifications_log").insert(data).execute()
         return result.data[0] if result.data else None
     
+    def log_notifications_bulk(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Log several notification events with a single insert.
+        
+        Args:
+            rows: Dicts with the log_notification fields
+            
+        Returns:
+            Created log records
+        """
+        if not rows:
+            return []
+        result = self.client.table("notifications_log").insert(rows).execute()
+        return result.data or []
+    
     def get_book_notifications(self, book_id: str) -> List[Dict[str, Any]]:
         """Get all notifications for a book."""
         result = (
@@ -186,21 +510,30 @@ class Database:
             print(f"Connection test failed: {e}")
             return False
     
+    def books_version(self) -> int:
+        """Get the write counter that triggers bump on every books/chapters change."""
+        result = self.client.table("meta").select("version").eq("id", 1).execute()
+        return result.data[0]["version"] if result.data else 0
+    
+    def get_workflow_counts(self) -> Dict[str, int]:
+        """Get book counts for each workflow stage in one aggregate query."""
+        result = self.client.rpc("get_workflow_counts").execute()
+        if not result.data:
+            return {
+                "total_books": 0,
+                "needs_outline": 0,
+                "needs_approval": 0,
+                "needs_chapters": 0,
+                "ready_for_compile": 0,
+            }
+        return result.data[0]
+    
     def get_workflow_status(self, book_id: str) -> Dict[str, Any]:
-        """Get complete workflow status for a book."""
-        book = self.get_book(book_id)
-        if not book:
-            return None
-        
-        chapters = self.get_book_chapters(book_id)
-        
-        return {
-            "book": book,
-            "chapters": chapters,
-            "total_chapters": len(chapters),
-            "completed_chapters": len([c for c in chapters if c["status"] == "approved"]),
-            "pending_chapters": len([c for c in chapters if c["status"] == "pending"]),
-        }
+        """Get complete workflow status for a book in one round trip."""
+        # Book, chapters and chapter counts are assembled by the
+        # get_workflow_status function in schema.sql
+        result = self.client.rpc("get_workflow_status", {"p_book_id": book_id}).execute()
+        return result.data or None
 
 
 # ==========================================================================
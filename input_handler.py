@@ -3,11 +3,34 @@ Input Handler module for the Book Generation System.
 Reads book data from Excel files.
 """
 
+import logging
+import sys
+from contextlib import closing
+from dataclasses import dataclass, replace
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Optional, Iterator, Tuple
 import openpyxl
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+
+# Optional Rust-backed reader; openpyxl is used when it isn't installed
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+
+@dataclass(frozen=True, slots=True)
+class BookRow:
+    """One book read from the input sheet."""
+    title: str
+    notes_on_outline_before: Optional[str]
+    _row_number: int  # Source row, for debugging
+    _error: Optional[str] = None
+
 
 class InputHandler:
     """Handles reading book data from Excel files."""
@@ -27,52 +50,83 @@ class InputHandler:
         else:
             self.file_path = Config.INPUT_DIR / "books_input.xlsx"
     
-    def read_books(self) -> List[Dict[str, Any]]:
+    def read_books(self) -> List[BookRow]:
         """
         Read books from Excel file.
         
         Returns:
-            List of book dictionaries with title and notes.
+            List of BookRow entries with title and notes.
         """
         if not self.file_path.exists():
             raise FileNotFoundError(f"Input file not found: {self.file_path}")
         
-        workbook = openpyxl.load_workbook(self.file_path)
-        sheet = workbook.active
+        # Re-parse only when the file changes; rows are frozen, so the
+        # cached ones can be handed out directly
+        stat = self.file_path.stat()
+        return list(_read_books_cached(str(self.file_path), stat.st_mtime_ns, stat.st_size))
+    
+    @classmethod
+    def _load_books(cls, path: str) -> List[BookRow]:
+        """Parse the first sheet of the workbook at path."""
+        if CalamineWorkbook is not None:
+            sheet = CalamineWorkbook.from_path(path).get_sheet_by_index(0)
+            return cls._parse_rows(cls._calamine_rows(sheet.to_python(skip_empty_area=False)))
         
-        # Get headers from first row
-        headers = [cell.value.lower().strip() if cell.value else "" for cell in sheet[1]]
+        # Read-only mode streams rows straight from the sheet XML instead
+        # of building every cell object up front; it must be closed
+        with closing(openpyxl.load_workbook(path, read_only=True, data_only=True)) as workbook:
+            return cls._parse_rows(workbook.active.iter_rows(values_only=True))
+    
+    @staticmethod
+    def _calamine_rows(rows: List[list]) -> Iterator[tuple]:
+        """
+        Normalize calamine cell values to what openpyxl returns: empty
+        cells as None and whole numbers as int rather than float.
+        """
+        for row in rows:
+            yield tuple(
+                None if value == "" else
+                int(value) if isinstance(value, float) and value.is_integer() else
+                value
+                for value in row
+            )
+    
+    @classmethod
+    def _parse_rows(cls, rows: Iterator[tuple]) -> List[BookRow]:
+        """Turn sheet rows (header row first) into BookRow entries."""
+        # Get headers from first row; interned so every row dict shares the
+        # same key objects (and their cached hashes)
+        headers = tuple(sys.intern(value.lower().strip()) if value else "" for value in next(rows, ()))
         
-        # Validate required columns
-        for col in self.REQUIRED_COLUMNS:
-            if col not in headers:
-                raise ValueError(f"Missing required column: {col}")
+        # Validate required columns, reporting every missing one at once
+        present = frozenset(headers)
+        missing = [col for col in cls.REQUIRED_COLUMNS if col not in present]
+        if missing:
+            raise ValueError(f"Missing required column(s): {', '.join(missing)}")
         
         # Read data rows
         books = []
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+        for row_idx, row in enumerate(rows, start=2):
             row_data = dict(zip(headers, row))
             
             # Skip empty rows
             if not row_data.get("title"):
                 continue
             
-            book = {
-                "title": str(row_data["title"]).strip(),
-                "notes_on_outline_before": row_data.get("notes_on_outline_before", ""),
-                "_row_number": row_idx  # Track source row for debugging
-            }
-            
             # Clean up notes
-            if book["notes_on_outline_before"]:
-                book["notes_on_outline_before"] = str(book["notes_on_outline_before"]).strip()
+            notes = row_data.get("notes_on_outline_before", "")
+            if notes:
+                notes = str(notes).strip()
             
-            books.append(book)
+            books.append(BookRow(
+                title=str(row_data["title"]).strip(),
+                notes_on_outline_before=notes,
+                _row_number=row_idx
+            ))
         
-        workbook.close()
         return books
     
-    def validate_books(self, books: List[Dict[str, Any]]) -> Dict[str, List]:
+    def validate_books(self, books: List[BookRow]) -> Dict[str, List[BookRow]]:
         """
         Validate books and separate into valid/invalid.
         
@@ -84,32 +138,37 @@ class InputHandler:
         
         for book in books:
             # Check if has pre-outline notes (required per spec)
-            if not book.get("notes_on_outline_before"):
-                invalid.append({
-                    **book,
-                    "_error": "Missing notes_on_outline_before - required before generating outline"
-                })
+            if not book.notes_on_outline_before:
+                invalid.append(replace(
+                    book,
+                    _error="Missing notes_on_outline_before - required before generating outline"
+                ))
             else:
                 valid.append(book)
         
         return {"valid": valid, "invalid": invalid}
     
-    def get_books_for_processing(self) -> List[Dict[str, Any]]:
-        """
-        Read and validate books, returning only valid ones.
-        
-        Returns:
-            List of validated books ready for outline generation
+    def get_books_for_processing(self) -> Iterator[BookRow]:
         """
-        books = self.read_books()
-        result = self.validate_books(books)
+        Read books, yielding only the ones ready for outline generation.
         
-        if result["invalid"]:
-            print(f"⚠️  {len(result['invalid'])} book(s) skipped (missing notes_on_outline_before):")
-            for book in result["invalid"]:
-                print(f"   - Row {book['_row_number']}: {book['title']}")
+        Books missing notes_on_outline_before are reported as they are
+        reached rather than collected first.
         
-        return result["valid"]
+        Yields:
+            Validated books, in sheet order
+        """
+        for book in self.read_books():
+            if book.notes_on_outline_before:
+                yield book
+            else:
+                logger.warning("⚠️  Skipped row %s: %s (missing notes_on_outline_before)", book._row_number, book.title)
+
+
+@lru_cache(maxsize=8)
+def _read_books_cached(path: str, mtime_ns: int, size: int) -> Tuple[BookRow, ...]:
+    """Parse the input file once per (path, mtime, size) snapshot."""
+    return tuple(InputHandler._load_books(path))
 
 
 # ==========================================================================
@@ -167,12 +226,12 @@ if __name__ == "__main__":
     handler = InputHandler()
     
     try:
-        books = handler.get_books_for_processing()
+        books = list(handler.get_books_for_processing())
         print(f"\n✅ Found {len(books)} valid book(s) for processing:\n")
         
         for i, book in enumerate(books, 1):
-            print(f"{i}. {book['title']}")
-            print(f"   Notes: {book['notes_on_outline_before'][:50]}...")
+            print(f"{i}. {book.title}")
+            print(f"   Notes: {book.notes_on_outline_before[:50]}...")
             print()
             
     except Exception as e:
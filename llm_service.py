@@ -4,10 +4,144 @@ Handles all Gemini API interactions for generating outlines, chapters, and summa
 Uses the new google-genai package (recommended over deprecated google-generativeai).
 """
 
-from typing import Optional, List, Dict, Any
-from google import genai
-from google.genai import types
-from config import Config
+import hashlib
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Iterator, Tuple, Callable, Awaitable, TypeVar
+from config import GEMINI_API_KEY, GEMINI_MAX_OUTPUT_TOKENS, GEMINI_MODEL, LLM_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# google-genai is slow to import, so it is loaded when a service is created
+if TYPE_CHECKING:
+    from google.genai import types
+
+
+# Shared by the single- and multi-book outline prompts
+_OUTLINE_GUIDELINES = """Please generate a comprehensive book outline with the following structure:
+1. An engaging introduction section
+2. Main chapters (aim for 8-12 chapters depending on scope)
+3. A conclusion/summary section
+
+For each chapter, provide:
+- Chapter number and title
+- Brief description (2-3 sentences) of what the chapter will cover
+- Key topics/subtopics as bullet points
+
+Format the outline in clear markdown with proper headings.
+
+IMPORTANT: Consider the editor's notes carefully when designing the structure and focus of each chapter."""
+
+# Fixed part of every single-book outline request, sent as the system
+# instruction so all outline calls share the same leading prefix
+_OUTLINE_SYSTEM_PROMPT = f"""You are an expert book author and editor. Your task is to create a detailed book outline for the book described by the user.
+
+{_OUTLINE_GUIDELINES}"""
+
+# Output budget per outline; a multi-outline call gets one per book, up to
+# the model's output limit
+_OUTLINE_TOKENS = 4096
+MAX_OUTLINES_PER_REQUEST = max(1, GEMINI_MAX_OUTPUT_TOKENS // _OUTLINE_TOKENS)
+
+# Several outlines packed into one call; see generate_outlines_multi
+_OUTLINES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "outlines": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["outlines"],
+}
+
+
+# Chapter text and its context-chaining summary come back from one call
+_CHAPTER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "content": {"type": "string"},
+        "summary": {"type": "string"},
+    },
+    "required": ["content", "summary"],
+}
+
+# Chapter budget plus room for the summary
+_CHAPTER_JSON_TOKENS = 8700
+
+_CHAPTER_JSON_INSTRUCTIONS = """
+
+Respond with a JSON object with two fields:
+- "content": the complete chapter in markdown
+- "summary": a 3-5 sentence summary of the chapter's main points, key concepts and conclusions"""
+
+T = TypeVar("T")
+
+# Failed calls are retried with exponential backoff when the failure looks
+# temporary: timeouts, rate limits and server-side errors
+_RETRY_ATTEMPTS = 5
+_RETRY_INITIAL_DELAY = 1.0
+_RETRY_MAX_DELAY = 30.0
+_TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether an LLM call that raised this is likely to succeed if retried later."""
+    from google.genai import errors
+    import httpx
+    if isinstance(error, errors.APIError):
+        return error.code in _TRANSIENT_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.NetworkError, ConnectionError, TimeoutError))
+
+
+def _retry_delays() -> Iterator[float]:
+    """Backoff before each retry: doubling from the initial delay, with jitter."""
+    delay = _RETRY_INITIAL_DELAY
+    for _ in range(_RETRY_ATTEMPTS - 1):
+        yield delay * random.uniform(0.5, 1.0)
+        delay = min(delay * 2, _RETRY_MAX_DELAY)
+
+
+class _ResponseCache:
+    """SQLite store of LLM responses keyed by a hash of model and prompt."""
+    
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(model: str, prompt: str, max_tokens: int, system_instruction: Optional[str] = None) -> str:
+        text = f"{model}|{max_tokens}|{system_instruction or ''}|{prompt}"
+        return hashlib.blake2b(text.encode(), digest_size=32).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+    
+    def set(self, key: str, response: str):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            pass  # A missed cache write only costs a future LLM call
 
 
 class LLMService:
@@ -15,65 +149,257 @@ class LLMService:
     
     def __init__(self):
         """Initialize Gemini client."""
-        if not Config.GEMINI_API_KEY:
+        if not GEMINI_API_KEY:
             raise ValueError("Gemini API key must be set in .env file")
         
-        self.client = genai.Client(api_key=Config.GEMINI_API_KEY)
-        self.model = Config.GEMINI_MODEL
+        from google import genai
+        self.client = genai.Client(api_key=GEMINI_API_KEY)
+        self.model = GEMINI_MODEL
+        self._cache = self._open_cache(LLM_CACHE_PATH)
     
-    def _generate(self, prompt: str, max_tokens: int = 4096) -> str:
+    @staticmethod
+    def _open_cache(path: str) -> Optional[_ResponseCache]:
+        """Open the response cache, or None if disabled or unusable."""
+        if not path:
+            return None
+        try:
+            return _ResponseCache(path)
+        except sqlite3.Error as e:
+            logger.warning("⚠️  LLM response cache unavailable (%s), continuing without it", e)
+            return None
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _text_config(
+        max_tokens: int,
+        system_instruction: Optional[str] = None
+    ) -> "types.GenerateContentConfig":
+        """Generation config for plain-text responses, built once per combination."""
+        from google.genai import types
+        return types.GenerateContentConfig(
+            max_output_tokens=max_tokens,
+            temperature=0.7,
+            system_instruction=system_instruction,
+        )
+    
+    @staticmethod
+    def _with_retry(call: Callable[[], T]) -> T:
+        """Run an API call, retrying transient failures with backoff."""
+        for delay in _retry_delays():
+            try:
+                return call()
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                logger.warning("⚠️  LLM call failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+        return call()
+    
+    @staticmethod
+    async def _awith_retry(call: Callable[[], Awaitable[T]]) -> T:
+        """Async version of _with_retry."""
+        for delay in _retry_delays():
+            try:
+                return await call()
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                logger.warning("⚠️  LLM call failed (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+        return await call()
+    
+    def _generate(self, prompt: str, max_tokens: int = 4096, system_instruction: Optional[str] = None) -> str:
         """Generate text using Gemini."""
-        response = self.client.models.generate_content(
+        response = self._with_retry(lambda: self.client.models.generate_content(
             model=self.model,
             contents=prompt,
-            config=types.GenerateContentConfig(
-                max_output_tokens=max_tokens,
-                temperature=0.7,
-            )
-        )
+            config=self._text_config(max_tokens, system_instruction)
+        ))
         return response.text
     
+    def _generate_cached(
+        self,
+        prompt: str,
+        max_tokens: int = 4096,
+        force_refresh: bool = False,
+        system_instruction: Optional[str] = None
+    ) -> str:
+        """_generate, reusing the stored response for an identical prompt."""
+        if self._cache is None:
+            return self._generate(prompt, max_tokens, system_instruction)
+        key = self._cache.key(self.model, prompt, max_tokens, system_instruction)
+        if not force_refresh:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+        text = self._generate(prompt, max_tokens, system_instruction)
+        if text:
+            self._cache.set(key, text)
+        return text
+    
+    async def _agenerate_cached(
+        self,
+        prompt: str,
+        max_tokens: int = 4096,
+        force_refresh: bool = False,
+        system_instruction: Optional[str] = None
+    ) -> str:
+        """Async version of _generate_cached."""
+        key = self._cache.key(self.model, prompt, max_tokens, system_instruction) if self._cache else None
+        if key and not force_refresh:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+        
+        response = await self._awith_retry(lambda: self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._text_config(max_tokens, system_instruction)
+        ))
+        if key and response.text:
+            self._cache.set(key, response.text)
+        return response.text
+    
+    def _generate_stream(self, prompt: str, max_tokens: int = 4096) -> Iterator[str]:
+        """Generate text using Gemini, yielding chunks as they arrive."""
+        stream = self.client.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self._text_config(max_tokens)
+        )
+        for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+    
+    @staticmethod
+    def _json_config(
+        max_tokens: int,
+        cache_name: Optional[str] = None,
+        schema: Optional[Dict[str, Any]] = None
+    ) -> "types.GenerateContentConfig":
+        """Generation config for a JSON response; a chapter's {content, summary} unless schema is given."""
+        from google.genai import types
+        return types.GenerateContentConfig(
+            max_output_tokens=max_tokens,
+            temperature=0.7,
+            response_mime_type="application/json",
+            response_schema=schema or _CHAPTER_SCHEMA,
+            cached_content=cache_name,
+        )
+    
+    @staticmethod
+    def _parse_chapter_json(text: str) -> Dict[str, str]:
+        """Parse a {content, summary} response."""
+        try:
+            data = json.loads(text)
+            return {"content": data["content"], "summary": data["summary"]}
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            raise ValueError(f"Malformed chapter response from model: {e}") from e
+    
+    def _generate_chapter_json(
+        self,
+        prompt: str,
+        max_tokens: int = _CHAPTER_JSON_TOKENS,
+        cache_name: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Generate chapter content and summary in a single streamed call."""
+        def call() -> str:
+            stream = self.client.models.generate_content_stream(
+                model=self.model,
+                contents=prompt + _CHAPTER_JSON_INSTRUCTIONS,
+                config=self._json_config(max_tokens, cache_name)
+            )
+            return "".join(chunk.text for chunk in stream if chunk.text)
+        
+        return self._parse_chapter_json(self._with_retry(call))
+    
+    async def _agenerate_chapter_json(
+        self,
+        prompt: str,
+        max_tokens: int = _CHAPTER_JSON_TOKENS,
+        cache_name: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Async version of _generate_chapter_json."""
+        response = await self._awith_retry(lambda: self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt + _CHAPTER_JSON_INSTRUCTIONS,
+            config=self._json_config(max_tokens, cache_name)
+        ))
+        return self._parse_chapter_json(response.text)
+    
     # ==========================================================================
     # OUTLINE GENERATION
     # ==========================================================================
     
-    def generate_outline(self, title: str, notes: str) -> str:
+    def _outline_prompt(self, title: str, notes: str) -> str:
+        """Per-book part of an outline request; the rest is _OUTLINE_SYSTEM_PROMPT."""
+        return f"""BOOK TITLE: {title}
+
+EDITOR'S NOTES & REQUIREMENTS:
+{notes}
+
+Generate the outline now:"""
+    
+    def _regenerate_prompt(self, title: str, original_outline: str, feedback: str) -> str:
+        """Prompt for revising an outline to address editor feedback."""
+        return f"""You are an expert book author and editor. You need to revise a book outline based on feedback.
+
+BOOK TITLE: {title}
+
+ORIGINAL OUTLINE:
+{original_outline}
+
+EDITOR'S FEEDBACK FOR IMPROVEMENT:
+{feedback}
+
+Please revise the outline to address all the feedback. Maintain the same general format but incorporate the requested changes.
+
+Generate the improved outline now:"""
+    
+    def _multi_outline_prompt(self, items: List[Tuple[str, str]]) -> str:
+        """Prompt for outlines of several books, returned as one JSON array."""
+        books = "\n\n".join(
+            f"BOOK {i}\nBOOK TITLE: {title}\n\nEDITOR'S NOTES & REQUIREMENTS:\n{notes}"
+            for i, (title, notes) in enumerate(items, 1)
+        )
+        return f"""You are an expert book author and editor. Your task is to create a detailed book outline for each of the {len(items)} books below. Treat every book on its own; don't carry ideas from one to another.
+
+{books}
+
+For each book:
+{_OUTLINE_GUIDELINES}
+
+Respond with a JSON object whose "outlines" field is an array of exactly {len(items)} markdown outlines, one per book, in the order the books are listed above."""
+    
+    def generate_outline(self, title: str, notes: str, force_refresh: bool = False) -> str:
         """
         Generate a book outline based on title and notes.
         
         Args:
             title: Book title
             notes: Pre-outline notes from editor
+            force_refresh: Call the LLM even if this prompt has a cached response
             
         Returns:
             Generated outline as markdown string
         """
-        prompt = f"""You are an expert book author and editor. Your task is to create a detailed book outline.
-
-BOOK TITLE: {title}
-
-EDITOR'S NOTES & REQUIREMENTS:
-{notes}
-
-Please generate a comprehensive book outline with the following structure:
-1. An engaging introduction section
-2. Main chapters (aim for 8-12 chapters depending on scope)
-3. A conclusion/summary section
-
-For each chapter, provide:
-- Chapter number and title
-- Brief description (2-3 sentences) of what the chapter will cover
-- Key topics/subtopics as bullet points
-
-Format the outline in clear markdown with proper headings.
-
-IMPORTANT: Consider the editor's notes carefully when designing the structure and focus of each chapter.
-
-Generate the outline now:"""
-
-        return self._generate(prompt, max_tokens=4096)
+        return self._generate_cached(
+            self._outline_prompt(title, notes), 4096, force_refresh, _OUTLINE_SYSTEM_PROMPT
+        )
+    
+    async def agenerate_outline(self, title: str, notes: str, force_refresh: bool = False) -> str:
+        """Async version of generate_outline."""
+        return await self._agenerate_cached(
+            self._outline_prompt(title, notes), 4096, force_refresh, _OUTLINE_SYSTEM_PROMPT
+        )
     
-    def regenerate_outline(self, title: str, original_outline: str, feedback: str) -> str:
+    def regenerate_outline(
+        self,
+        title: str,
+        original_outline: str,
+        feedback: str,
+        force_refresh: bool = False
+    ) -> str:
         """
         Regenerate outline based on editor feedback.
         
@@ -81,73 +407,259 @@ Generate the outline now:"""
             title: Book title
             original_outline: Previously generated outline
             feedback: Editor's notes/feedback for improvement
+            force_refresh: Call the LLM even if this revision is cached
             
         Returns:
             Improved outline
         """
-        prompt = f"""You are an expert book author and editor. You need to revise a book outline based on feedback.
+        return self._generate_cached(
+            self._regenerate_prompt(title, original_outline, feedback), 4096, force_refresh
+        )
+    
+    async def aregenerate_outline(
+        self,
+        title: str,
+        original_outline: str,
+        feedback: str,
+        force_refresh: bool = False
+    ) -> str:
+        """Async version of regenerate_outline."""
+        return await self._agenerate_cached(
+            self._regenerate_prompt(title, original_outline, feedback), 4096, force_refresh
+        )
+    
+    def generate_outlines_multi(self, items: List[Tuple[str, str]]) -> List[str]:
+        """
+        Generate outlines for several books in a single request.
+        
+        Packing a few books into one call spreads the fixed per-request
+        overhead and uses fewer of the per-minute requests; 4-8 books per
+        call is a good range. The response shares the model's output limit,
+        so at most MAX_OUTLINES_PER_REQUEST books get a full outline budget.
+        
+        Args:
+            items: (title, notes) pairs
+            
+        Returns:
+            One outline per item, in the same order
+            
+        Raises:
+            ValueError: If the response doesn't hold one outline per item
+        """
+        response = self._with_retry(lambda: self.client.models.generate_content(
+            model=self.model,
+            contents=self._multi_outline_prompt(items),
+            config=self._json_config(self._outlines_budget(items), schema=_OUTLINES_SCHEMA)
+        ))
+        return self._parse_outlines_json(response.text, len(items))
+    
+    async def agenerate_outlines_multi(self, items: List[Tuple[str, str]]) -> List[str]:
+        """Async version of generate_outlines_multi."""
+        response = await self._awith_retry(lambda: self.client.aio.models.generate_content(
+            model=self.model,
+            contents=self._multi_outline_prompt(items),
+            config=self._json_config(self._outlines_budget(items), schema=_OUTLINES_SCHEMA)
+        ))
+        return self._parse_outlines_json(response.text, len(items))
+    
+    @staticmethod
+    def _outlines_budget(items: List[Tuple[str, str]]) -> int:
+        """Output tokens for a multi-outline call, within the model's limit."""
+        return min(_OUTLINE_TOKENS * len(items), GEMINI_MAX_OUTPUT_TOKENS)
+    
+    @staticmethod
+    def _parse_outlines_json(text: str, expected: int) -> List[str]:
+        """Parse an {outlines: [...]} response holding exactly `expected` outlines."""
+        try:
+            outlines = json.loads(text)["outlines"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            raise ValueError(f"Malformed outlines response from model: {e}") from e
+        if not isinstance(outlines, list) or len(outlines) != expected:
+            got = len(outlines) if isinstance(outlines, list) else type(outlines).__name__
+            raise ValueError(f"Expected {expected} outlines from model, got {got}")
+        return outlines
+    
+    # ==========================================================================
+    # BATCH GENERATION
+    # ==========================================================================
+    
+    def submit_outline_batch(self, items: List[Tuple[str, str]]) -> str:
+        """
+        Submit outline requests as one Gemini Batch API job.
+        
+        Batch jobs are billed at half the interactive rate and don't count
+        against per-minute limits, but may take a while to finish - fine
+        for generating outlines in bulk.
+        
+        Args:
+            items: (title, notes) pairs, one per outline
+            
+        Returns:
+            Batch job name, for poll_batch
+        """
+        requests = [
+            {
+                "contents": [{"role": "user", "parts": [{"text": self._outline_prompt(title, notes)}]}],
+                "config": {
+                    "system_instruction": _OUTLINE_SYSTEM_PROMPT,
+                    "max_output_tokens": 4096,
+                    "temperature": 0.7
+                }
+            }
+            for title, notes in items
+        ]
+        job = self.client.batches.create(
+            model=self.model,
+            src=requests,
+            config={"display_name": f"outlines-{len(requests)}"}
+        )
+        return job.name
+    
+    def poll_batch(
+        self,
+        job_name: str,
+        initial_delay: float = 10.0,
+        max_delay: float = 300.0
+    ) -> List[Optional[str]]:
+        """
+        Wait for a batch job to finish, checking with exponential backoff.
+        
+        Args:
+            job_name: Name returned by submit_outline_batch
+            initial_delay: Seconds before the second check
+            max_delay: Longest wait between checks
+            
+        Returns:
+            Response texts in the order the requests were submitted; None
+            for a request that failed
+        """
+        delay = initial_delay
+        job = self.client.batches.get(name=job_name)
+        while not job.done:
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+            job = self.client.batches.get(name=job_name)
+        
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Batch job {job_name} ended as {job.state.name}")
+        
+        responses = (job.dest.inlined_responses if job.dest else None) or []
+        return [item.response.text if item.response else None for item in responses]
+    
+    # ==========================================================================
+    # CHAPTER GENERATION
+    # ==========================================================================
+    
+    def _book_context(self, title: str, outline: str) -> str:
+        """The book-level start of every chapter prompt."""
+        return f"""You are an expert book author writing a chapter for a book.
 
 BOOK TITLE: {title}
 
-ORIGINAL OUTLINE:
-{original_outline}
-
-EDITOR'S FEEDBACK FOR IMPROVEMENT:
-{feedback}
-
-Please revise the outline to address all the feedback. Maintain the same general format but incorporate the requested changes.
-
-Generate the improved outline now:"""
+BOOK OUTLINE:
+{outline}
 
-        return self._generate(prompt, max_tokens=4096)
+"""
     
-    # ==========================================================================
-    # CHAPTER GENERATION
-    # ==========================================================================
+    def create_book_cache(self, title: str, outline: str, ttl: str = "3600s") -> Optional[str]:
+        """
+        Store a book's title and outline server-side with explicit context caching.
+        
+        Chapter calls that pass the returned name send only the per-chapter
+        part of the prompt instead of re-sending the outline every time.
+        
+        Args:
+            title: Book title
+            outline: Full book outline
+            ttl: How long Gemini keeps the cache
+            
+        Returns:
+            Cache name, or None if the cache could not be created (e.g. the
+            outline is below the model's minimum cacheable size)
+        """
+        try:
+            cache = self.client.caches.create(
+                model=self.model,
+                config=self._book_cache_config(title, outline, ttl)
+            )
+        except Exception:
+            # Callers fall back to sending the full prompt
+            return None
+        return cache.name
     
-    def generate_chapter(
+    async def acreate_book_cache(self, title: str, outline: str, ttl: str = "3600s") -> Optional[str]:
+        """Async version of create_book_cache."""
+        try:
+            cache = await self.client.aio.caches.create(
+                model=self.model,
+                config=self._book_cache_config(title, outline, ttl)
+            )
+        except Exception:
+            return None
+        return cache.name
+    
+    def _book_cache_config(self, title: str, outline: str, ttl: str):
+        """Cache config holding the book context shared by its chapter prompts."""
+        from google.genai import types
+        return types.CreateCachedContentConfig(
+            contents=[self._book_context(title, outline)],
+            ttl=ttl,
+        )
+    
+    def delete_book_cache(self, cache_name: str):
+        """Drop a cache created by create_book_cache; it would expire on its own otherwise."""
+        try:
+            self.client.caches.delete(name=cache_name)
+        except Exception:
+            pass
+    
+    async def adelete_book_cache(self, cache_name: str):
+        """Async version of delete_book_cache."""
+        try:
+            await self.client.aio.caches.delete(name=cache_name)
+        except Exception:
+            pass
+    
+    def _chapter_prompt(
         self,
         title: str,
         outline: str,
         chapter_number: int,
         chapter_title: str,
         previous_summaries: List[Dict[str, str]],
-        chapter_notes: Optional[str] = None
-    ) -> Dict[str, str]:
+        chapter_notes: Optional[str] = None,
+        cached: bool = False,
+        earlier_summary: Optional[str] = None
+    ) -> str:
         """
-        Generate a chapter with context from previous chapters.
+        Build the prompt for writing a chapter with previous-chapter context.
         
-        Args:
-            title: Book title
-            outline: Full book outline
-            chapter_number: Current chapter number
-            chapter_title: Title of the chapter to generate
-            previous_summaries: List of dicts with 'chapter_number', 'title', 'summary'
-            chapter_notes: Optional editor notes for this chapter
-            
-        Returns:
-            Dict with 'content' and 'summary' keys
+        Everything up to and including the previous-chapter summaries is laid
+        out identically for every chapter of a book, with summaries in chapter
+        order, so consecutive chapters share a growing prompt prefix that
+        Gemini's implicit prompt caching can reuse. Per-chapter parts go last.
+        With cached=True the book context is left out, since it lives in an
+        explicit cache from create_book_cache. earlier_summary condenses the
+        chapters before previous_summaries.
         """
         # Build context from previous chapters
         context = ""
+        if earlier_summary:
+            context = f"STORY SO FAR:\n{earlier_summary}\n\n"
         if previous_summaries:
-            context = "SUMMARY OF PREVIOUS CHAPTERS:\n"
-            for ch in previous_summaries:
-                context += f"\nChapter {ch['chapter_number']}: {ch.get('title', 'Untitled')}\n"
-                context += f"{ch.get('summary', 'No summary available.')}\n"
+            context += "SUMMARY OF PREVIOUS CHAPTERS:\n" + "".join(
+                f"\nChapter {ch['chapter_number']}: {ch.get('title', 'Untitled')}\n"
+                f"{ch.get('summary', 'No summary available.')}\n"
+                for ch in sorted(previous_summaries, key=lambda ch: ch['chapter_number'])
+            )
         
         notes_section = ""
         if chapter_notes:
             notes_section = f"\nEDITOR'S NOTES FOR THIS CHAPTER:\n{chapter_notes}\n"
         
-        prompt = f"""You are an expert book author writing a chapter for a book.
-
-BOOK TITLE: {title}
-
-BOOK OUTLINE:
-{outline}
-
-{context}
+        book_context = "" if cached else self._book_context(title, outline)
+        
+        return f"""{book_context}{context}
 
 CHAPTER TO WRITE: Chapter {chapter_number}: {chapter_title}
 {notes_section}
@@ -160,18 +672,82 @@ Write this chapter in a professional, engaging style that:
 5. Is approximately 2000-3000 words
 
 Write the complete chapter now:"""
-
-        content = self._generate(prompt, max_tokens=8192)
+    
+    def generate_chapter(
+        self,
+        title: str,
+        outline: str,
+        chapter_number: int,
+        chapter_title: str,
+        previous_summaries: List[Dict[str, str]],
+        chapter_notes: Optional[str] = None,
+        cache_name: Optional[str] = None,
+        earlier_summary: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Generate a chapter with context from previous chapters.
         
-        # Generate summary for context chaining
-        summary = self._generate_chapter_summary(title, chapter_number, chapter_title, content)
+        Args:
+            title: Book title
+            outline: Full book outline
+            chapter_number: Current chapter number
+            chapter_title: Title of the chapter to generate
+            previous_summaries: List of dicts with 'chapter_number', 'title', 'summary'
+            chapter_notes: Optional editor notes for this chapter
+            cache_name: Book cache from create_book_cache, if any
+            earlier_summary: Rolling summary of chapters before previous_summaries
+            
+        Returns:
+            Dict with 'content' and 'summary' keys
+        """
+        prompt = self._chapter_prompt(
+            title, outline, chapter_number, chapter_title, previous_summaries, chapter_notes,
+            cached=cache_name is not None, earlier_summary=earlier_summary
+        )
+        # The summary for context chaining comes back in the same call
+        return self._generate_chapter_json(prompt, cache_name=cache_name)
+    
+    def stream_chapter(
+        self,
+        title: str,
+        outline: str,
+        chapter_number: int,
+        chapter_title: str,
+        previous_summaries: List[Dict[str, str]],
+        chapter_notes: Optional[str] = None,
+        earlier_summary: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Stream a chapter's content as it is generated.
         
-        return {
-            "content": content,
-            "summary": summary
-        }
+        Takes the same arguments as generate_chapter. The summary is not
+        included; call summarize_chapter on the joined text afterwards.
+        """
+        prompt = self._chapter_prompt(
+            title, outline, chapter_number, chapter_title, previous_summaries, chapter_notes,
+            earlier_summary=earlier_summary
+        )
+        yield from self._generate_stream(prompt, max_tokens=8192)
+    
+    async def agenerate_chapter(
+        self,
+        title: str,
+        outline: str,
+        chapter_number: int,
+        chapter_title: str,
+        previous_summaries: List[Dict[str, str]],
+        chapter_notes: Optional[str] = None,
+        cache_name: Optional[str] = None,
+        earlier_summary: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Async version of generate_chapter, for writing several books at once."""
+        prompt = self._chapter_prompt(
+            title, outline, chapter_number, chapter_title, previous_summaries, chapter_notes,
+            cached=cache_name is not None, earlier_summary=earlier_summary
+        )
+        return await self._agenerate_chapter_json(prompt, cache_name=cache_name)
     
-    def _generate_chapter_summary(
+    def summarize_chapter(
         self, 
         title: str,
         chapter_number: int,
@@ -191,6 +767,35 @@ Provide a concise summary:"""
 
         return self._generate(prompt, max_tokens=500)
     
+    def condense_summaries(
+        self,
+        title: str,
+        running_summary: Optional[str],
+        summaries: List[Dict[str, str]]
+    ) -> str:
+        """
+        Fold chapter summaries into a short running summary of the book so far.
+        
+        Args:
+            title: Book title
+            running_summary: Existing running summary to extend, if any
+            summaries: Dicts with 'chapter_number', 'title', 'summary', in order
+        """
+        chapters = "".join(
+            f"\nChapter {ch['chapter_number']}: {ch.get('title', 'Untitled')}\n{ch['summary']}\n"
+            for ch in summaries
+        )
+        so_far = f"STORY SO FAR:\n{running_summary}\n\n" if running_summary else ""
+        prompt = f"""Condense the story so far of a book into one paragraph of at most 8 sentences. Keep the key concepts, arguments and any threads later chapters should build on.
+
+BOOK: {title}
+
+{so_far}CHAPTERS TO ADD:
+{chapters}
+Provide the condensed summary:"""
+
+        return self._generate(prompt, max_tokens=600)
+    
     def regenerate_chapter(
         self,
         title: str,
@@ -215,13 +820,7 @@ Revise the chapter to address all feedback while maintaining the overall flow an
 
 Generate the revised chapter:"""
 
-        content = self._generate(prompt, max_tokens=8192)
-        summary = self._generate_chapter_summary(title, chapter_number, chapter_title, content)
-        
-        return {
-            "content": content,
-            "summary": summary
-        }
+        return self._generate_chapter_json(prompt)
 
 
 # ==========================================================================
@@ -234,7 +833,7 @@ if __name__ == "__main__":
     
     try:
         llm = LLMService()
-        print(f"✅ LLM Service initialized with model: {Config.GEMINI_MODEL}")
+        print(f"✅ LLM Service initialized with model: {GEMINI_MODEL}")
         
         # Test outline generation
         print("\n📝 Testing outline generation...")
@@ -3,29 +3,82 @@ Main Orchestrator for the Book Generation System.
 Provides CLI interface and coordinates all workflow stages.
 """
 
-import argparse
+import logging
 import sys
-from typing import Optional
+from functools import cached_property
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Tuple, Callable
 
 from config import Config
 from database import Database
-from input_handler import InputHandler
-from outline_generator import OutlineGenerator
-from chapter_generator import ChapterGenerator
-from compiler import BookCompiler
-from notifications import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+# The stage modules pull in the LLM client, document libraries and mail/HTTP
+# code; each is imported the first time a command uses it, so commands like
+# 'status' load only the database layer
+if TYPE_CHECKING:
+    import argparse
+    from logging.handlers import QueueListener
+    from outline_generator import OutlineGenerator
+    from chapter_generator import ChapterGenerator
+    from compiler import BookCompiler
+    from notifications import NotificationService
 
 
 class BookGenerationOrchestrator:
     """Main orchestrator that coordinates all workflow stages."""
     
     def __init__(self):
-        """Initialize orchestrator with all components."""
+        """Initialize orchestrator; stage components are created on first use."""
         self.db = Database()
-        self.outline_gen = OutlineGenerator()
-        self.chapter_gen = ChapterGenerator()
-        self.compiler = BookCompiler()
-        self.notifier = NotificationService()
+        # book_id -> book row, for the length of one command; shared with the
+        # notifier so notifications don't re-fetch books loaded here
+        self._book_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+    
+    @cached_property
+    def outline_gen(self) -> "OutlineGenerator":
+        from outline_generator import OutlineGenerator
+        return OutlineGenerator()
+    
+    @cached_property
+    def chapter_gen(self) -> "ChapterGenerator":
+        from chapter_generator import ChapterGenerator
+        return ChapterGenerator()
+    
+    @cached_property
+    def compiler(self) -> "BookCompiler":
+        from compiler import BookCompiler
+        return BookCompiler()
+    
+    @cached_property
+    def notifier(self) -> "NotificationService":
+        from notifications import NotificationService
+        return NotificationService(book_cache=self._book_cache, buffer_logs=True)
+    
+    def flush_notifications(self):
+        """Write buffered notification logs, if a notifier was ever created."""
+        notifier = self.__dict__.get("notifier")
+        if notifier is not None:
+            notifier.flush_logs()
+    
+    def _get_book(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """Get a book, reading the database only the first time."""
+        if book_id not in self._book_cache:
+            self._book_cache[book_id] = self.db.get_book(book_id)
+        return self._book_cache[book_id]
+    
+    def _invalidate_book(self, book_id: str):
+        """Forget a cached book after a stage has written to it."""
+        self._book_cache.pop(book_id, None)
+    
+    def _store_outlines(self, processed: List[Dict[str, Any]]):
+        """Cache the rows written by outline generation, replacing stale copies."""
+        for entry in processed:
+            if entry.get('book'):
+                self._book_cache[entry['id']] = entry['book']
+            else:
+                self._invalidate_book(entry['id'])
     
     # ==========================================================================
     # WORKFLOW COMMANDS
@@ -33,82 +86,110 @@ class BookGenerationOrchestrator:
     
     def process_input(self):
         """Process input Excel file and create book entries."""
-        print("\n" + "=" * 60)
-        print("STAGE 1: PROCESSING INPUT FILE")
-        print("=" * 60)
+        logger.info("\n" + "=" * 60)
+        logger.info("STAGE 1: PROCESSING INPUT FILE")
+        logger.info("=" * 60)
         
         results = self.outline_gen.process_input_file()
         
-        print(f"\n📊 Summary:")
-        print(f"   Created: {len(results['created'])} book(s)")
-        print(f"   Skipped: {len(results['skipped'])} book(s)")
+        logger.info("\n📊 Summary:")
+        logger.info("   Created: %d book(s)", len(results['created']))
+        logger.info("   Skipped: %d book(s)", len(results['skipped']))
         
         if results['errors']:
-            print(f"   Errors: {len(results['errors'])}")
+            logger.info("   Errors: %d", len(results['errors']))
         
         return results
     
-    def generate_outlines(self):
-        """Generate outlines for pending books."""
-        print("\n" + "=" * 60)
-        print("STAGE 1: GENERATING OUTLINES")
-        print("=" * 60)
+    def generate_outlines(self, batch: bool = False):
+        """
+        Generate outlines for pending books.
         
-        processed = self.outline_gen.generate_outlines_for_pending()
+        Args:
+            batch: Use the Gemini Batch API (cheaper, but waits for the job)
+        """
+        logger.info("\n" + "=" * 60)
+        logger.info("STAGE 1: GENERATING OUTLINES")
+        logger.info("=" * 60)
+        
+        if batch:
+            processed = self.outline_gen.generate_outlines_for_pending_batch()
+        else:
+            processed = self.outline_gen.generate_outlines_for_pending()
         
-        # Send notifications for each completed outline
-        for book in processed:
-            self.notifier.notify_outline_ready(book['id'])
+        # Queue one digest notification for the completed outlines; it is
+        # sent in the background so the next stage doesn't wait
+        self._store_outlines(processed)
+        if processed:
+            self.notifier.notify_outlines_ready_async([book['id'] for book in processed])
         
-        print(f"\n📊 Generated {len(processed)} outline(s)")
+        logger.info("\n📊 Generated %d outline(s)", len(processed))
         return processed
     
     def generate_chapters(self, book_id: str, auto_approve: bool = False):
         """Generate chapters for a specific book."""
-        book = self.db.get_book(book_id)
+        book = self._get_book(book_id)
         if not book:
-            print(f"❌ Book not found: {book_id}")
+            logger.error("❌ Book not found: %s", book_id)
             return
         
-        print("\n" + "=" * 60)
-        print(f"STAGE 2: GENERATING CHAPTERS")
-        print(f"Book: {book['title']}")
-        print("=" * 60)
+        logger.info("\n" + "=" * 60)
+        logger.info("STAGE 2: GENERATING CHAPTERS")
+        logger.info("Book: %s", book['title'])
+        logger.info("=" * 60)
         
         try:
             generated = self.chapter_gen.generate_all_chapters(book_id, auto_approve)
             
-            print(f"\n📊 Generated {len(generated)} chapter(s)")
+            logger.info("\n📊 Generated %d chapter(s)", len(generated))
             
             # Get progress
             progress = self.chapter_gen.get_book_progress(book_id)
-            print(f"   Total: {progress['total_chapters']}")
-            print(f"   Generated: {progress['generated']}")
-            print(f"   Approved: {progress['approved']}")
+            logger.info("   Total: %d", progress['total_chapters'])
+            logger.info("   Generated: %d", progress['generated'])
+            logger.info("   Approved: %d", progress['approved'])
             
             return generated
             
         except ValueError as e:
-            print(f"❌ Error: {e}")
+            logger.error("❌ Error: %s", e)
             return None
     
+    def generate_chapters_for_books(self, book_ids: list, auto_approve: bool = False):
+        """Generate chapters for several books concurrently."""
+        logger.info("\n" + "=" * 60)
+        logger.info("STAGE 2: GENERATING CHAPTERS FOR %d BOOKS", len(book_ids))
+        logger.info("=" * 60)
+        
+        results = self.chapter_gen.generate_books(book_ids, auto_approve)
+        
+        logger.info("\n📊 Summary:")
+        for book_id, generated in results.items():
+            if isinstance(generated, Exception):
+                logger.error("   ❌ %s: %s", book_id, generated)
+            else:
+                logger.info("   ✅ %s: %d chapter(s)", book_id, len(generated))
+        
+        return results
+    
     def compile_book(self, book_id: str, formats: list = None, force: bool = False):
         """Compile book to output files."""
-        book = self.db.get_book(book_id)
+        book = self._get_book(book_id)
         if not book:
-            print(f"❌ Book not found: {book_id}")
+            logger.error("❌ Book not found: %s", book_id)
             return
         
-        print("\n" + "=" * 60)
-        print(f"STAGE 3: COMPILING BOOK")
-        print(f"Book: {book['title']}")
-        print("=" * 60)
+        logger.info("\n" + "=" * 60)
+        logger.info("STAGE 3: COMPILING BOOK")
+        logger.info("Book: %s", book['title'])
+        logger.info("=" * 60)
         
         results = self.compiler.compile_book(book_id, formats, force)
+        self._invalidate_book(book_id)  # Output paths and status were written
         
         # Send notification
-        if all(not str(v).startswith('Error') for v in results.values()):
-            self.notifier.notify_final_draft_ready(book_id, results)
+        if results['success']:
+            self.notifier.notify_final_draft_ready(book_id, results['outputs'])
         
         return results
     
@@ -120,9 +201,9 @@ class BookGenerationOrchestrator:
             book_id: Specific book ID, or None to process first available
             auto_approve: If True, auto-approve all stages
         """
-        print("\n" + "=" * 70)
-        print("RUNNING FULL BOOK GENERATION PIPELINE")
-        print("=" * 70)
+        logger.info("\n" + "=" * 70)
+        logger.info("RUNNING FULL BOOK GENERATION PIPELINE")
+        logger.info("=" * 70)
         
         # If no book_id, get first pending book
         if not book_id:
@@ -130,38 +211,44 @@ class BookGenerationOrchestrator:
             book_id = books[0]['id'] if books else None
         
         if not book_id:
-            print("❌ No books found. Process input file first.")
+            logger.error("❌ No books found. Process input file first.")
             return
         
-        book = self.db.get_book(book_id)
-        print(f"\n📚 Processing: {book['title']}")
+        book = self._get_book(book_id)
+        logger.info("\n📚 Processing: %s", book['title'])
         
         # Stage 1: Generate outline if needed
         if not book.get('outline'):
-            print("\n📝 Generating outline...")
-            self.outline_gen.generate_outlines_for_pending()
-            book = self.db.get_book(book_id)  # Refresh
+            logger.info("\n📝 Generating outline...")
+            processed = self.outline_gen.generate_outlines_for_pending()
+            # The updated row comes back with the results; only re-read it
+            # if this book's outline wasn't among them
+            if not any(entry['id'] == book_id for entry in processed):
+                self._invalidate_book(book_id)
+            self._store_outlines(processed)
+            book = self._get_book(book_id)
         
         if auto_approve and book.get('status_outline_notes') != 'no_notes_needed':
-            print("✅ Auto-approving outline...")
+            logger.info("✅ Auto-approving outline...")
             self.outline_gen.approve_outline(book_id, needs_notes=False)
+            self._invalidate_book(book_id)
         
         # Stage 2: Generate chapters
-        print("\n📖 Generating chapters...")
+        logger.info("\n📖 Generating chapters...")
         try:
             self.chapter_gen.generate_all_chapters(book_id, auto_approve=auto_approve)
         except ValueError as e:
-            print(f"⚠️  {e}")
+            logger.warning("⚠️  %s", e)
             return
         
         # Stage 3: Compile if all chapters approved
         progress = self.chapter_gen.get_book_progress(book_id)
         if progress['approved'] == progress['total_chapters']:
-            print("\n📄 Compiling book...")
+            logger.info("\n📄 Compiling book...")
             self.compile_book(book_id, force=True)
             self.notifier.notify_book_completed(book_id)
         else:
-            print(f"\n⏳ Chapters not fully approved: {progress['approved']}/{progress['total_chapters']}")
+            logger.info("\n⏳ Chapters not fully approved: %d/%d", progress['approved'], progress['total_chapters'])
     
     # ==========================================================================
     # STATUS COMMANDS
@@ -169,78 +256,106 @@ class BookGenerationOrchestrator:
     
     def show_status(self):
         """Show status of all books."""
-        print("\n" + "=" * 70)
-        print("BOOK GENERATION SYSTEM STATUS")
-        print("=" * 70)
+        # The report is collected and written in one go rather than a
+        # write per line, which adds up when it is piped to a file
+        lines: List[str] = []
+        append = lines.append
         
-        books = self.db.get_all_books()
+        append("\n" + "=" * 70)
+        append("BOOK GENERATION SYSTEM STATUS")
+        append("=" * 70)
         
-        if not books:
-            print("\n📭 No books in the system.")
-            print("   Run: python main.py process")
-            return
-        
-        for book in books:
-            print(f"\n📚 {book['title']}")
-            print(f"   ID: {book['id']}")
-            print(f"   Outline: {'✅ Generated' if book.get('outline') else '❌ Pending'}")
-            print(f"   Outline Status: {book.get('status_outline_notes', 'N/A')}")
-            print(f"   Book Status: {book.get('book_output_status', 'N/A')}")
+        # Chapter counts come with the books, so there is no query per book.
+        # Books are streamed page by page and the report is written out in
+        # chunks, so memory stays flat however many books there are.
+        books = 0
+        for book in self.db.iter_books_with_counts():
+            books += 1
+            append(f"\n📚 {book['title']}")
+            append(f"   ID: {book['id']}")
+            append(f"   Outline: {'✅ Generated' if book.get('outline') else '❌ Pending'}")
+            append(f"   Outline Status: {book.get('status_outline_notes', 'N/A')}")
+            append(f"   Book Status: {book.get('book_output_status', 'N/A')}")
             
-            chapters = self.db.get_book_chapters(book['id'])
-            if chapters:
-                generated = len([c for c in chapters if c.get('content')])
-                approved = len([c for c in chapters if c.get('status') == 'approved'])
-                print(f"   Chapters: {generated}/{len(chapters)} generated, {approved} approved")
+            if book['total_chapters']:
+                append(f"   Chapters: {book['generated_chapters']}/{book['total_chapters']} generated, {book['approved_chapters']} approved")
             
             # Output files
             if book.get('output_docx_path'):
-                print(f"   📄 DOCX: {book['output_docx_path']}")
+                append(f"   📄 DOCX: {book['output_docx_path']}")
             if book.get('output_pdf_path'):
-                print(f"   📄 PDF: {book['output_pdf_path']}")
+                append(f"   📄 PDF: {book['output_pdf_path']}")
             if book.get('output_txt_path'):
-                print(f"   📄 TXT: {book['output_txt_path']}")
+                append(f"   📄 TXT: {book['output_txt_path']}")
+            
+            if len(lines) >= STATUS_CHUNK_LINES:
+                _write_lines(lines)
+                lines.clear()
+        
+        if not books:
+            append("\n📭 No books in the system.")
+            append("   Run: python main.py process")
+        
+        if lines:
+            _write_lines(lines)
     
     def show_book_details(self, book_id: str):
         """Show detailed status for a specific book."""
-        book = self.db.get_book(book_id)
+        book = self._get_book(book_id)
         if not book:
             print(f"❌ Book not found: {book_id}")
             return
         
-        print("\n" + "=" * 70)
-        print(f"BOOK DETAILS: {book['title']}")
-        print("=" * 70)
+        lines: List[str] = []
+        append = lines.append
+        
+        append("\n" + "=" * 70)
+        append(f"BOOK DETAILS: {book['title']}")
+        append("=" * 70)
         
-        print(f"\n📚 Basic Info:")
-        print(f"   ID: {book['id']}")
-        print(f"   Created: {book.get('created_at', 'N/A')}")
+        append(f"\n📚 Basic Info:")
+        append(f"   ID: {book['id']}")
+        append(f"   Created: {book.get('created_at', 'N/A')}")
         
-        print(f"\n📝 Outline Stage:")
-        print(f"   Pre-notes: {'✅ Yes' if book.get('notes_on_outline_before') else '❌ No'}")
-        print(f"   Outline: {'✅ Generated' if book.get('outline') else '❌ Pending'}")
-        print(f"   Post-notes: {'✅ Yes' if book.get('notes_on_outline_after') else '⚪ Empty'}")
-        print(f"   Status: {book.get('status_outline_notes', 'N/A')}")
+        append(f"\n📝 Outline Stage:")
+        append(f"   Pre-notes: {'✅ Yes' if book.get('notes_on_outline_before') else '❌ No'}")
+        append(f"   Outline: {'✅ Generated' if book.get('outline') else '❌ Pending'}")
+        append(f"   Post-notes: {'✅ Yes' if book.get('notes_on_outline_after') else '⚪ Empty'}")
+        append(f"   Status: {book.get('status_outline_notes', 'N/A')}")
         
-        print(f"\n📖 Chapters:")
-        chapters = self.db.get_book_chapters(book['id'])
+        append(f"\n📖 Chapters:")
+        chapters = self.db.get_book_chapters_meta(book['id'])
         if chapters:
             for ch in chapters:
-                icon = "✅" if ch.get('status') == 'approved' else ("🔄" if ch.get('content') else "⏳")
-                print(f"   {icon} Ch {ch['chapter_number']}: {ch.get('title', 'Untitled')[:40]}")
-                print(f"      Status: {ch.get('status')} | Notes: {ch.get('notes_status')}")
+                icon = "✅" if ch.get('status') == 'approved' else ("🔄" if ch.get('has_content') else "⏳")
+                append(f"   {icon} Ch {ch['chapter_number']}: {ch.get('title', 'Untitled')[:40]}")
+                append(f"      Status: {ch.get('status')} | Notes: {ch.get('notes_status')}")
         else:
-            print("   No chapters initialized")
+            append("   No chapters initialized")
         
-        print(f"\n📄 Compilation:")
-        print(f"   Final Review: {book.get('final_review_notes_status', 'N/A')}")
-        print(f"   Output Status: {book.get('book_output_status', 'N/A')}")
+        append(f"\n📄 Compilation:")
+        append(f"   Final Review: {book.get('final_review_notes_status', 'N/A')}")
+        append(f"   Output Status: {book.get('book_output_status', 'N/A')}")
+        
+        _write_lines(lines)
+
+
+# show_status writes its report once this many lines have built up
+STATUS_CHUNK_LINES = 1000
+
 
+def _write_lines(lines: List[str]):
+    """Write a report to stdout with a single write call."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 # ==========================================================================
 # CLI INTERFACE
 # ==========================================================================
-def main():
+def _build_parser() -> "argparse.ArgumentParser":
+    """Build the full CLI parser."""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="Book Generation System - Automated book creation with LLM",
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -253,10 +368,11 @@ def main():
     
     # outlines - Generate outlines
     outline_parser = subparsers.add_parser('outlines', help='Generate outlines for pending books')
+    outline_parser.add_argument('--batch', action='store_true', help='Use the Gemini Batch API (half price, results may take hours)')
     
     # chapters - Generate chapters
-    chapters_parser = subparsers.add_parser('chapters', help='Generate chapters for a book')
-    chapters_parser.add_argument('book_id', help='Book ID')
+    chapters_parser = subparsers.add_parser('chapters', help='Generate chapters for one or more books')
+    chapters_parser.add_argument('book_ids', nargs='+', help='Book ID(s); several books are generated concurrently')
     chapters_parser.add_argument('--auto-approve', action='store_true', help='Auto-approve all chapters')
     
     # compile - Compile book
@@ -282,23 +398,109 @@ def main():
     approve_parser.add_argument('type', choices=['outline', 'chapter'], help='What to approve')
     approve_parser.add_argument('id', help='Book ID (for outline) or Chapter ID')
     
-    args = parser.parse_args()
+    return parser
+
+
+# Read-only commands with only positional arguments, run without building
+# the argparse tree: name -> (number of arguments, handler)
+_FAST_COMMANDS: Dict[str, Tuple[int, Callable[..., None]]] = {
+    'status': (0, lambda orchestrator: orchestrator.show_status()),
+    'details': (1, lambda orchestrator, book_id: orchestrator.show_book_details(book_id)),
+}
+
+
+def main():
+    argv = sys.argv[1:]
+    
+    # 'status' and 'details <book_id>' skip argparse; anything else, including
+    # flags such as --help, goes through the full parser
+    fast = _FAST_COMMANDS.get(argv[0]) if argv else None
+    if fast and len(argv) - 1 == fast[0] and not any(arg.startswith('-') for arg in argv[1:]):
+        _execute(lambda orchestrator: fast[1](orchestrator, *argv[1:]))
+        return
+    
+    parser = _build_parser()
+    args = parser.parse_args(argv)
     
     if not args.command:
         parser.print_help()
         return
     
+    _execute(lambda orchestrator: run_command(orchestrator, args))
+
+
+# Module loggers routed to the console; everything else keeps Python's defaults
+_APP_LOGGERS = (
+    __name__,
+    "outline_generator",
+    "chapter_generator",
+    "compiler",
+    "input_handler",
+    "llm_service",
+)
+
+
+def _start_logging() -> "QueueListener":
+    """
+    Send log records to the console through a background thread.
+    
+    Stage output and outline/chapter progress are all reported through
+    this app's module loggers. Records go onto one queue, so the worker
+    threads and coroutines that emit them never wait on console writes
+    and the console keeps their order. The root logger is left alone, so
+    library request logs (httpx, google-genai) stay quiet.
+    
+    Returns:
+        The running listener; stop it to flush remaining records
+    """
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+    
+    records: "queue.SimpleQueue" = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    
+    handler = QueueHandler(records)
+    for name in _APP_LOGGERS:
+        app_logger = logging.getLogger(name)
+        app_logger.addHandler(handler)
+        app_logger.setLevel(logging.INFO)
+        app_logger.propagate = False
+    
+    listener = QueueListener(records, console)
+    listener.start()
+    return listener
+
+
+def _execute(command: Callable[[BookGenerationOrchestrator], None]):
+    """Run a command against a fresh orchestrator."""
+    listener = _start_logging()
     orchestrator = BookGenerationOrchestrator()
     
+    try:
+        command(orchestrator)
+    finally:
+        try:
+            # Notification logs are buffered during the command; write them in one go
+            orchestrator.flush_notifications()
+        finally:
+            listener.stop()
+
+
+def run_command(orchestrator: BookGenerationOrchestrator, args: "argparse.Namespace"):
+    """Dispatch a parsed CLI command to the orchestrator."""
     if args.command == 'process':
         orchestrator.process_input()
         orchestrator.generate_outlines()
     
     elif args.command == 'outlines':
-        orchestrator.generate_outlines()
+        orchestrator.generate_outlines(batch=args.batch)
     
     elif args.command == 'chapters':
-        orchestrator.generate_chapters(args.book_id, args.auto_approve)
+        if len(args.book_ids) > 1:
+            orchestrator.generate_chapters_for_books(args.book_ids, args.auto_approve)
+        else:
+            orchestrator.generate_chapters(args.book_ids[0], args.auto_approve)
     
     elif args.command == 'compile':
         orchestrator.compile_book(args.book_id, args.formats, args.force)
@@ -315,10 +517,10 @@ def main():
     elif args.command == 'approve':
         if args.type == 'outline':
             orchestrator.outline_gen.approve_outline(args.id, needs_notes=False)
-            print(f"✅ Outline approved for book: {args.id}")
+            logger.info("✅ Outline approved for book: %s", args.id)
         else:
             orchestrator.chapter_gen.approve_chapter(args.id)
-            print(f"✅ Chapter approved: {args.id}")
+            logger.info("✅ Chapter approved: %s", args.id)
 
 
 if __name__ == "__main__":
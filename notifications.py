@@ -3,27 +3,358 @@ Notification module for the Book Generation System.
 Handles email notifications and optional MS Teams webhooks.
 """
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional, Dict, Any
-import requests
+import atexit
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Dict, Any, Callable, Iterator, List, Tuple
 
 from database import Database
 from config import Config
 
+# smtplib/email and requests are imported by the methods that send, so
+# commands that never notify don't pay for loading them
+if TYPE_CHECKING:
+    import smtplib
+    import requests
+
+
+# Power Automate Workflow webhooks (Adaptive Card payload) as opposed to
+# legacy Office 365 Connectors (MessageCard payload)
+_WORKFLOW_URL_RE = re.compile(r"logic\.azure\.com|prod-|powerplatform\.com")
+
+
+_TEAMS_NOT_CONFIGURED = {"success": False, "error": "MS Teams webhook not configured"}
+
+
+def _teams_configured(webhook_url: Optional[str]) -> bool:
+    """Whether a Teams webhook URL is set, rather than empty or the placeholder."""
+    return bool(webhook_url) and 'your-webhook' not in webhook_url.lower()
+
+
+# Fixed parts of the Teams payloads. Per message only the text fields
+# change, so payloads are assembled from these with the None placeholders
+# filled in, copying just the dicts along the changed paths; the static
+# blocks are shared and never mutated.
+_CARD_TITLE_BLOCK = {
+    "type": "TextBlock",
+    "text": None,
+    "weight": "Bolder",
+    "size": "Large",
+    "wrap": True,
+    "color": "Accent"
+}
+
+_CARD_TEXT_BLOCK = {
+    "type": "TextBlock",
+    "text": None,
+    "wrap": True,
+    "spacing": "Medium"
+}
+
+_CARD_FOOTER_BLOCK = {
+    "type": "TextBlock",
+    "text": "— Book Generation System",
+    "size": "Small",
+    "color": "Light",
+    "spacing": "Large"
+}
+
+_ADAPTIVE_CARD = {
+    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+    "type": "AdaptiveCard",
+    "version": "1.4",
+    "body": None
+}
+
+_CARD_ATTACHMENT = {
+    "contentType": "application/vnd.microsoft.card.adaptive",
+    "contentUrl": None,
+    "content": None
+}
+
+_MESSAGE_CARD = {
+    "@type": "MessageCard",
+    "@context": "http://schema.org/extensions",
+    "summary": None,
+    "themeColor": "0076D7",
+    "title": None,
+    "text": None
+}
+
+
+def _workflow_payload(title: str, message: str) -> Dict[str, Any]:
+    """Adaptive Card message for a Power Automate Workflow webhook."""
+    card = {
+        **_ADAPTIVE_CARD,
+        "body": [
+            {**_CARD_TITLE_BLOCK, "text": title},
+            {**_CARD_TEXT_BLOCK, "text": message},
+            _CARD_FOOTER_BLOCK
+        ]
+    }
+    return {"type": "message", "attachments": [{**_CARD_ATTACHMENT, "content": card}]}
+
+
+@lru_cache(maxsize=None)
+def _event_label(event_type: str) -> str:
+    """Display form of an event type: 'outline_ready' -> 'Outline Ready'."""
+    return event_type.replace('_', ' ').title()
+
+
+# Notification texts are fixed apart from a few fields, filled in with
+# str.format_map (values aren't re-parsed, so braces in them are safe)
+_HTML_TEMPLATE = """
+        <html>
+        <body style="font-family: Arial, sans-serif;">
+            <h2>📚 {event}</h2>
+            <p><strong>Book:</strong> {book_title}</p>
+            <hr>
+            <p>{message}</p>
+            <hr>
+            <p style="color: #666; font-size: 12px;">
+                This is an automated notification from the Book Generation System.
+            </p>
+        </body>
+        </html>
+        """
+
+_OUTLINE_READY_TEMPLATE = """The outline for "{title}" has been generated and is ready for your review.
+
+Please review the outline in the database and:
+- Add any notes in the 'notes_on_outline_after' field
+- Set 'status_outline_notes' to 'no_notes_needed' to proceed to chapter generation
+- Or set it to 'yes' if you need more time to review
+
+Book ID: {book_id}"""
+
+_OUTLINES_READY_TEMPLATE = """Outlines for {count} books have been generated and are ready for your review:
+
+{books}
+
+Please review each outline in the database and:
+- Add any notes in the 'notes_on_outline_after' field
+- Set 'status_outline_notes' to 'no_notes_needed' to proceed to chapter generation
+- Or set it to 'yes' if you need more time to review"""
+
+_WAITING_CHAPTER_NOTES_TEMPLATE = """Chapter {chapter_number} of "{title}" has been generated and is waiting for your review.
+
+Please review the chapter in the database and:
+- Add any notes to improve the chapter
+- Set the chapter's 'notes_status' to 'no_notes_needed' to approve
+
+Book ID: {book_id}"""
+
+_CHAPTER_READY_TEMPLATE = """Chapter {chapter_number} of "{title}" has been successfully generated.
+
+The chapter is now available in the database for review.
+
+Book ID: {book_id}"""
+
+_FINAL_DRAFT_READY_TEMPLATE = """🎉 The book "{title}" has been compiled successfully!
+
+Output files:
+{paths}
+
+The book is now complete and ready for use.
+
+Book ID: {book_id}"""
+
+_ERROR_TEMPLATE = """⚠️ The book generation workflow has encountered an issue:
+
+{error}
+
+Please check the database and resolve the issue to continue.
+
+Book ID: {book_id}"""
+
+_BOOK_COMPLETED_TEMPLATE = """🎊 Congratulations! The book "{title}" is now COMPLETE!
+
+All chapters have been generated, reviewed, and the final draft has been compiled.
+
+The book files are available in the output directory.
+
+Book ID: {book_id}"""
+
 
 class NotificationService:
     """Handles notifications via Email and MS Teams."""
     
-    def __init__(self):
-        """Initialize notification service."""
+    # Buffered log rows are written once this many have queued up
+    LOG_FLUSH_SIZE = 50
+    
+    def __init__(
+        self,
+        book_cache: Optional[Dict[str, Dict[str, Any]]] = None,
+        buffer_logs: bool = False
+    ):
+        """
+        Initialize notification service.
+        
+        Args:
+            book_cache: Optional book_id -> book dict shared with the caller,
+                        so books it has already loaded aren't fetched again
+            buffer_logs: If True, notification log rows are collected and
+                         written in bulk by flush_logs() (also run at exit)
+                         instead of one insert per notification
+        """
         self.db = Database()
+        self._book_cache = book_cache
+        
+        self._buffer_logs = buffer_logs
+        self._pending_logs: List[Dict[str, Any]] = []
+        self._log_lock = threading.Lock()
+        
+        # Background senders for the *_async methods; queued notifications
+        # are still delivered before the process exits. atexit runs handlers
+        # last-in first-out, so the pool drains before the final log flush.
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="notify")
+        atexit.register(self.flush_logs)
+        atexit.register(self._executor.shutdown, wait=True)
+        
+        # Runs the Teams half of a notification sent on both channels. Its
+        # tasks never wait on other notifications, so it can be used from
+        # the background senders without risk of them blocking each other.
+        self._channel_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="notify-teams")
+        
+        # Open SMTP connection while inside session(). smtplib isn't
+        # thread-safe, so it is only read and used while holding the lock.
+        self._smtp: Optional["smtplib.SMTP"] = None
+        self._smtp_lock = threading.Lock()
+        
+        # Checked once, so notify() skips building Teams messages that would
+        # only be rejected
+        self._teams_enabled = _teams_configured(Config.TEAMS_WEBHOOK_URL)
+        
+        # Webhook session, created on the first Teams message
+        self._http_session: Optional["requests.Session"] = None
+        self._http_lock = threading.Lock()
+    
+    @property
+    def _http(self) -> "requests.Session":
+        """
+        Pooled HTTPS session for webhooks, so back-to-back Teams messages
+        reuse the TLS connection; transient failures are retried.
+        """
+        with self._http_lock:
+            if self._http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=8,
+                    max_retries=Retry(
+                        total=3,
+                        backoff_factor=0.2,
+                        status_forcelist=[429, 500, 502, 503, 504],
+                        # Webhooks are POSTs, which urllib3 doesn't retry by default
+                        allowed_methods=frozenset({"POST"}),
+                        # Hand the last response back so it is reported as 'HTTP <code>'
+                        raise_on_status=False
+                    )
+                ))
+                self._http_session = session
+            return self._http_session
+    
+    def _get_book(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """Get a book, from the shared cache when there is one."""
+        if self._book_cache is None:
+            return self.db.get_book(book_id)
+        if book_id not in self._book_cache:
+            self._book_cache[book_id] = self.db.get_book(book_id)
+        return self._book_cache[book_id]
+    
+    def _get_books(self, book_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several books with one query for those not already cached."""
+        cache = self._book_cache if self._book_cache is not None else {}
+        missing = [book_id for book_id in book_ids if book_id not in cache]
+        if missing:
+            fetched = {book["id"]: book for book in self.db.get_books_bulk(missing)}
+            for book_id in missing:
+                cache[book_id] = fetched.get(book_id)
+        return {book_id: cache[book_id] for book_id in book_ids if cache[book_id]}
     
     # ==========================================================================
     # EMAIL NOTIFICATIONS
     # ==========================================================================
     
+    @contextmanager
+    def session(self) -> Iterator["NotificationService"]:
+        """
+        Keep one authenticated SMTP connection open for a burst of emails.
+        
+        Emails sent inside the block reuse it instead of connecting, setting
+        up TLS and logging in for each message. If the connection can't be
+        opened, or another session already holds one, send_email keeps
+        working as usual.
+        """
+        if not (Config.SMTP_USER and Config.SMTP_PASSWORD):
+            yield self
+            return
+        
+        with self._smtp_lock:
+            if self._smtp is not None:
+                server = None
+            else:
+                try:
+                    server = self._smtp = self._connect_smtp()
+                except Exception:
+                    server = None
+        
+        if server is None:
+            yield self
+            return
+        
+        try:
+            yield self
+        finally:
+            with self._smtp_lock:
+                self._smtp = None
+                try:
+                    server.quit()
+                except Exception:
+                    pass
+    
+    def _send_over_session(self, msg) -> bool:
+        """Send through the session connection; False if there isn't one or it failed."""
+        with self._smtp_lock:
+            if self._smtp is None:
+                return False
+            try:
+                self._smtp.send_message(msg)
+                return True
+            except Exception:
+                # Likely dropped by the server; later sends connect themselves
+                self._smtp = None
+                return False
+    
+    @staticmethod
+    def _connect_smtp() -> "smtplib.SMTP":
+        """
+        Open an authenticated SMTP connection.
+        
+        With SMTP_USE_SSL the connection is TLS from the start (SMTPS),
+        which saves the plaintext EHLO and STARTTLS round trips.
+        """
+        import smtplib
+        
+        if Config.SMTP_USE_SSL:
+            server = smtplib.SMTP_SSL(Config.SMTP_HOST, Config.SMTP_PORT)
+        else:
+            server = smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT)
+            server.starttls()
+        try:
+            server.login(Config.SMTP_USER, Config.SMTP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
     def send_email(
         self, 
         subject: str, 
@@ -51,6 +382,9 @@ class NotificationService:
                 "error": "Email configuration incomplete. Check SMTP_USER, SMTP_PASSWORD, NOTIFICATION_EMAIL"
             }
         
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        
         try:
             # Create message
             msg = MIMEMultipart('alternative')
@@ -65,11 +399,10 @@ class NotificationService:
             if html_body:
                 msg.attach(MIMEText(html_body, 'html'))
             
-            # Connect and send
-            with smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT) as server:
-                server.starttls()
-                server.login(Config.SMTP_USER, Config.SMTP_PASSWORD)
-                server.send_message(msg)
+            # Reuse the session connection if one is open, else connect and send
+            if not self._send_over_session(msg):
+                with self._connect_smtp() as server:
+                    server.send_message(msg)
             
             return {"success": True, "message": f"Email sent to {to_email}"}
             
@@ -94,71 +427,27 @@ class NotificationService:
         """
         webhook_url = Config.TEAMS_WEBHOOK_URL
         
-        if not webhook_url or 'your-webhook' in webhook_url.lower():
-            return {
-                "success": False,
-                "error": "MS Teams webhook not configured"
-            }
+        if not _teams_configured(webhook_url):
+            return dict(_TEAMS_NOT_CONFIGURED)
         
         try:
             # Detect webhook type based on URL pattern
-            is_workflow = (
-                'logic.azure.com' in webhook_url or 
-                'prod-' in webhook_url or
-                'powerplatform.com' in webhook_url
-            )
+            is_workflow = _WORKFLOW_URL_RE.search(webhook_url) is not None
             
+            heading = title or "📚 Book Generation Update"
             if is_workflow:
                 # New Power Automate Workflow format (Adaptive Card)
-                payload = {
-                    "type": "message",
-                    "attachments": [
-                        {
-                            "contentType": "application/vnd.microsoft.card.adaptive",
-                            "contentUrl": None,
-                            "content": {
-                                "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-                                "type": "AdaptiveCard",
-                                "version": "1.4",
-                                "body": [
-                                    {
-                                        "type": "TextBlock",
-                                        "text": title or "📚 Book Generation Update",
-                                        "weight": "Bolder",
-                                        "size": "Large",
-                                        "wrap": True,
-                                        "color": "Accent"
-                                    },
-                                    {
-                                        "type": "TextBlock",
-                                        "text": message,
-                                        "wrap": True,
-                                        "spacing": "Medium"
-                                    },
-                                    {
-                                        "type": "TextBlock",
-                                        "text": "— Book Generation System",
-                                        "size": "Small",
-                                        "color": "Light",
-                                        "spacing": "Large"
-                                    }
-                                ]
-                            }
-                        }
-                    ]
-                }
+                payload = _workflow_payload(heading, message)
             else:
                 # Legacy Connector format (MessageCard)
                 payload = {
-                    "@type": "MessageCard",
-                    "@context": "http://schema.org/extensions",
+                    **_MESSAGE_CARD,
                     "summary": title or "Book Generation System",
-                    "themeColor": "0076D7",
-                    "title": title or "📚 Book Generation Update",
+                    "title": heading,
                     "text": message
                 }
             
-            response = requests.post(
+            response = self._http.post(
                 webhook_url,
                 json=payload,
                 headers={"Content-Type": "application/json"}
@@ -183,7 +472,8 @@ class NotificationService:
         book_id: str, 
         message: str,
         use_email: bool = True,
-        use_teams: bool = False
+        use_teams: bool = False,
+        book: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Send notification and log to database.
@@ -194,47 +484,49 @@ class NotificationService:
             message: Notification message
             use_email: Send via email
             use_teams: Send via Teams
+            book: Already-loaded book record (fetched if omitted)
             
         Returns:
             Status dict
         """
-        book = self.db.get_book(book_id)
+        if book is None:
+            book = self._get_book(book_id)
         book_title = book['title'] if book else "Unknown Book"
         
         results = {"email": None, "teams": None}
         
         # Prepare email content
-        subject = f"[Book Generator] {event_type.replace('_', ' ').title()}: {book_title}"
+        event = _event_label(event_type)
+        subject = f"[Book Generator] {event}: {book_title}"
         
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif;">
-            <h2>📚 {event_type.replace('_', ' ').title()}</h2>
-            <p><strong>Book:</strong> {book_title}</p>
-            <hr>
-            <p>{message}</p>
-            <hr>
-            <p style="color: #666; font-size: 12px;">
-                This is an automated notification from the Book Generation System.
-            </p>
-        </body>
-        </html>
-        """
+        html_body = _HTML_TEMPLATE.format_map({
+            "event": event, "book_title": book_title, "message": message
+        })
+        
+        # Send Teams, alongside the email when both are enabled
+        teams = None
+        if use_teams and not self._teams_enabled:
+            results["teams"] = dict(_TEAMS_NOT_CONFIGURED)
+        elif use_teams:
+            teams_args = (f"**{book_title}**\n\n{message}",)
+            teams_kwargs = {"title": f"📚 {event}"}
+            if use_email:
+                teams = self._channel_executor.submit(
+                    self.send_teams_notification, *teams_args, **teams_kwargs
+                )
+            else:
+                results["teams"] = self.send_teams_notification(*teams_args, **teams_kwargs)
         
         # Send email
         if use_email:
             results["email"] = self.send_email(subject, message, html_body=html_body)
         
-        # Send Teams
-        if use_teams:
-            results["teams"] = self.send_teams_notification(
-                f"**{book_title}**\n\n{message}",
-                title=f"📚 {event_type.replace('_', ' ').title()}"
-            )
+        if teams is not None:
+            results["teams"] = teams.result()
         
         # Log to database
         email_status = "sent" if results.get("email", {}).get("success") else "failed"
-        self.db.log_notification(
+        self._log(
             book_id=book_id,
             event_type=event_type,
             message=message,
@@ -244,99 +536,211 @@ class NotificationService:
         
         return results
     
+    def notify_outlines_ready_batch(self, book_ids: List[str]) -> Dict[str, Any]:
+        """
+        Send one digest notification for several finished outlines.
+        
+        Books are loaded in one query and the digest goes out as a single
+        email; a log row is still written for every book. A lone book gets
+        the regular notify_outline_ready message.
+        
+        Args:
+            book_ids: IDs of books whose outlines are ready
+            
+        Returns:
+            Status dict
+        """
+        if len(book_ids) == 1:
+            return self.notify_outline_ready(book_ids[0])
+        
+        books = self._get_books(book_ids)
+        if not books:
+            return {"email": None, "teams": None}
+        
+        listing = "\n".join(
+            f"- {book['title']} (Book ID: {book_id})" for book_id, book in books.items()
+        )
+        message = _OUTLINES_READY_TEMPLATE.format_map({"count": len(books), "books": listing})
+        
+        event = _event_label("outline_ready")
+        subject = f"[Book Generator] {event}: {len(books)} books"
+        html_body = _HTML_TEMPLATE.format_map({
+            "event": event, "book_title": f"{len(books)} books", "message": message
+        })
+        results = {"email": self.send_email(subject, message, html_body=html_body), "teams": None}
+        
+        email_status = "sent" if results["email"].get("success") else "failed"
+        rows = [
+            {
+                "book_id": book_id,
+                "event_type": "outline_ready",
+                "message": message,
+                "recipient": Config.NOTIFICATION_EMAIL,
+                "status": email_status
+            }
+            for book_id in books
+        ]
+        if self._buffer_logs:
+            for row in rows:
+                self._log(**row)
+        else:
+            self.db.log_notifications_bulk(rows)
+        
+        return results
+    
+    def _log(self, **row):
+        """Write a notification log row, or queue it when buffering."""
+        if not self._buffer_logs:
+            self.db.log_notification(**row)
+            return
+        
+        with self._log_lock:
+            self._pending_logs.append(row)
+            full = len(self._pending_logs) >= self.LOG_FLUSH_SIZE
+        if full:
+            self.flush_logs()
+    
+    def flush_logs(self) -> int:
+        """
+        Write all queued notification log rows in one insert.
+        
+        Returns:
+            Number of rows written
+        """
+        with self._log_lock:
+            rows, self._pending_logs = self._pending_logs, []
+        if not rows:
+            return 0
+        
+        try:
+            self.db.log_notifications_bulk(rows)
+        except Exception as e:
+            # Keep the rows for the next flush rather than losing them
+            with self._log_lock:
+                self._pending_logs[:0] = rows
+            print(f"⚠️  Could not write {len(rows)} notification log(s): {e}")
+            return 0
+        return len(rows)
+    
+    # ==========================================================================
+    # BACKGROUND DELIVERY
+    # ==========================================================================
+    
+    def submit(self, send: Callable[..., Dict[str, Any]], *args, **kwargs) -> Future:
+        """
+        Run a notification method on a background thread.
+        
+        SMTP and webhook latency then stays off the caller's path. Failures
+        are printed, since nobody may be waiting on the future.
+        """
+        future = self._executor.submit(send, *args, **kwargs)
+        future.add_done_callback(self._report_failure)
+        return future
+    
+    @staticmethod
+    def _report_failure(future: Future):
+        """Print an exception raised by a background notification."""
+        error = future.exception()
+        if error is not None:
+            print(f"⚠️  Notification failed: {error}")
+    
+    def notify_async(self, event_type: str, book_id: str, message: str, **kwargs) -> Future:
+        """Background version of notify; takes the same arguments."""
+        return self.submit(self.notify, event_type, book_id, message, **kwargs)
+    
+    def notify_outline_ready_async(self, book_id: str) -> Future:
+        """Background version of notify_outline_ready."""
+        return self.submit(self.notify_outline_ready, book_id)
+    
+    def notify_many(self, events: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        """
+        Send several notifications concurrently and wait for all of them.
+        
+        Each send is network-bound, so they overlap on a short-lived pool
+        of their own (safe to call from a background notification too).
+        The emails share one SMTP session rather than each logging in.
+        
+        Args:
+            events: (event_type, book_id, message) tuples, as taken by notify
+            
+        Returns:
+            Status dicts, in the order of events
+        """
+        if not events:
+            return []
+        with self.session():
+            with ThreadPoolExecutor(max_workers=min(8, len(events)), thread_name_prefix="notify-many") as pool:
+                return list(pool.map(lambda event: self.notify(*event), events))
+    
+    def notify_chapters_ready(self, book_id: str, chapter_numbers: List[int]) -> List[Dict[str, Any]]:
+        """Send notify_chapter_ready for several chapters of a book concurrently."""
+        book = self._get_book(book_id)
+        title = book['title'] if book else "Unknown Book"
+        return self.notify_many([
+            (
+                "chapter_ready",
+                book_id,
+                _CHAPTER_READY_TEMPLATE.format_map({
+                    "chapter_number": number, "title": title, "book_id": book_id
+                })
+            )
+            for number in chapter_numbers
+        ])
+    
+    def notify_outlines_ready_async(self, book_ids: List[str]) -> Future:
+        """Background version of notify_outlines_ready_batch."""
+        return self.submit(self.notify_outlines_ready_batch, book_ids)
+    
     # ==========================================================================
     # PREDEFINED NOTIFICATIONS
     # ==========================================================================
     
     def notify_outline_ready(self, book_id: str) -> Dict[str, Any]:
         """Notify that outline is ready for review."""
-        book = self.db.get_book(book_id)
-        message = f"""
-The outline for "{book['title']}" has been generated and is ready for your review.
-
-Please review the outline in the database and:
-- Add any notes in the 'notes_on_outline_after' field
-- Set 'status_outline_notes' to 'no_notes_needed' to proceed to chapter generation
-- Or set it to 'yes' if you need more time to review
-
-Book ID: {book_id}
-        """
-        return self.notify("outline_ready", book_id, message.strip())
+        book = self._get_book(book_id)
+        message = _OUTLINE_READY_TEMPLATE.format_map({"title": book['title'], "book_id": book_id})
+        return self.notify("outline_ready", book_id, message, book=book)
     
     def notify_waiting_chapter_notes(self, book_id: str, chapter_number: int) -> Dict[str, Any]:
         """Notify that a chapter is waiting for notes/approval."""
-        book = self.db.get_book(book_id)
-        message = f"""
-Chapter {chapter_number} of "{book['title']}" has been generated and is waiting for your review.
-
-Please review the chapter in the database and:
-- Add any notes to improve the chapter
-- Set the chapter's 'notes_status' to 'no_notes_needed' to approve
-
-Book ID: {book_id}
-        """
-        return self.notify("waiting_chapter_notes", book_id, message.strip())
+        book = self._get_book(book_id)
+        message = _WAITING_CHAPTER_NOTES_TEMPLATE.format_map({
+            "chapter_number": chapter_number, "title": book['title'], "book_id": book_id
+        })
+        return self.notify("waiting_chapter_notes", book_id, message, book=book)
     
     def notify_chapter_ready(self, book_id: str, chapter_number: int) -> Dict[str, Any]:
         """Notify that a chapter has been generated."""
-        book = self.db.get_book(book_id)
-        message = f"""
-Chapter {chapter_number} of "{book['title']}" has been successfully generated.
-
-The chapter is now available in the database for review.
-
-Book ID: {book_id}
-        """
-        return self.notify("chapter_ready", book_id, message.strip())
+        book = self._get_book(book_id)
+        message = _CHAPTER_READY_TEMPLATE.format_map({
+            "chapter_number": chapter_number, "title": book['title'], "book_id": book_id
+        })
+        return self.notify("chapter_ready", book_id, message, book=book)
     
     def notify_final_draft_ready(self, book_id: str, output_paths: Dict[str, str]) -> Dict[str, Any]:
         """Notify that the final draft is compiled."""
-        book = self.db.get_book(book_id)
+        book = self._get_book(book_id)
         
         paths_text = "\n".join([
             f"- {fmt.upper()}: {path}" 
             for fmt, path in output_paths.items()
         ])
         
-        message = f"""
-🎉 The book "{book['title']}" has been compiled successfully!
-
-Output files:
-{paths_text}
-
-The book is now complete and ready for use.
-
-Book ID: {book_id}
-        """
-        return self.notify("final_draft_ready", book_id, message.strip())
+        message = _FINAL_DRAFT_READY_TEMPLATE.format_map({
+            "title": book['title'], "paths": paths_text, "book_id": book_id
+        })
+        return self.notify("final_draft_ready", book_id, message, book=book)
     
     def notify_error(self, book_id: str, error_message: str) -> Dict[str, Any]:
         """Notify about an error or pause."""
-        message = f"""
-⚠️ The book generation workflow has encountered an issue:
-
-{error_message}
-
-Please check the database and resolve the issue to continue.
-
-Book ID: {book_id}
-        """
-        return self.notify("error_pause", book_id, message.strip())
+        message = _ERROR_TEMPLATE.format_map({"error": error_message, "book_id": book_id})
+        return self.notify("error_pause", book_id, message)
     
     def notify_book_completed(self, book_id: str) -> Dict[str, Any]:
         """Notify that the entire book is complete."""
-        book = self.db.get_book(book_id)
-        message = f"""
-🎊 Congratulations! The book "{book['title']}" is now COMPLETE!
-
-All chapters have been generated, reviewed, and the final draft has been compiled.
-
-The book files are available in the output directory.
-
-Book ID: {book_id}
-        """
-        return self.notify("book_completed", book_id, message.strip())
-
+        book = self._get_book(book_id)
+        message = _BOOK_COMPLETED_TEMPLATE.format_map({"title": book['title'], "book_id": book_id})
+        return self.notify("book_completed", book_id, message, book=book)
 
 # ==========================================================================
 # TEST
@@ -3,16 +3,28 @@ Outline Generator module for the Book Generation System.
 Handles Stage 1: Input processing and outline generation with gating logic.
 """
 
-from typing import Optional, List, Dict, Any
+import asyncio
+import logging
+from typing import Optional, List, Dict, Any, Iterator, Iterable, Tuple, Union
 from database import Database
-from llm_service import LLMService
+from llm_service import LLMService, MAX_OUTLINES_PER_REQUEST, is_transient_error
 from input_handler import InputHandler
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+# A generated outline, or the error that stopped it
+OutlineResult = Union[str, Exception]
+
 
 class OutlineGenerator:
     """Handles outline generation workflow with gating logic."""
     
+    # Generated outlines are written in batches of up to this many books, or
+    # after this many seconds, whichever comes first
+    OUTLINE_WRITE_BATCH = 10
+    OUTLINE_WRITE_INTERVAL = 0.5
+    
     def __init__(self):
         """Initialize outline generator with dependencies."""
         self.db = Database()
@@ -26,8 +38,8 @@ class OutlineGenerator:
         Returns:
             Summary of processed books
         """
-        print("\n📖 Reading books from input file...")
-        books = self.input_handler.get_books_for_processing()
+        logger.info("📖 Reading books from input file...")
+        books = list(self.input_handler.get_books_for_processing())
         
         results = {
             "created": [],
@@ -35,88 +47,289 @@ class OutlineGenerator:
             "errors": []
         }
         
+        # Look up all input titles in one indexed query
+        existing_titles = self.db.get_books_by_titles([book_data.title for book_data in books])
+        
+        new_books = []
         for book_data in books:
+            # Check if book already exists (or appears earlier in the file)
+            key = self.db.normalize_title(book_data.title)
+            if key in existing_titles:
+                logger.info("⏭️  Skipping '%s' - already exists in database", book_data.title)
+                results["skipped"].append(book_data.title)
+                continue
+            existing_titles[key] = book_data
+            new_books.append({
+                "title": book_data.title,
+                "notes_on_outline_before": book_data.notes_on_outline_before
+            })
+        
+        # Create all new books with one insert; if it fails, create them one
+        # at a time so each failure is reported against its own row
+        try:
+            created = self.db.create_books_bulk(new_books)
+        except Exception:
+            created = None
+        
+        if created is not None:
+            for book in created:
+                logger.info("✅ Created: '%s'", book['title'])
+            results["created"].extend(created)
+            return results
+        
+        for book_data in new_books:
             try:
-                # Check if book already exists
-                existing = self._find_existing_book(book_data["title"])
-                if existing:
-                    print(f"⏭️  Skipping '{book_data['title']}' - already exists in database")
-                    results["skipped"].append(book_data["title"])
-                    continue
-                
-                # Create new book entry
-                book = self.db.create_book(
-                    title=book_data["title"],
-                    notes_on_outline_before=book_data["notes_on_outline_before"]
-                )
-                print(f"✅ Created: '{book_data['title']}'")
+                book = self.db.create_book(**book_data)
+                logger.info("✅ Created: '%s'", book_data['title'])
                 results["created"].append(book)
                 
             except Exception as e:
-                print(f"❌ Error creating '{book_data['title']}': {e}")
+                logger.error("❌ Error creating '%s': %s", book_data['title'], e)
                 results["errors"].append({"title": book_data["title"], "error": str(e)})
         
         return results
     
-    def _find_existing_book(self, title: str) -> Optional[Dict[str, Any]]:
-        """Check if a book with the same title exists."""
-        all_books = self.db.get_all_books()
-        for book in all_books:
-            if book["title"].lower().strip() == title.lower().strip():
-                return book
-        return None
-    
-    def generate_outlines_for_pending(self) -> List[Dict[str, Any]]:
+    def generate_outlines_for_pending(self, books: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """
         Generate outlines for all books that have pre-outline notes but no outline.
         
+        Args:
+            books: Books to consider, if already fetched (defaults to all books)
+        
         Returns:
-            List of books with newly generated outlines
+            List of books with newly generated outlines; each entry's 'book'
+            is the updated database row
         """
-        print("\n📝 Checking for books pending outline generation...")
+        return asyncio.run(self.agenerate_outlines_for_pending(books))
+    
+    async def agenerate_outlines_for_pending(self, books: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Async version of generate_outlines_for_pending.
+        
+        The LLM calls for all pending books run concurrently, at most
+        Config.OUTLINE_CONCURRENCY at a time. With Config.OUTLINES_PER_REQUEST
+        above 1, that many books share each call, up to what fits in the
+        model's output limit. Finished outlines are saved in the background
+        while the remaining calls are in flight.
+        """
+        logger.info("📝 Checking for books pending outline generation...")
+        
+        if books is None:
+            books = await asyncio.to_thread(self.db.get_all_books)
+        pending = self._pending_books(books)
+        
+        # Groups stay small enough for every outline to fit in one response
+        per_request = min(max(1, Config.OUTLINES_PER_REQUEST), MAX_OUTLINES_PER_REQUEST)
+        groups = [pending[i:i + per_request] for i in range(0, len(pending), per_request)]
+        limit = asyncio.Semaphore(max(1, Config.OUTLINE_CONCURRENCY))
+        finished: asyncio.Queue = asyncio.Queue()
+        
+        async def generate(group: List[Dict[str, Any]]):
+            async with limit:
+                if len(group) == 1:
+                    outlines = [await self._agenerate_outline(group[0])]
+                else:
+                    outlines = await self._agenerate_outline_group(group)
+            for book, outline in zip(group, outlines):
+                finished.put_nowait((book, outline))
         
-        all_books = self.db.get_all_books()
+        writer = asyncio.create_task(self._awrite_outlines(finished))
+        try:
+            await asyncio.gather(*(generate(group) for group in groups))
+        finally:
+            finished.put_nowait(None)  # Tells the writer no more outlines are coming
+        return await writer
+    
+    async def _awrite_outlines(self, finished: asyncio.Queue) -> List[Dict[str, Any]]:
+        """
+        Save (book, outline) pairs from the queue until it yields None.
+        
+        Pairs are grouped into one _save_outlines call per
+        OUTLINE_WRITE_BATCH books or OUTLINE_WRITE_INTERVAL seconds.
+        
+        Returns:
+            Result entries for all stored outlines
+        """
+        loop = asyncio.get_running_loop()
         processed = []
+        done = False
+        while not done:
+            item = await finished.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.OUTLINE_WRITE_INTERVAL
+            while len(batch) < self.OUTLINE_WRITE_BATCH:
+                try:
+                    item = await asyncio.wait_for(finished.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            
+            books, outlines = zip(*batch)
+            processed.extend(await asyncio.to_thread(self._save_outlines, list(books), list(outlines)))
+        return processed
+    
+    def generate_outlines_for_pending_batch(self, books: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Generate pending outlines through the Gemini Batch API.
+        
+        Cheaper than generate_outlines_for_pending for bulk runs, but blocks
+        until the batch job finishes, which can take much longer. Falls back
+        to the direct path if the batch can't be run.
+        
+        Args:
+            books: Books to consider, if already fetched (defaults to all books)
+        
+        Returns:
+            Same as generate_outlines_for_pending
+        """
+        logger.info("📝 Checking for books pending outline generation...")
+        
+        pending = self._pending_books(self.db.get_all_books() if books is None else books)
+        if not pending:
+            return []
+        
+        try:
+            job_name = self.llm.submit_outline_batch(
+                [(book["title"], book["notes_on_outline_before"]) for book in pending]
+            )
+            logger.info("📦 Submitted batch %s for %d outline(s), waiting for results...", job_name, len(pending))
+            outlines = self.llm.poll_batch(job_name)
+        except Exception as e:
+            logger.warning("⚠️  Batch generation unavailable (%s), generating outlines directly", e)
+            return self.generate_outlines_for_pending(books)
+        
+        results: List[OutlineResult] = []
+        for i, book in enumerate(pending):
+            outline = outlines[i] if i < len(outlines) else None
+            if not outline:
+                outline = ValueError("no result in batch")
+                self._report_outline_failed(book, outline)
+            results.append(outline)
         
+        return self._save_outlines(pending, results)
+    
+    def _pending_books(self, all_books: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Books that need an outline, with the reason logged for those skipped."""
+        pending = []
         for book in all_books:
             # Skip if already has outline
             if book.get("outline"):
-                print(f"⏭️  '{book['title']}' - Already has outline")
+                logger.info("⏭️  '%s' - Already has outline", book['title'])
                 continue
             
             # Skip if no pre-outline notes (required per spec)
             if not book.get("notes_on_outline_before"):
-                print(f"⏭️  '{book['title']}' - No pre-outline notes, skipping")
+                logger.info("⏭️  '%s' - No pre-outline notes, skipping", book['title'])
                 continue
             
-            # Generate outline
-            print(f"\n🤖 Generating outline for: '{book['title']}'...")
-            try:
-                outline = self.llm.generate_outline(
-                    title=book["title"],
-                    notes=book["notes_on_outline_before"]
-                )
-                
-                # Store outline and set status to 'yes' (waiting for review)
-                self.db.update_book(
-                    book["id"],
-                    outline=outline,
-                    status_outline_notes="yes"  # Waiting for editor review
-                )
-                
-                print(f"✅ Outline generated ({len(outline)} chars)")
-                processed.append({
-                    "id": book["id"],
-                    "title": book["title"],
-                    "outline_length": len(outline)
-                })
-                
-            except Exception as e:
-                print(f"❌ Error generating outline: {e}")
-                self.db.update_book(book["id"], book_output_status="error")
+            pending.append(book)
+        return pending
+    
+    async def _agenerate_outline(self, book: Dict[str, Any]) -> OutlineResult:
+        """Generate the outline for one book, or return the error if it failed."""
+        logger.info("🤖 Generating outline for: '%s'...", book['title'])
+        try:
+            outline = await self.llm.agenerate_outline(
+                title=book["title"],
+                notes=book["notes_on_outline_before"]
+            )
+            if not outline:
+                raise ValueError("empty outline in response")
+            return outline
+        except Exception as e:
+            self._report_outline_failed(book, e)
+            return e
+    
+    async def _agenerate_outline_group(self, books: List[Dict[str, Any]]) -> List[OutlineResult]:
+        """
+        Generate outlines for several books in one LLM call.
+        
+        If the combined call fails or comes back malformed, the books are
+        generated one by one instead.
+        """
+        logger.info("🤖 Generating outlines for: %s...", ", ".join(repr(book['title']) for book in books))
+        try:
+            outlines = await self.llm.agenerate_outlines_multi(
+                [(book["title"], book["notes_on_outline_before"]) for book in books]
+            )
+        except Exception as e:
+            logger.warning("⚠️  Combined outline request failed (%s), generating one by one", e)
+            return [await self._agenerate_outline(book) for book in books]
+        
+        results: List[OutlineResult] = []
+        for book, outline in zip(books, outlines):
+            if not outline:
+                outline = ValueError("empty outline in combined response")
+                self._report_outline_failed(book, outline)
+            results.append(outline)
+        return results
+    
+    def _save_outlines(
+        self,
+        books: List[Dict[str, Any]],
+        outlines: List[OutlineResult]
+    ) -> List[Dict[str, Any]]:
+        """
+        Store generated outlines and flag failed books, in one database call.
+        
+        Books that failed with a transient error (rate limit, timeout,
+        server error) are left untouched so the next run picks them up.
+        
+        Args:
+            books: Books outlines were generated for
+            outlines: Outline per book, or the error where generation failed
+            
+        Returns:
+            Result entries for the books whose outline was stored
+        """
+        updates = []
+        for book, outline in zip(books, outlines):
+            if isinstance(outline, str):
+                # Store outline and set status to 'yes' (waiting for editor review)
+                updates.append({"id": book["id"], "outline": outline, "status_outline_notes": "yes"})
+            elif is_transient_error(outline):
+                logger.info("🔁 '%s' left pending for the next run", book['title'])
+            else:
+                updates.append({"id": book["id"], "book_output_status": "error"})
+        if not updates:
+            return []
         
+        try:
+            rows = {row["id"]: row for row in self.db.bulk_update_books(updates)}
+        except Exception as e:
+            # Fall back to one update per book
+            logger.warning("⚠️  Bulk update failed (%s), saving outlines one by one", e)
+            rows = {}
+            for update in updates:
+                book_id = update.pop("id")
+                try:
+                    rows[book_id] = self.db.update_book(book_id, **update)
+                except Exception as err:
+                    logger.error("❌ Could not save book %s: %s", book_id, err)
+        
+        processed = []
+        for book, outline in zip(books, outlines):
+            if not isinstance(outline, str) or book["id"] not in rows:
+                continue
+            logger.info("✅ Outline generated for '%s' (%d chars)", book['title'], len(outline))
+            processed.append({
+                "id": book["id"],
+                "title": book["title"],
+                "outline_length": len(outline),
+                "book": rows[book["id"]]  # Row as stored, so callers needn't re-read it
+            })
         return processed
     
+    @staticmethod
+    def _report_outline_failed(book: Dict[str, Any], error: Any):
+        """Log a failed outline; the book is flagged when outlines are saved."""
+        logger.error("❌ Error generating outline for '%s': %s", book['title'], error)
+    
     def check_outline_status(self, book_id: str) -> Dict[str, Any]:
         """
         Check outline status and proceed based on gating logic.
@@ -174,7 +387,16 @@ class OutlineGenerator:
         Returns:
             Updated book info
         """
-        book = self.db.get_book(book_id)
+        return asyncio.run(self.aregenerate_outline(book_id))
+    
+    async def aregenerate_outline(self, book_id: str) -> Dict[str, Any]:
+        """
+        Async version of regenerate_outline.
+        
+        Database calls run in worker threads and the LLM call is awaited,
+        so one event loop can serve many regenerations at once.
+        """
+        book = await asyncio.to_thread(self.db.get_book, book_id)
         if not book:
             return {"error": "Book not found"}
         
@@ -184,24 +406,26 @@ class OutlineGenerator:
         if not book.get("outline"):
             return {"error": "No existing outline to regenerate"}
         
-        print(f"\n🔄 Regenerating outline for: '{book['title']}'...")
+        logger.info("🔄 Regenerating outline for: '%s'...", book['title'])
         
         try:
-            new_outline = self.llm.regenerate_outline(
+            new_outline = await self.llm.aregenerate_outline(
                 title=book["title"],
                 original_outline=book["outline"],
-                feedback=book["notes_on_outline_after"]
+                feedback=book["notes_on_outline_after"],
+                force_refresh=True
             )
             
             # Update outline and reset status
-            self.db.update_book(
+            await asyncio.to_thread(
+                self.db.update_book,
                 book_id,
                 outline=new_outline,
                 notes_on_outline_after=None,  # Clear used notes
                 status_outline_notes="yes"    # Back to waiting for review
             )
             
-            print(f"✅ Outline regenerated ({len(new_outline)} chars)")
+            logger.info("✅ Outline regenerated (%d chars)", len(new_outline))
             return {
                 "success": True,
                 "book_id": book_id,
@@ -209,7 +433,7 @@ class OutlineGenerator:
             }
             
         except Exception as e:
-            print(f"❌ Error: {e}")
+            logger.error("❌ Error: %s", e)
             return {"error": str(e)}
     
     def approve_outline(self, book_id: str, needs_notes: bool = False) -> Dict[str, Any]:
@@ -230,39 +454,88 @@ class OutlineGenerator:
         )
         
         action = "waiting for notes" if needs_notes else "ready for chapter generation"
-        print(f"✅ Outline status updated: {action}")
+        logger.info("✅ Outline status updated: %s", action)
         
         return {"success": True, "status": status, "action": action}
     
-    def get_pending_reviews(self) -> List[Dict[str, Any]]:
-        """Get all books waiting for outline review."""
-        all_books = self.db.get_all_books()
-        return [
-            {
-                "id": book["id"],
-                "title": book["title"],
-                "status": book.get("status_outline_notes"),
-                "has_outline": bool(book.get("outline")),
-                "has_post_notes": bool(book.get("notes_on_outline_after"))
-            }
-            for book in all_books
-            if book.get("outline") and book.get("status_outline_notes") == "yes"
-        ]
+    async def aapprove_outline(self, book_id: str, needs_notes: bool = False) -> Dict[str, Any]:
+        """Async version of approve_outline."""
+        return await asyncio.to_thread(self.approve_outline, book_id, needs_notes)
+    
+    def get_pending_reviews(self, books: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Get all books (or those given) waiting for outline review."""
+        return list(self.iter_pending_reviews(books))
+    
+    def get_ready_for_chapters(self, books: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Get all books (or those given) ready for chapter generation."""
+        return list(self.iter_ready_for_chapters(books))
+    
+    def iter_pending_reviews(self, books: Optional[Iterable[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield books waiting for outline review.
+        
+        Args:
+            books: Books to filter (defaults to all books)
+        """
+        books = self.db.get_all_books() if books is None else books
+        return (self._review_entry(book) for book in books if self._is_pending_review(book))
     
-    def get_ready_for_chapters(self) -> List[Dict[str, Any]]:
-        """Get all books ready for chapter generation."""
-        all_books = self.db.get_all_books()
-        return [
-            book for book in all_books
-            if book.get("status_outline_notes") == "no_notes_needed"
-            and book.get("outline")
-        ]
+    def iter_ready_for_chapters(self, books: Optional[Iterable[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield books ready for chapter generation.
+        
+        Args:
+            books: Books to filter (defaults to all books)
+        """
+        books = self.db.get_all_books() if books is None else books
+        return (book for book in books if self._is_ready_for_chapters(book))
+    
+    def partition_books_by_status(
+        self,
+        books: Optional[Iterable[Dict[str, Any]]] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Split books into pending reviews and ready-for-chapters in one pass.
+        
+        Args:
+            books: Books to split (defaults to all books)
+        
+        Returns:
+            (pending_reviews, ready_for_chapters), shaped like
+            get_pending_reviews and get_ready_for_chapters
+        """
+        pending, ready = [], []
+        for book in self.db.get_all_books() if books is None else books:
+            if self._is_pending_review(book):
+                pending.append(self._review_entry(book))
+            elif self._is_ready_for_chapters(book):
+                ready.append(book)
+        return pending, ready
+    
+    @staticmethod
+    def _is_pending_review(book: Dict[str, Any]) -> bool:
+        return bool(book.get("outline")) and book.get("status_outline_notes") == "yes"
+    
+    @staticmethod
+    def _is_ready_for_chapters(book: Dict[str, Any]) -> bool:
+        return book.get("status_outline_notes") == "no_notes_needed" and bool(book.get("outline"))
+    
+    @staticmethod
+    def _review_entry(book: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": book["id"],
+            "title": book["title"],
+            "status": book.get("status_outline_notes"),
+            "has_outline": bool(book.get("outline")),
+            "has_post_notes": bool(book.get("notes_on_outline_after"))
+        }
 
 
 # ==========================================================================
 # TEST
 # ==========================================================================
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("=" * 60)
     print("OUTLINE GENERATOR TEST")
     print("=" * 60)
@@ -280,19 +553,24 @@ if __name__ == "__main__":
     print("\n" + "=" * 40)
     print("STEP 2: Generate Outlines")
     print("=" * 40)
-    processed = generator.generate_outlines_for_pending()
+    # Fetched once, after the input file has added its books
+    books = generator.db.get_all_books()
+    processed = generator.generate_outlines_for_pending(books)
     print(f"\n📊 Generated {len(processed)} outline(s)")
     
     # Step 3: Show pending reviews
     print("\n" + "=" * 40)
     print("STEP 3: Books Waiting for Review")
     print("=" * 40)
-    pending = generator.get_pending_reviews()
-    for book in pending:
-        print(f"   📚 {book['title']} (ID: {book['id'][:8]}...)")
-    
-    if not pending:
+    updated = {entry["id"]: entry["book"] for entry in processed}
+    books = [updated.get(book["id"], book) for book in books]
+    pending = generator.iter_pending_reviews(books)
+    first = next(pending, None)
+    if first is None:
         print("   No books waiting for review")
+    else:
+        for book in (first, *pending):
+            print(f"   📚 {book['title']} (ID: {book['id'][:8]}...)")
     
     print("\n" + "=" * 60)
     print("TEST COMPLETE")
@@ -40,6 +40,11 @@ CREATE TABLE IF NOT EXISTS books (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Normalized title (trimmed, lower-cased) for indexed duplicate checks;
+-- kept by Postgres, must match Database.normalize_title
+ALTER TABLE books ADD COLUMN IF NOT EXISTS title_norm TEXT
+    GENERATED ALWAYS AS (lower(btrim(title, E' \t\r\n'))) STORED;
+
 -- ============================================================================
 -- TABLE: chapters
 -- Individual chapters for each book with summaries for context chaining
@@ -69,6 +74,41 @@ CREATE TABLE IF NOT EXISTS chapters (
     UNIQUE(book_id, chapter_number)
 );
 
+-- ============================================================================
+-- VIEW: chapters_meta
+-- Chapter rows without the content column, for listing pages
+-- ============================================================================
+CREATE OR REPLACE VIEW chapters_meta AS
+SELECT
+    id,
+    book_id,
+    chapter_number,
+    title,
+    summary,
+    notes,
+    notes_status,
+    status,
+    (content IS NOT NULL AND content <> '') AS has_content,
+    created_at,
+    updated_at
+FROM chapters;
+
+-- ============================================================================
+-- VIEW: books_with_counts
+-- Book rows plus chapter counts, so status listings need no per-book query
+-- (dropped first: b.* changes whenever a column is added to books)
+-- ============================================================================
+DROP VIEW IF EXISTS books_with_counts;
+CREATE VIEW books_with_counts AS
+SELECT
+    b.*,
+    COUNT(c.id) AS total_chapters,
+    COUNT(c.id) FILTER (WHERE c.content IS NOT NULL AND c.content <> '') AS generated_chapters,
+    COUNT(c.id) FILTER (WHERE c.status = 'approved') AS approved_chapters
+FROM books b
+LEFT JOIN chapters c ON c.book_id = b.id
+GROUP BY b.id;
+
 -- ============================================================================
 -- TABLE: notifications_log
 -- Track all notifications sent
@@ -96,10 +136,22 @@ CREATE TABLE IF NOT EXISTS notifications_log (
     sent_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- ============================================================================
+-- TABLE: meta
+-- Single-row write counter; the dashboard keys its caches on version
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO meta (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
 -- ============================================================================
 -- INDEXES for better query performance
 -- ============================================================================
 CREATE INDEX IF NOT EXISTS idx_books_status ON books(book_output_status);
+CREATE INDEX IF NOT EXISTS idx_books_title_norm ON books(title_norm);
 CREATE INDEX IF NOT EXISTS idx_chapters_book_id ON chapters(book_id);
 CREATE INDEX IF NOT EXISTS idx_chapters_status ON chapters(status);
 CREATE INDEX IF NOT EXISTS idx_notifications_book_id ON notifications_log(book_id);
@@ -125,6 +177,145 @@ CREATE TRIGGER update_chapters_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================================================
+-- TRIGGER: Bump meta.version on any write to books or chapters
+-- Runs in the same transaction as the write itself
+-- ============================================================================
+CREATE OR REPLACE FUNCTION bump_meta_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE meta SET version = version + 1 WHERE id = 1;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER bump_version_on_books
+    AFTER INSERT OR UPDATE OR DELETE ON books
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_meta_version();
+
+CREATE TRIGGER bump_version_on_chapters
+    AFTER INSERT OR UPDATE OR DELETE ON chapters
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_meta_version();
+
+-- ============================================================================
+-- FUNCTION: Per-stage book counts for the dashboard workflow state
+-- Called via supabase.rpc('get_workflow_counts')
+-- ============================================================================
+CREATE OR REPLACE FUNCTION get_workflow_counts()
+RETURNS TABLE (
+    total_books BIGINT,
+    needs_outline BIGINT,
+    needs_approval BIGINT,
+    needs_chapters BIGINT,
+    ready_for_compile BIGINT
+) AS $$
+    SELECT
+        COUNT(*),
+        COUNT(*) FILTER (WHERE b.outline IS NULL OR b.outline = ''),
+        COUNT(*) FILTER (WHERE b.outline <> '' AND b.status_outline_notes = 'yes'),
+        COUNT(*) FILTER (
+            WHERE b.status_outline_notes = 'no_notes_needed'
+            AND (
+                NOT EXISTS (SELECT 1 FROM chapters c WHERE c.book_id = b.id)
+                OR EXISTS (
+                    SELECT 1 FROM chapters c
+                    WHERE c.book_id = b.id AND (c.content IS NULL OR c.content = '')
+                )
+            )
+        ),
+        COUNT(*) FILTER (
+            WHERE b.status_outline_notes = 'no_notes_needed'
+            AND b.book_output_status IS DISTINCT FROM 'completed'
+        )
+    FROM books b;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- FUNCTION: One book with its chapters and chapter counts, as JSON
+-- Called via supabase.rpc('get_workflow_status', {'p_book_id': ...});
+-- returns NULL if the book does not exist
+-- ============================================================================
+CREATE OR REPLACE FUNCTION get_workflow_status(p_book_id UUID)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'book', to_json(b),
+        'chapters', COALESCE(ch.rows, '[]'::json),
+        'total_chapters', ch.total,
+        'completed_chapters', ch.approved,
+        'pending_chapters', ch.pending
+    )
+    FROM books b
+    CROSS JOIN LATERAL (
+        SELECT
+            json_agg(c ORDER BY c.chapter_number) AS rows,
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE c.status = 'approved') AS approved,
+            COUNT(*) FILTER (WHERE c.status = 'pending') AS pending
+        FROM chapters c
+        WHERE c.book_id = b.id
+    ) ch
+    WHERE b.id = p_book_id;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- FUNCTION: Store a generated chapter without returning the row
+-- Called via supabase.rpc('update_chapter_content', {...}); a NULL
+-- p_notes_status leaves notes_status as it is
+-- ============================================================================
+CREATE OR REPLACE FUNCTION update_chapter_content(
+    p_chapter_id UUID,
+    p_content TEXT,
+    p_summary TEXT,
+    p_status TEXT DEFAULT 'generated',
+    p_notes_status TEXT DEFAULT NULL
+)
+RETURNS VOID AS $$
+    UPDATE chapters
+    SET content = p_content,
+        summary = p_summary,
+        status = p_status,
+        notes_status = COALESCE(p_notes_status, notes_status)
+    WHERE id = p_chapter_id;
+$$ LANGUAGE sql;
+
+-- ============================================================================
+-- FUNCTION: Apply different field updates to several books at once
+-- Called via supabase.rpc('bulk_update_books', {'p_updates': [...]}) with a
+-- JSON array of {"id": ..., <column>: <value>, ...}; runs in one transaction
+-- and returns the updated rows. Columns not given keep their values.
+-- ============================================================================
+CREATE OR REPLACE FUNCTION bulk_update_books(p_updates JSONB)
+RETURNS SETOF books AS $$
+DECLARE
+    item JSONB;
+    rec books;
+BEGIN
+    FOR item IN SELECT * FROM jsonb_array_elements(p_updates) LOOP
+        SELECT * INTO rec FROM books WHERE id = (item->>'id')::UUID FOR UPDATE;
+        CONTINUE WHEN NOT FOUND;
+        
+        rec := jsonb_populate_record(rec, item - 'id');
+        UPDATE books
+        SET title = rec.title,
+            notes_on_outline_before = rec.notes_on_outline_before,
+            outline = rec.outline,
+            notes_on_outline_after = rec.notes_on_outline_after,
+            status_outline_notes = rec.status_outline_notes,
+            final_review_notes = rec.final_review_notes,
+            final_review_notes_status = rec.final_review_notes_status,
+            book_output_status = rec.book_output_status,
+            output_docx_path = rec.output_docx_path,
+            output_pdf_path = rec.output_pdf_path,
+            output_txt_path = rec.output_txt_path
+        WHERE id = rec.id
+        RETURNING * INTO rec;
+        RETURN NEXT rec;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ============================================================================
 -- Row Level Security (RLS) - Enable for production
 -- For now, we'll use service role key which bypasses RLS
@@ -0,0 +1,52 @@
+"""
+Compile the project .env file into a plain Python module.
+
+config.py imports the generated config_env.py instead of parsing .env on
+every process start; the import system caches it as bytecode. Re-run this
+script after editing .env (config.py ignores config_env.py while it is
+older than .env).
+
+Usage:
+    python scripts/compile_env.py
+"""
+
+import sys
+from pathlib import Path
+from dotenv import dotenv_values
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ENV_FILE = PROJECT_ROOT / ".env"
+OUTPUT_FILE = PROJECT_ROOT / "config_env.py"
+
+
+def compile_env(env_file: Path = ENV_FILE, output_file: Path = OUTPUT_FILE) -> int:
+    """
+    Write every key in env_file as a string assignment in output_file.
+    
+    Returns:
+        Number of variables written
+    """
+    values = dotenv_values(env_file)
+    
+    lines = [
+        '"""Generated from .env by scripts/compile_env.py - do not edit."""',
+        "",
+    ]
+    count = 0
+    for key, value in values.items():
+        if value is None or not key.isidentifier():
+            continue
+        lines.append(f"{key} = {value!r}")
+        count += 1
+    
+    output_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return count
+
+
+if __name__ == "__main__":
+    if not ENV_FILE.exists():
+        print(f"❌ No .env file found at {ENV_FILE}")
+        sys.exit(1)
+    
+    count = compile_env()
+    print(f"✅ Compiled {count} variable(s) into {OUTPUT_FILE}")